@@ -4,18 +4,13 @@ import os
 from flask import Flask
 from flask_cors import CORS
 
-# Import config first to apply environment and TF memory constraints
+# Import config first to apply environment settings (.env)
 import config
 from core.firebase import db
+from core.model_registry import registry
 from core.ml_predictor import (
-    rf_model,
-    bill_feats,
-    lstm_model,
-    lstm_scaler,
-    knn_model,
-    knn_scaler,
-    knn_house_ids,
-    knn_features,
+    WARMUP_ORDER,
+    profile_cache,
     SEASONAL_COEFFICIENTS,
     find_archetype_house,
     get_lstm_seed,
@@ -47,6 +42,15 @@ app.register_blueprint(profile_bp)
 app.register_blueprint(chat_bp)
 app.register_blueprint(billing_bp)
 
+# ─────────────────────────────────────────
+#  MODEL WARM-UP
+# ─────────────────────────────────────────
+# Models load lazily on first use. MODEL_WARMUP=background preloads them in a
+# daemon thread while the worker already serves requests; "eager" blocks boot.
+_warmup_mode = os.environ.get("MODEL_WARMUP", "off").lower()
+if _warmup_mode in ("background", "eager"):
+    registry.warm(WARMUP_ORDER, background=(_warmup_mode == "background"))
+
 # ─────────────────────────────────────────
 #  SELF-VALIDATION ROUTINE (FYP Boot check)
 # ─────────────────────────────────────────
@@ -57,8 +61,14 @@ def validate():
     print("=" * 80)
     try:
         import numpy as np
-        import pandas as pd
         
+        knn_scaler    = registry.get("knn_scaler")
+        knn_model     = registry.get("knn_model")
+        knn_house_ids = registry.get("knn_house_ids")
+        lstm_model    = registry.get("lstm_model")
+        rf_model      = registry.get("rf_flat") or registry.get("rf_model")
+        bill_feats    = registry.get("bill_feats")
+
         # Test 1: KNN Shape Matcher check
         mock_profile = [3.0, 1.0, 5.0, 1.0, 8.0, 1.0] # AC, Fridge, People, UPS, Fans, WM
         user_vec = np.array([mock_profile])
@@ -73,9 +83,13 @@ def validate():
         print(f"  [PASS] Bidirectional LSTM Verification: Output shape {prediction.shape}")
         
         # Test 3: Random Forest predictions
-        mock_df = pd.DataFrame([{feat: 0.0 for feat in bill_feats}])
-        rf_pred = rf_model.predict(mock_df)
+        mock_x = np.zeros((1, len(bill_feats)))
+        rf_pred = rf_model.predict(mock_x)
         print(f"  [PASS] Random Forest Verification: Base prediction {rf_pred[0]:.2f} kWh")
+
+        for name, info in registry.stats().items():
+            if info["loaded"]:
+                print(f"  [LOAD] {name:<14} {info['load_ms']:>9.1f} ms")
         
         print(" ⭐ ALL PIPELINE COMPONENTS VERIFIED SUCCESS ⭐")
     except Exception as e:
@@ -0,0 +1,183 @@
+"""
+=============================================================
+  Async Serving Mode (ASGI)
+  FYP: AI-Powered Electricity Bill Optimization
+
+  /api/chat and /api/chat/stream run natively on the event loop:
+  - the Firestore read overlaps with prompt assembly
+  - model work runs in a small bounded thread pool
+  - Gemini calls share one async HTTP client, so thousands of
+    replies can be in flight without a thread each
+  Every other route is the Flask app, bridged through a bounded
+  thread pool, so chat traffic no longer starves predictions.
+
+  Run from: bill-optimizer/backend/
+  Usage: uvicorn asgi:app --host 0.0.0.0 --port 5001
+=============================================================
+"""
+
+import asyncio
+import json
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from a2wsgi import WSGIMiddleware
+
+from config import ASYNC_CPU_WORKERS, ASYNC_IO_WORKERS, ASYNC_WSGI_WORKERS, GEMINI_MAX_CONNECTIONS
+from app import app as flask_app
+from core.firebase import get_user_doc
+from core.ml_predictor import profile_cache
+from routes.chat import (fallback_context, build_user_context, context_key, context_cache_key, with_page,
+                         SSEReply, SSE_HEADERS)
+from utils.chat_manager import build_static_block, get_gemini_response_async, stream_gemini_response_async
+
+cpu_pool = ThreadPoolExecutor(max_workers=ASYNC_CPU_WORKERS, thread_name_prefix="model")
+io_pool  = ThreadPoolExecutor(max_workers=ASYNC_IO_WORKERS, thread_name_prefix="firestore")
+wsgi_app = WSGIMiddleware(flask_app, workers=ASYNC_WSGI_WORKERS)
+
+_gemini = None
+
+
+def gemini_client() -> httpx.AsyncClient:
+    """Shared keep-alive client for Gemini; created inside the running loop."""
+    global _gemini
+    if _gemini is None:
+        _gemini = httpx.AsyncClient(limits=httpx.Limits(max_connections=GEMINI_MAX_CONNECTIONS,
+                                                        max_keepalive_connections=GEMINI_MAX_CONNECTIONS))
+    return _gemini
+
+
+# ─────────────────────────────────────────
+#  HTTP HELPERS
+# ─────────────────────────────────────────
+async def _read_body(receive) -> bytes:
+    body, more = b"", True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+    return body
+
+
+def _cors_headers(scope) -> list:
+    # Same CORS answer flask-cors gives the blueprints (any origin, with credentials)
+    origin = dict(scope.get("headers", [])).get(b"origin")
+    if not origin:
+        return []
+    return [(b"access-control-allow-origin", origin),
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin")]
+
+
+async def _send_json(scope, send, status: int, payload: dict) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": status, "headers": headers + _cors_headers(scope)})
+    await send({"type": "http.response.body", "body": body})
+
+
+# ─────────────────────────────────────────
+#  NATIVE ROUTES
+# ─────────────────────────────────────────
+async def _chat_prompt(data: dict) -> tuple:
+    """(user_context, static block, context key) for a chat request body."""
+    uid = data.get('uid')
+    page = data.get('page', '')
+    platform = data.get('platform', 'web')
+    client_display_name = data.get('displayName', '')
+    client_email = data.get('email', '')
+    loop = asyncio.get_running_loop()
+
+    # 1. Firestore read in flight while the user-independent prompt is assembled
+    doc_read = loop.run_in_executor(io_pool, get_user_doc, uid)
+    static_block = build_static_block(platform, page)
+    u = await doc_read
+
+    # 2. Prompt context, reused across the turns of a conversation; on a new
+    #    profile version or month the pipeline runs in the bounded model pool
+    if u is None:
+        return fallback_context(page, platform, client_display_name, client_email), static_block, None
+    ckey = context_key(u, client_display_name, client_email)
+    user_context = profile_cache.get(context_cache_key(ckey))
+    if user_context is None:
+        user_context = await loop.run_in_executor(
+            cpu_pool, build_user_context, u, uid, page, platform, client_display_name, client_email)
+        profile_cache.set(context_cache_key(ckey), user_context, tag=uid)
+    return with_page(user_context, page, platform), static_block, ckey
+
+
+async def chat(scope, receive, send):
+    """Async twin of routes.chat.chat_with_assistant (same request and response)."""
+    try:
+        data = json.loads(await _read_body(receive))
+        if not data.get('uid') or not data.get('message', ''):
+            return await _send_json(scope, send, 400, {"error": "Missing uid or message"})
+
+        user_context, static_block, ckey = await _chat_prompt(data)
+
+        # 3. Gemini reply, awaited without holding a thread
+        usage = {}
+        reply = await get_gemini_response_async(data['message'], data.get('history', []), user_context,
+                                                gemini_client(), static_block, ckey, usage)
+        await _send_json(scope, send, 200, {"status": "success", "reply": reply, "usage": usage})
+
+    except Exception as e:
+        traceback.print_exc()
+        await _send_json(scope, send, 500, {"error": str(e)})
+
+
+async def chat_stream(scope, receive, send):
+    """Async twin of routes.chat.chat_stream: relays reply chunks as server-sent events."""
+    try:
+        sse = SSEReply()
+        data = json.loads(await _read_body(receive))
+        if not data.get('uid') or not data.get('message', ''):
+            return await _send_json(scope, send, 400, {"error": "Missing uid or message"})
+
+        user_context, static_block, ckey = await _chat_prompt(data)
+    except Exception as e:
+        traceback.print_exc()
+        return await _send_json(scope, send, 500, {"error": str(e)})
+
+    headers = [(b"content-type", b"text/event-stream; charset=utf-8")]
+    headers += [(k.lower().encode(), v.encode()) for k, v in SSE_HEADERS.items()]
+    await send({"type": "http.response.start", "status": 200, "headers": headers + _cors_headers(scope)})
+    try:
+        async for text in stream_gemini_response_async(data['message'], data.get('history', []), user_context,
+                                                       gemini_client(), static_block, ckey, sse.usage):
+            await send({"type": "http.response.body", "body": sse.delta(text).encode("utf-8"), "more_body": True})
+        event = sse.done()
+    except Exception as e:
+        traceback.print_exc()
+        event = sse.error(str(e))
+    await send({"type": "http.response.body", "body": event.encode("utf-8")})
+
+
+NATIVE_ROUTES = {
+    ("POST", "/api/chat"): chat,
+    ("POST", "/api/chat/stream"): chat_stream,
+}
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _gemini is not None:
+                await _gemini.aclose()
+            cpu_pool.shutdown(wait=False)
+            io_pool.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    handler = NATIVE_ROUTES.get((scope.get("method"), scope.get("path")))
+    if handler is not None:
+        return await handler(scope, receive, send)
+    return await wsgi_app(scope, receive, send)
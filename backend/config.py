@@ -1,6 +1,5 @@
 import os
 import sys
-import tensorflow as tf
 
 # ─────────────────────────────────────────
 #  ENVIRONMENT SETUP
@@ -19,17 +18,24 @@ except Exception as e:
     print(f"⚠️  Manual .env loading warning: {e}")
 
 # ── Render Free Tier Memory Optimization ──
-# Limits TensorFlow CPU threads to reduce RAM usage
-# Does NOT affect model accuracy or predictions
-tf.config.threading.set_inter_op_parallelism_threads(1)
-tf.config.threading.set_intra_op_parallelism_threads(1)
+# Serving uses the NumPy forecaster (lstm_weights.npz) and never imports
+# TensorFlow. These limits only apply when the Keras fallback is loaded.
+def configure_tensorflow():
+    """Imports TensorFlow with single-threaded, grow-as-needed settings."""
+    import tensorflow as tf
 
-# Prevent TensorFlow from grabbing all available RAM upfront
-tf.config.set_soft_device_placement(True)
-gpus = tf.config.list_physical_devices('GPU')
-if gpus:
-    for gpu in gpus:
-        tf.config.experimental.set_memory_growth(gpu, True)
+    # Limits TensorFlow CPU threads to reduce RAM usage
+    # Does NOT affect model accuracy or predictions
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+
+    # Prevent TensorFlow from grabbing all available RAM upfront
+    tf.config.set_soft_device_placement(True)
+    gpus = tf.config.list_physical_devices('GPU')
+    if gpus:
+        for gpu in gpus:
+            tf.config.experimental.set_memory_growth(gpu, True)
+    return tf
 
 # ─────────────────────────────────────────
 #  PATHS
@@ -140,3 +146,130 @@ LSTM_FEATURES = [
     "hour_sin", "hour_cos", "day_of_week_sin", "day_of_week_cos",
     "month_sin", "month_cos", "is_weekend"
 ]
+
+# ─────────────────────────────────────────
+#  IN-PROCESS CACHES
+# ─────────────────────────────────────────
+# Per-user computations (physics, RF, calibration, archetype) keyed by the
+# content hash of the Firestore user document + target month
+PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", 4096))
+PROFILE_CACHE_TTL  = float(os.environ.get("PROFILE_CACHE_TTL", 600))
+
+# Firestore user documents shared across requests. Keep this short: the web
+# client also writes users/{uid} directly (display name, reset, delete).
+USER_DOC_CACHE_SIZE = int(os.environ.get("USER_DOC_CACHE_SIZE", 4096))
+USER_DOC_CACHE_TTL  = float(os.environ.get("USER_DOC_CACHE_TTL", 30))
+
+# Users per Firestore get_all round trip / vectorized scoring pass in the
+# bulk bill refresh (/api/predict_bill_batch)
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 500))
+
+# ─────────────────────────────────────────
+#  ASYNC SERVING MODE (asgi.py)
+# ─────────────────────────────────────────
+# Threads for CPU-bound model work, for blocking Firestore reads, and for the
+# Flask routes bridged under the ASGI server. Gemini calls need no threads:
+# they share one async HTTP client capped at GEMINI_MAX_CONNECTIONS.
+ASYNC_CPU_WORKERS      = int(os.environ.get("ASYNC_CPU_WORKERS", 2))
+ASYNC_IO_WORKERS       = int(os.environ.get("ASYNC_IO_WORKERS", 16))
+ASYNC_WSGI_WORKERS     = int(os.environ.get("ASYNC_WSGI_WORKERS", 8))
+GEMINI_MAX_CONNECTIONS = int(os.environ.get("GEMINI_MAX_CONNECTIONS", 1000))
+
+# ─────────────────────────────────────────
+#  GEMINI HTTP CLIENT
+# ─────────────────────────────────────────
+# Keep-alive connections held by the synchronous (Flask) client, and the
+# retry policy for 429/5xx answers: up to GEMINI_MAX_RETRIES extra attempts,
+# sleeping uniform(0, GEMINI_BACKOFF_S * 2^attempt) seconds in between.
+GEMINI_POOL_SIZE   = int(os.environ.get("GEMINI_POOL_SIZE", 10))
+GEMINI_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", 2))
+GEMINI_BACKOFF_S   = float(os.environ.get("GEMINI_BACKOFF_S", 0.25))
+
+# ─────────────────────────────────────────
+#  CHAT PROMPT CACHING
+# ─────────────────────────────────────────
+# Rendered household-context blocks of the system prompt, keyed by profile
+# content hash + month. With GEMINI_CONTEXT_CACHE=1 the user-independent part
+# of the prompt (header, directory, page section, rules) is uploaded once per
+# (platform, page) as a Gemini cachedContents entry and referenced by name,
+# instead of being resent with every chat turn.
+CHAT_CONTEXT_CACHE_SIZE = int(os.environ.get("CHAT_CONTEXT_CACHE_SIZE", 4096))
+GEMINI_CONTEXT_CACHE    = os.environ.get("GEMINI_CONTEXT_CACHE", "0") == "1"
+GEMINI_CACHE_TTL_S      = int(os.environ.get("GEMINI_CACHE_TTL_S", 3600))
+
+# Finished assistant replies per (message, page, household context, history).
+# CHAT_REPLY_CACHE_NORMALIZE=1 also matches messages that differ only in
+# case, punctuation or spacing.
+CHAT_REPLY_CACHE_SIZE      = int(os.environ.get("CHAT_REPLY_CACHE_SIZE", 2048))
+CHAT_REPLY_CACHE_TTL       = float(os.environ.get("CHAT_REPLY_CACHE_TTL", 3600))
+CHAT_REPLY_CACHE_NORMALIZE = os.environ.get("CHAT_REPLY_CACHE_NORMALIZE", "0") == "1"
+
+# ─────────────────────────────────────────
+#  CHAT HISTORY BUDGET
+# ─────────────────────────────────────────
+# Estimated tokens of client history forwarded to Gemini per turn (newest
+# turns first), and of the one-line summary that replaces older turns.
+# Estimates assume CHAT_CHARS_PER_TOKEN characters per token.
+CHAT_HISTORY_TOKEN_BUDGET = int(os.environ.get("CHAT_HISTORY_TOKEN_BUDGET", 1500))
+CHAT_SUMMARY_TOKEN_BUDGET = int(os.environ.get("CHAT_SUMMARY_TOKEN_BUDGET", 150))
+CHAT_CHARS_PER_TOKEN      = float(os.environ.get("CHAT_CHARS_PER_TOKEN", 4))
+
+# ─────────────────────────────────────────
+#  LSTM MICRO-BATCHING
+# ─────────────────────────────────────────
+# Concurrent /api/forecast_24h requests share one (B, 48, n_features)
+# forward pass: the batcher waits at most LSTM_BATCH_MAX_WAIT_MS after the
+# first request for others, up to LSTM_BATCH_MAX_SIZE seeds per pass.
+LSTM_MICRO_BATCHING    = os.environ.get("LSTM_MICRO_BATCHING", "1") == "1"
+LSTM_BATCH_MAX_SIZE    = int(os.environ.get("LSTM_BATCH_MAX_SIZE", 32))
+LSTM_BATCH_MAX_WAIT_MS = float(os.environ.get("LSTM_BATCH_MAX_WAIT_MS", 2))
+
+# ─────────────────────────────────────────
+#  FORECAST CURVE CACHE
+# ─────────────────────────────────────────
+# Raw 24h LSTM curves per (archetype, month, user mean hourly kW rounded to
+# FORECAST_MEAN_STEP); each request only rescales the curve to its own daily
+# target. The seed is built from the rounded mean, so a cached curve is
+# exactly what the model returns for that key. FORECAST_MEAN_STEP=0
+# disables the cache.
+FORECAST_CACHE_SIZE = int(os.environ.get("FORECAST_CACHE_SIZE", 4096))
+FORECAST_CACHE_TTL  = float(os.environ.get("FORECAST_CACHE_TTL", 86400))
+FORECAST_MEAN_STEP  = float(os.environ.get("FORECAST_MEAN_STEP", 0.005))
+
+# ─────────────────────────────────────────
+#  PRECOMPUTED FORECAST TABLE
+# ─────────────────────────────────────────
+# `export_models.py forecasts` runs the LSTM for every archetype house-month
+# over FORECAST_TABLE_BINS log-spaced user means between the MIN/MAX kW
+# bounds; /api/forecast_24h then interpolates the stored curves and only
+# needs the live model for house-months missing from the table.
+# FORECAST_EXACT=1 always runs the live model.
+FORECAST_TABLE_BINS   = int(os.environ.get("FORECAST_TABLE_BINS", 96))
+FORECAST_TABLE_MIN_KW = float(os.environ.get("FORECAST_TABLE_MIN_KW", 0.02))
+FORECAST_TABLE_MAX_KW = float(os.environ.get("FORECAST_TABLE_MAX_KW", 8.0))
+FORECAST_EXACT        = os.environ.get("FORECAST_EXACT", "0") == "1"
+
+# ─────────────────────────────────────────
+#  ARCHETYPE INDEX
+# ─────────────────────────────────────────
+# Nearest-house lookups for integer appliance-count vectors are memoized;
+# KNN_MEMO_SIZE=0 disables the memo.
+KNN_MEMO_SIZE = int(os.environ.get("KNN_MEMO_SIZE", 4096))
+
+# ─────────────────────────────────────────
+#  ARCHETYPE BLENDING
+# ─────────────────────────────────────────
+# FORECAST_BLEND_K > 1 makes /api/forecast_24h blend the curves of the K
+# nearest PRECON houses (knn_model was fitted with n_neighbors=3), weighted
+# by 1 / (distance + ARCHETYPE_BLEND_EPS), and return a ±1 std band of the
+# K curves around the blend. FORECAST_BLEND_K=1 keeps the single nearest.
+FORECAST_BLEND_K    = int(os.environ.get("FORECAST_BLEND_K", 1))
+ARCHETYPE_BLEND_EPS = float(os.environ.get("ARCHETYPE_BLEND_EPS", 1e-3))
+
+# ─────────────────────────────────────────
+#  OPERATIONAL METRICS
+# ─────────────────────────────────────────
+# /api/metrics exposes model, cache, batcher, Gemini and token stats. It is
+# disabled (404) unless METRICS_TOKEN is set, and then only answers requests
+# that send the same value in an X-Metrics-Token header.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
@@ -0,0 +1,96 @@
+import threading
+import numpy as np
+
+# ─────────────────────────────────────────
+#  BRUTE-FORCE ARCHETYPE INDEX
+# ─────────────────────────────────────────
+# The KNN matcher compares a 6-feature appliance vector against a few dozen
+# PRECON houses; sklearn's scaler + ball_tree calls cost far more than the
+# arithmetic. Here the scaled house vectors are kept as one (houses, d)
+# array and a batch of queries is matched with a single distance matrix.
+# Inputs are small integer counts, so single queries are also memoized
+# per integer vector.
+
+ARCHETYPE_INDEX_FILE = "knn_index.npz"
+
+
+def _index_arrays(knn_model, knn_scaler, house_ids, features) -> dict:
+    """Scaled fit vectors and scaler moments of a fitted NearestNeighbors/StandardScaler pair."""
+    return {
+        "houses":    np.asarray(knn_model._fit_X, dtype=np.float64),
+        "mean":      np.asarray(knn_scaler.mean_, dtype=np.float64),
+        "scale":     np.asarray(knn_scaler.scale_, dtype=np.float64),
+        "house_ids": np.array([str(h) for h in house_ids]),
+        "features":  np.array(list(features), dtype=str),
+    }
+
+
+class ArchetypeIndex:
+    def __init__(self, arrays: dict, memo_size: int = 4096):
+        self.houses    = np.asarray(arrays["houses"], dtype=np.float64)
+        self.mean      = np.asarray(arrays["mean"], dtype=np.float64)
+        self.scale     = np.asarray(arrays["scale"], dtype=np.float64)
+        self.house_ids = [str(h) for h in arrays["house_ids"]]
+        self.features  = [str(f) for f in arrays["features"]]
+        if self.houses.ndim != 2 or self.houses.shape != (len(self.house_ids), len(self.features)):
+            raise ValueError(f"Index of shape {self.houses.shape} does not match "
+                             f"{len(self.house_ids)} houses × {len(self.features)} features")
+        self._sq_norms = (self.houses ** 2).sum(axis=1)
+        self.memo_size = memo_size
+        self._memo     = {}
+        self._lock     = threading.Lock()
+        self.memo_hits = self.memo_misses = 0
+
+    @classmethod
+    def from_sklearn(cls, knn_model, knn_scaler, house_ids, features, memo_size: int = 4096) -> "ArchetypeIndex":
+        return cls(_index_arrays(knn_model, knn_scaler, house_ids, features), memo_size)
+
+    @classmethod
+    def load(cls, path: str, memo_size: int = 4096) -> "ArchetypeIndex":
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files}, memo_size)
+
+    def save(self, path: str) -> None:
+        np.savez(path, houses=self.houses, mean=self.mean, scale=self.scale,
+                 house_ids=np.array(self.house_ids), features=np.array(self.features))
+
+    def kneighbors(self, X, k: int = 1) -> tuple:
+        """(distances, indices), each (N, k) and nearest first, for raw (N, d) feature rows."""
+        scaled = (np.asarray(X, dtype=np.float64).reshape(-1, len(self.features)) - self.mean) / self.scale
+        # |x - h|² = |x|² - 2x·h + |h|²; clipped against rounding below zero
+        sq = (scaled ** 2).sum(axis=1)[:, None] - 2 * scaled @ self.houses.T + self._sq_norms[None, :]
+        sq = np.maximum(sq, 0.0)
+        k  = min(k, len(self.house_ids))
+        if k == 1:
+            idxs = sq.argmin(axis=1)[:, None]
+        else:
+            idxs = np.argpartition(sq, k - 1, axis=1)[:, :k]
+            order = np.take_along_axis(sq, idxs, axis=1).argsort(axis=1, kind="stable")
+            idxs = np.take_along_axis(idxs, order, axis=1)
+        return np.sqrt(np.take_along_axis(sq, idxs, axis=1)), idxs
+
+    def nearest(self, X) -> list:
+        """Nearest house id for each raw (N, d) feature row."""
+        return [self.house_ids[i] for i in self.kneighbors(X)[1][:, 0]]
+
+    def nearest_one(self, vec) -> str:
+        """Nearest house id for one feature vector, memoized for integer-valued inputs."""
+        values = [float(v) for v in np.ravel(vec)]
+        if self.memo_size <= 0 or not all(v.is_integer() for v in values):
+            return self.nearest([values])[0]
+        key = tuple(int(v) for v in values)
+        house = self._memo.get(key)
+        if house is not None:
+            self.memo_hits += 1
+            return house
+        house = self.nearest([values])[0]
+        with self._lock:
+            self.memo_misses += 1
+            if len(self._memo) >= self.memo_size:
+                self._memo.pop(next(iter(self._memo)))
+            self._memo[key] = house
+        return house
+
+    def stats(self) -> dict:
+        return {"houses": len(self.house_ids), "memo_size": len(self._memo),
+                "memo_hits": self.memo_hits, "memo_misses": self.memo_misses}
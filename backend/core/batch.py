@@ -0,0 +1,146 @@
+import numpy as np
+
+from config import BATCH_CHUNK_SIZE
+from core.firebase import get_user_docs
+from core.physics import get_current_month, safe_get
+from core.ml_predictor import estimate_batch
+from utils.nepra_engine import NepraEngine
+
+# ─────────────────────────────────────────
+#  BULK BILL PREDICTION
+# ─────────────────────────────────────────
+# Same result as /api/predict_bill, for thousands of users per call: user
+# documents arrive through one Firestore get_all per chunk, every simulated
+# (profile, month) pair of the chunk shares one forest call and the NEPRA
+# bills of the chunk are priced in one columnar pass.
+nepra = NepraEngine()
+
+
+def simulation_plan(u: dict, target_month: int) -> tuple:
+    """(rolling window of real units, months to simulate up to and including target)."""
+    history = u.get('bill_history', [])
+    sorted_hist = sorted(history, key=lambda x: x.get('month', '0000-00'))
+    rolling_window = [float(b.get('units', 0)) for b in sorted_hist if float(b.get('units', 0)) > 5][-12:]
+
+    if sorted_hist:
+        _, last_m_int = map(int, sorted_hist[-1].get('month', '0000-00').split('-'))
+        current_sim_month = (last_m_int % 12) + 1
+    else:
+        current_sim_month = get_current_month()
+
+    sim_months = []
+    for _ in range(13):
+        sim_months.append(current_sim_month)
+        if current_sim_month == target_month:
+            break
+        current_sim_month = (current_sim_month % 12) + 1
+    return rolling_window, sim_months
+
+
+def replay_window(rolling_window: list, units_list: list, sim_months: list, target_month: int) -> tuple:
+    """
+    (12-month eligibility window, target-month units) after appending the
+    simulated gap months before the target to the real rolling window.
+    """
+    gap_units = units_list if sim_months[-1] != target_month else units_list[:-1]
+    return (rolling_window + list(gap_units))[-12:], units_list[-1]
+
+
+def predict_bills(entries: list, target_month: int = None, cache: bool = False) -> list:
+    """
+    Bill predictions for a list of (uid, user_doc) pairs; uid may be None for
+    inline profiles and user_doc None for missing profiles. A profile that is
+    not a dict, or whose estimate fails, gets its own error record without
+    affecting the rest. Returns one record per entry, in order: {"uid", "status": "success", "month", "kwh",
+    "rf_prediction_kwh", "bill"} or {"uid", "status": "error", "error"}.
+    """
+    target_month = int(target_month or get_current_month())
+    records = [None] * len(entries)
+    scored, items = [], []
+
+    for idx, (uid, u) in enumerate(entries):
+        if u is None:
+            records[idx] = {"uid": uid, "status": "error", "error": "Profile not found"}
+            continue
+        if not isinstance(u, dict):
+            records[idx] = {"uid": uid, "status": "error", "error": "Profile must be a JSON object"}
+            continue
+        try:
+            rolling_window, sim_months = simulation_plan(u, target_month)
+        except Exception as e:
+            records[idx] = {"uid": uid, "status": "error", "error": str(e)}
+            continue
+        scored.append((idx, uid, u, rolling_window, sim_months))
+        items.append((u, sim_months, uid, None))
+
+    if not scored:
+        return records
+
+    try:
+        estimates = estimate_batch(items, cache=cache)
+    except Exception:
+        # Re-run one profile at a time so a single bad document only fails itself
+        estimates = []
+        for item in items:
+            try:
+                estimates.append(estimate_batch([item], cache=cache)[0])
+            except Exception as e:
+                estimates.append(e)
+
+    priced, final_units, loads, categories, eligible = [], [], [], [], []
+    for (idx, uid, u, rolling_window, sim_months), ests in zip(scored, estimates):
+        try:
+            if isinstance(ests, Exception):
+                raise ests
+            window, units = replay_window(rolling_window, [e["units"] for e in ests], sim_months, target_month)
+            cat  = u.get('user_category', 'lifeline')
+            load = safe_get(u, 'sanctioned_load', 1.0)
+            is_eligible = nepra.check_eligibility(window, cat)
+        except Exception as e:
+            records[idx] = {"uid": uid, "status": "error", "error": str(e)}
+            continue
+        priced.append((idx, uid, ests[-1]["rf_kwh"]))
+        final_units.append(units)
+        loads.append(load)
+        categories.append(cat)
+        eligible.append(is_eligible)
+
+    if not priced:
+        return records
+
+    bills = nepra.calculate_bills(np.array(final_units), np.array(loads), np.array(categories), np.array(eligible))
+
+    for row, (idx, uid, rf_kwh) in enumerate(priced):
+        records[idx] = {
+            "uid": uid,
+            "status": "success",
+            "month": target_month,
+            "kwh": round(final_units[row], 2),
+            "rf_prediction_kwh": round(rf_kwh, 2),
+            "bill": {k: v[row].item() for k, v in bills.items()},
+        }
+    return records
+
+
+def iter_predict_bills(uids=None, profiles=None, target_month: int = None, chunk_size: int = BATCH_CHUNK_SIZE):
+    """
+    Generator over bill records for stored users (`uids`) followed by inline
+    profile dicts (`profiles`, optionally carrying a "uid"), chunk by chunk.
+    A chunk that fails as a whole yields one error record per user.
+    """
+    uids, profiles = list(uids or []), list(profiles or [])
+    chunks  = [(uids[s:s + chunk_size], True) for s in range(0, len(uids), chunk_size)]
+    chunks += [(profiles[s:s + chunk_size], False) for s in range(0, len(profiles), chunk_size)]
+
+    for chunk, stored in chunks:
+        try:
+            if stored:
+                docs = get_user_docs(chunk)
+                entries = [(uid, docs.get(uid)) for uid in chunk]
+            else:
+                entries = [(p.get('uid') if isinstance(p, dict) else None, p) for p in chunk]
+            records = predict_bills(entries, target_month)
+        except Exception as e:
+            records = [{"uid": item if stored else (item.get('uid') if isinstance(item, dict) else None),
+                        "status": "error", "error": str(e)} for item in chunk]
+        yield from records
@@ -0,0 +1,113 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# ─────────────────────────────────────────
+#  IN-PROCESS MICRO-BATCHING
+# ─────────────────────────────────────────
+# Concurrent requests each hand one input to a worker thread, which waits
+# up to `max_wait_ms` after the first arrival for more (never beyond
+# `max_batch`), runs one batched call and scatters the rows back. A lone
+# request pays at most max_wait_ms; under load B requests share one pass.
+
+# Batch-size histogram buckets: 1, 2, 3-4, 5-8, 9-16, ...
+def _bucket(size: int) -> str:
+    upper = 1 << (size - 1).bit_length()
+    lower = upper // 2 + 1 if upper > 2 else upper
+    return str(upper) if lower == upper else f"{lower}-{upper}"
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch: int = 32, max_wait_ms: float = 2.0, name: str = "micro-batcher"):
+        """`batch_fn` maps a stacked (B, ...) array to (B, ...) outputs."""
+        self.batch_fn    = batch_fn
+        self.max_batch   = max(1, int(max_batch))
+        self.max_wait_s  = max(0.0, max_wait_ms) / 1000
+        self.name        = name
+        self._queue      = queue.Queue()
+        self._worker     = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self.batches = self.requests = self.failures = 0
+            self._wait_sum = self._wait_max = 0.0
+            self.histogram = {}
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._queue.put((np.asarray(item), future, time.perf_counter()))
+        self._ensure_worker()
+        return future
+
+    def __call__(self, item, timeout: float = None):
+        """Blocking single-item call: the row of the batch this item ran in."""
+        return self.submit(item).result(timeout)
+
+    def _collect(self) -> list:
+        pending  = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(pending) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                pending.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return pending
+
+    def _run(self) -> None:
+        while True:
+            pending = self._collect()
+            started = time.perf_counter()
+            try:
+                outputs = self.batch_fn(np.stack([item for item, _, _ in pending]))
+                if len(outputs) != len(pending):
+                    raise ValueError(f"batch of {len(pending)} returned {len(outputs)} rows")
+            except Exception as e:
+                for _, future, _ in pending:
+                    future.set_exception(e)
+                self._record(pending, started, failed=True)
+                continue
+            for row, (_, future, _) in zip(outputs, pending):
+                future.set_result(row)
+            self._record(pending, started)
+
+    def _record(self, pending: list, started: float, failed: bool = False) -> None:
+        size = len(pending)
+        waits = [started - queued_at for _, _, queued_at in pending]
+        with self._stats_lock:
+            self.batches  += 1
+            self.requests += size
+            self.failures += size if failed else 0
+            self._wait_sum += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+            bucket = _bucket(size)
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            order = sorted(self.histogram, key=lambda b: int(b.split("-")[-1]))
+            return {
+                "max_batch":       self.max_batch,
+                "max_wait_ms":     self.max_wait_s * 1000,
+                "batches":         self.batches,
+                "requests":        self.requests,
+                "failures":        self.failures,
+                "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "queue_wait_ms":   {"mean": round(self._wait_sum / self.requests * 1000, 3) if self.requests else 0.0,
+                                    "max":  round(self._wait_max * 1000, 3)},
+                "batch_sizes":     {b: self.histogram[b] for b in order},
+            }
@@ -0,0 +1,86 @@
+import numpy as np
+from functools import lru_cache
+
+from core.physics import safe_get, compute_true_baseload
+
+# ─────────────────────────────────────────
+#  RF FEATURE ASSEMBLY
+# ─────────────────────────────────────────
+# Features derived from the physics breakdown (feature name → physics key)
+PHYSICS_FEATURES = {
+    'ac_monthly':           'ac',
+    'kitchen_monthly':      'kitchen',
+    'refrigerator_monthly': 'fridge',
+    'ups_monthly':          'ups',
+    'wp_monthly':           'water_pump',
+}
+
+# Features that only depend on the profile document: (key, default, floor)
+PROFILE_FEATURES = {
+    'weekend_usage':     ('mean_hourly', 0.05, None),
+    'person_count':      ('person_count', 1.0, 1.0),
+    'property_area':     ('property_area', 500.0, None),
+    'meta_ac_count':     ('ac_qty', 0.0, None),
+    'meta_fridge_count': ('f_qty', 0.0, None),
+    'meta_ups_count':    ('u_qty', 0.0, None),
+    'floors':            ('floors', 1.0, None),
+}
+
+
+@lru_cache(maxsize=8)
+def _column_layout(feature_names: tuple) -> tuple:
+    """Resolves feature names to column indices once per feature ordering."""
+    physics_cols = tuple((i, PHYSICS_FEATURES[f]) for i, f in enumerate(feature_names) if f in PHYSICS_FEATURES)
+    profile_cols = tuple((i, PROFILE_FEATURES[f]) for i, f in enumerate(feature_names) if f in PROFILE_FEATURES)
+    month_cols   = tuple(i for i, f in enumerate(feature_names) if f == 'month_num')
+    return physics_cols, profile_cols, month_cols
+
+
+def _profile_values(u: dict, profile_cols: tuple) -> list:
+    values = []
+    for col, (key, default, floor) in profile_cols:
+        v = safe_get(u, key, default)
+        values.append((col, max(v, floor) if floor is not None else v))
+    return values
+
+
+def build_feature_matrix(pairs, feature_names, physics_list=None, out=None) -> np.ndarray:
+    """
+    Assembles the RF input matrix for N (profile, month) pairs.
+
+    Rows are written straight into a preallocated float64 array whose columns
+    follow `feature_names` (the trained `bill_feats` order); unknown features
+    stay 0.0. Pass `physics_list` to reuse breakdowns the caller already has.
+    A caller-supplied `out` may have spare rows; only the first N are
+    written and returned.
+    """
+    pairs = list(pairs)
+    physics_cols, profile_cols, month_cols = _column_layout(tuple(feature_names))
+
+    if out is None:
+        out = np.zeros((len(pairs), len(feature_names)), dtype=np.float64)
+    else:
+        out[:len(pairs)] = 0.0
+
+    profile_memo = {}
+    for row, (u, month) in enumerate(pairs):
+        physics = physics_list[row] if physics_list is not None else compute_true_baseload(u, month)
+
+        # Profile-only columns are shared by every month of the same document
+        prof_vals = profile_memo.get(id(u))
+        if prof_vals is None:
+            prof_vals = profile_memo[id(u)] = _profile_values(u, profile_cols)
+
+        r = out[row]
+        for col, key in physics_cols:
+            r[col] = physics[key]
+        for col, v in prof_vals:
+            r[col] = v
+        for col in month_cols:
+            r[col] = float(month)
+    return out[:len(pairs)]
+
+
+def build_feature_vector(u: dict, month: int, feature_names, physics: dict = None) -> np.ndarray:
+    """Single-row convenience wrapper; returns shape (1, n_features)."""
+    return build_feature_matrix([(u, month)], feature_names, None if physics is None else [physics])
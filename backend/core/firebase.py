@@ -1,21 +1,147 @@
 import os
+import threading
 import firebase_admin
 from firebase_admin import credentials, firestore
-from config import BASE_DIR
+from flask import g, has_request_context
+
+from config import BASE_DIR, USER_DOC_CACHE_SIZE, USER_DOC_CACHE_TTL
+from core.cache import TTLCache
 
 # Firebase Credential Paths matching root backend structure
 cred_path = os.path.join(BASE_DIR, "serviceAccountKey.json")
 
-# Support both local file and cloud environment variable
-if os.path.exists(cred_path):
-    cred = credentials.Certificate(cred_path)
-elif os.environ.get("FIREBASE_CREDENTIALS_JSON"):
-    import json as _json
-    cred_dict = _json.loads(os.environ["FIREBASE_CREDENTIALS_JSON"])
-    cred = credentials.Certificate(cred_dict)
-else:
+_client = None
+_client_lock = threading.Lock()
+
+
+def _load_credentials():
+    # Support both local file and cloud environment variable
+    if os.path.exists(cred_path):
+        return credentials.Certificate(cred_path)
+    elif os.environ.get("FIREBASE_CREDENTIALS_JSON"):
+        import json as _json
+        cred_dict = _json.loads(os.environ["FIREBASE_CREDENTIALS_JSON"])
+        return credentials.Certificate(cred_dict)
     raise RuntimeError("No Firebase credentials found. Provide serviceAccountKey.json or set FIREBASE_CREDENTIALS_JSON env var.")
 
-# Initialize Firebase app and Firestore instance
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+
+def get_db():
+    """Initializes the Firebase app and Firestore client on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                firebase_admin.initialize_app(_load_credentials())
+                _client = firestore.client()
+    return _client
+
+
+class _LazyFirestore:
+    """Module-level stand-in for the Firestore client; connects on first attribute access."""
+
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+
+db = _LazyFirestore()
+
+
+# ─────────────────────────────────────────
+#  DATA ACCESS LAYER
+# ─────────────────────────────────────────
+# users/{uid}: memoized for the duration of a request (flask.g) and shared
+#              across requests for USER_DOC_CACHE_TTL seconds.
+# lstm_seeds:  immutable PRECON windows, cached for the process lifetime.
+# Returned dicts are shared between callers and must be treated as read-only.
+user_doc_cache = TTLCache(maxsize=USER_DOC_CACHE_SIZE, ttl=USER_DOC_CACHE_TTL)
+_seed_docs = {}
+_seed_lock = threading.Lock()
+firestore_reads = {"users": 0, "lstm_seeds": 0}
+
+
+def _request_memo() -> dict:
+    if not has_request_context():
+        return None
+    if "user_docs" not in g:
+        g.user_docs = {}
+    return g.user_docs
+
+
+def get_user_doc(uid: str):
+    """Returns the user document as a dict, or None if it does not exist."""
+    memo = _request_memo()
+    if memo is not None and uid in memo:
+        return memo[uid]
+
+    u = user_doc_cache.get(uid)
+    if u is None:
+        snap = db.collection('users').document(uid).get()
+        firestore_reads["users"] += 1
+        u = snap.to_dict() if snap.exists else None
+        # Missing profiles are not cached across requests: setup may create them any moment
+        if u is not None:
+            user_doc_cache.set(uid, u, tag=uid)
+
+    if memo is not None:
+        memo[uid] = u
+    return u
+
+
+def get_user_docs(uids: list) -> dict:
+    """
+    Batched get_user_doc: {uid: dict or None}. Cached documents are served
+    locally and every miss is fetched in one Firestore get_all round trip.
+    Bulk reads are not written back to the shared cache, so a whole-user-base
+    job cannot evict the documents of users who are active right now.
+    """
+    memo = _request_memo() or {}
+    docs, missing = {}, []
+    for uid in dict.fromkeys(uids):
+        u = memo[uid] if uid in memo else user_doc_cache.get(uid)
+        if u is None:
+            missing.append(uid)
+        else:
+            docs[uid] = u
+
+    if missing:
+        users = db.collection('users')
+        for snap in db.get_all([users.document(uid) for uid in missing]):
+            docs[snap.id] = snap.to_dict() if snap.exists else None
+        firestore_reads["users"] += len(missing)
+        for uid in missing:
+            docs.setdefault(uid, None)
+    return docs
+
+
+def set_user_doc(uid: str, data: dict, merge: bool = True) -> None:
+    db.collection('users').document(uid).set(data, merge=merge)
+    invalidate_user_doc(uid)
+
+
+def invalidate_user_doc(uid: str) -> None:
+    user_doc_cache.invalidate_tag(uid)
+    memo = _request_memo()
+    if memo is not None:
+        memo.pop(uid, None)
+
+
+def get_seed_doc(doc_id: str):
+    """Returns an lstm_seeds document as a dict (None if absent); read at most once per process."""
+    try:
+        return _seed_docs[doc_id]
+    except KeyError:
+        pass
+    snap = db.collection("lstm_seeds").document(doc_id).get()
+    firestore_reads["lstm_seeds"] += 1
+    data = snap.to_dict() if snap.exists else None
+    with _seed_lock:
+        _seed_docs[doc_id] = data
+    return data
+
+
+def data_access_stats() -> dict:
+    return {
+        "user_doc_cache":   user_doc_cache.stats(),
+        "seed_docs_cached": len(_seed_docs),
+        "firestore_reads":  dict(firestore_reads),
+    }
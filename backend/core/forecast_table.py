@@ -0,0 +1,101 @@
+import json
+import os
+import numpy as np
+
+# ─────────────────────────────────────────
+#  PRECOMPUTED ARCHETYPE FORECAST TABLE
+# ─────────────────────────────────────────
+# The LSTM input is a PRECON archetype window rescaled to the user's mean
+# hourly load, so its output only depends on (house, month, user mean).
+# `export_models.py forecasts` runs the model once per house-month over a
+# log-spaced grid of user means and stores every 24h curve in one float32
+# .npy file (houses × 12 × bins × 24). Serving interpolates between the two
+# nearest bins, which needs NumPy only, with no ML runtime. Means outside
+# the grid use the edge bin.
+
+FORECAST_TABLE_FILE = "lstm_forecasts.npy"
+FORECAST_INDEX_FILE = "lstm_forecasts_index.json"
+
+
+def mean_grid(lowest: float, highest: float, bins: int) -> np.ndarray:
+    """Log-spaced user-mean bins (kW)."""
+    return np.geomspace(lowest, highest, bins)
+
+
+class ForecastTable:
+    def __init__(self, table: np.ndarray, house_ids: list, means, valid: np.ndarray):
+        self.table     = table
+        self.house_ids = list(house_ids)
+        self.means     = np.asarray(means, dtype=np.float64)
+        self.valid     = np.asarray(valid, dtype=bool)
+        self._log_means = np.log(self.means)
+        self._row      = {h: i for i, h in enumerate(self.house_ids)}
+
+    @classmethod
+    def load(cls, models_dir: str, mmap: bool = True) -> "ForecastTable":
+        table = np.load(os.path.join(models_dir, FORECAST_TABLE_FILE), mmap_mode="r" if mmap else None)
+        with open(os.path.join(models_dir, FORECAST_INDEX_FILE)) as f:
+            index = json.load(f)
+        if table.shape[:3] != (len(index["house_ids"]), 12, len(index["means"])):
+            raise ValueError(f"Forecast table shape {table.shape} does not match its index")
+        return cls(table, index["house_ids"], index["means"], index["valid"])
+
+    def __contains__(self, house_id) -> bool:
+        return house_id in self._row
+
+    def _weights(self, user_means: np.ndarray) -> tuple:
+        """(lower bin, upper-bin weight) of each mean, interpolating in log space."""
+        x = np.log(np.clip(user_means, self.means[0], self.means[-1]))
+        lower = np.clip(np.searchsorted(self._log_means, x, side="right") - 1, 0, len(self.means) - 2)
+        span = self._log_means[lower + 1] - self._log_means[lower]
+        return lower, (x - self._log_means[lower]) / span
+
+    def lookup(self, house_id: str, month: int, user_mean: float):
+        """Interpolated (24,) curve, or None if this house-month was not built."""
+        row = self._row.get(house_id)
+        if row is None or not self.valid[row, month - 1]:
+            return None
+        lower, w = self._weights(np.array([user_mean], dtype=np.float64))
+        curves = np.asarray(self.table[row, month - 1, lower[0]:lower[0] + 2], dtype=np.float64)
+        return curves[0] * (1.0 - w[0]) + curves[1] * w[0]
+
+
+def build_forecast_table(raw_seed, forecast, rescale, house_ids: list, means,
+                         models_dir: str, chunk: int = 512) -> tuple:
+    """
+    Runs the forecaster over every (house, month, mean bin) and writes the
+    .npy + index files. `raw_seed(house, month)` returns the unscaled PRECON
+    window or None, `rescale(seeds, user_means, months)` scales seeds in
+    place and `forecast(seeds)` maps (B, 48, F) seeds to (B, 24) curves.
+    Returns (table, validity mask of shape (houses, 12)).
+    """
+    house_ids = [str(h) for h in house_ids]
+    means = np.asarray(means, dtype=np.float64)
+    table = np.full((len(house_ids), 12, len(means), 24), np.nan, dtype=np.float32)
+    valid = np.zeros((len(house_ids), 12), dtype=bool)
+
+    jobs = []
+    for i, house_id in enumerate(house_ids):
+        for month in range(1, 13):
+            window = raw_seed(house_id, month)
+            if window is None:
+                continue
+            jobs.append((i, month, np.asarray(window, dtype=np.float32)))
+            valid[i, month - 1] = True
+
+    # Every bin of a house-month shares its window; batches span house-months
+    per_chunk = max(1, chunk // len(means))
+    for start in range(0, len(jobs), per_chunk):
+        group = jobs[start:start + per_chunk]
+        seeds = np.concatenate([np.repeat(w[None], len(means), axis=0) for _, _, w in group])
+        months = np.repeat([m for _, m, _ in group], len(means))
+        seeds = rescale(seeds, np.tile(means, len(group)), months)
+        curves = np.asarray(forecast(seeds), dtype=np.float32).reshape(len(group), len(means), 24)
+        for (i, month, _), block in zip(group, curves):
+            table[i, month - 1] = block
+
+    np.save(os.path.join(models_dir, FORECAST_TABLE_FILE), table)
+    with open(os.path.join(models_dir, FORECAST_INDEX_FILE), "w") as f:
+        json.dump({"house_ids": house_ids, "means": means.tolist(), "valid": valid.tolist(),
+                   "shape": list(table.shape)}, f)
+    return table, valid
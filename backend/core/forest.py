@@ -0,0 +1,106 @@
+import numpy as np
+
+# ─────────────────────────────────────────
+#  FLAT RANDOM FOREST EVALUATOR
+# ─────────────────────────────────────────
+# sklearn's RandomForestRegressor.predict validates input and dispatches a
+# thread pool on every call, which dominates latency for the 1–13 row
+# batches our routes send. Here the whole forest is packed into padded
+# (n_trees, max_nodes) arrays and all trees are walked together, one
+# depth level per NumPy step.
+
+FLAT_FOREST_FILE = "rf_flat.npz"
+
+
+def flatten_forest(rf_model, feature_names=None) -> dict:
+    """
+    Packs a fitted sklearn forest into contiguous node arrays.
+
+    Leaf nodes point to themselves on both sides, so a fixed number of
+    descent steps (the deepest tree's depth) lands every row on a leaf.
+    """
+    trees = [est.tree_ for est in rf_model.estimators_]
+    if not trees:
+        raise ValueError("Forest has no fitted estimators")
+
+    n_trees   = len(trees)
+    max_nodes = max(t.node_count for t in trees)
+
+    feature   = np.zeros((n_trees, max_nodes), dtype=np.int32)
+    threshold = np.zeros((n_trees, max_nodes), dtype=np.float64)
+    left      = np.zeros((n_trees, max_nodes), dtype=np.int32)
+    right     = np.zeros((n_trees, max_nodes), dtype=np.int32)
+    value     = np.zeros((n_trees, max_nodes), dtype=np.float64)
+
+    for i, t in enumerate(trees):
+        n       = t.node_count
+        is_leaf = t.children_left[:n] == -1
+        own_idx = np.arange(n, dtype=np.int32)
+
+        feature[i, :n]   = np.where(is_leaf, 0, t.feature[:n])
+        threshold[i, :n] = np.where(is_leaf, 0.0, t.threshold[:n])
+        left[i, :n]      = np.where(is_leaf, own_idx, t.children_left[:n])
+        right[i, :n]     = np.where(is_leaf, own_idx, t.children_right[:n])
+        value[i, :n]     = t.value[:n, 0, 0]
+
+    return {
+        "feature":       feature,
+        "threshold":     threshold,
+        "left":          left,
+        "right":         right,
+        "value":         value,
+        "max_depth":     np.int32(max(t.max_depth for t in trees)),
+        "n_features":    np.int32(rf_model.n_features_in_),
+        "feature_names": np.array(list(feature_names) if feature_names is not None else [], dtype=str),
+    }
+
+
+class FlatForest:
+    """Vectorized evaluator over the arrays produced by `flatten_forest`."""
+
+    def __init__(self, arrays: dict):
+        self.feature    = np.ascontiguousarray(arrays["feature"], dtype=np.intp)
+        self.threshold  = np.ascontiguousarray(arrays["threshold"], dtype=np.float64)
+        self.left       = np.ascontiguousarray(arrays["left"], dtype=np.intp)
+        self.right      = np.ascontiguousarray(arrays["right"], dtype=np.intp)
+        self.value      = np.ascontiguousarray(arrays["value"], dtype=np.float64)
+        self.max_depth  = int(arrays["max_depth"])
+        self.n_features = int(arrays["n_features"])
+        self.feature_names = [str(f) for f in arrays.get("feature_names", [])]
+        self.n_trees    = self.feature.shape[0]
+        self._tree_idx  = np.arange(self.n_trees)
+
+    @classmethod
+    def from_sklearn(cls, rf_model, feature_names=None) -> "FlatForest":
+        return cls(flatten_forest(rf_model, feature_names))
+
+    @classmethod
+    def load(cls, path: str) -> "FlatForest":
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def predict(self, X) -> np.ndarray:
+        # sklearn casts inputs to float32 and compares them against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        n_rows = X.shape[0]
+        rows   = np.arange(n_rows)[:, None]
+        trees  = self._tree_idx[None, :]
+        node   = np.zeros((n_rows, self.n_trees), dtype=np.intp)
+
+        for _ in range(self.max_depth):
+            feat    = self.feature[trees, node]
+            go_left = X[rows, feat] <= self.threshold[trees, node]
+            node    = np.where(go_left, self.left[trees, node], self.right[trees, node])
+
+        leaf_values = self.value[trees, node]
+
+        # Accumulate tree by tree, in estimator order, exactly like sklearn does
+        out = np.zeros(n_rows, dtype=np.float64)
+        for t in range(self.n_trees):
+            out += leaf_values[:, t]
+        return out / self.n_trees
@@ -0,0 +1,118 @@
+import json
+import numpy as np
+
+# ─────────────────────────────────────────
+#  NUMPY BiLSTM INFERENCE RUNTIME
+# ─────────────────────────────────────────
+# Serving only ever needs the forward pass of the 24h forecaster, so the
+# Keras graph is exported once to plain float32 arrays and evaluated here.
+# Supported layers mirror train_model.py: Bidirectional(LSTM),
+# LayerNormalization, Dense and Dropout (a no-op at inference).
+
+LSTM_WEIGHTS_FILE = "lstm_weights.npz"
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+_ACTIVATIONS = {
+    "linear":  lambda x: x,
+    "relu":    lambda x: np.maximum(x, 0.0),
+    "tanh":    np.tanh,
+    "sigmoid": _sigmoid,
+}
+
+
+def export_keras_weights(model, path: str) -> list:
+    """
+    Writes every inference-relevant weight of a Keras model to one .npz file.
+
+    Arrays are stored as `{layer_idx}_{name}`; the `spec` entry is a JSON
+    list describing the layer sequence. Returns that spec.
+    """
+    spec, arrays = [], {}
+    for idx, layer in enumerate(model.layers):
+        kind = type(layer).__name__
+        if kind == "Dropout":
+            continue
+        if kind == "Bidirectional":
+            fw, bw = layer.forward_layer, layer.backward_layer
+            if layer.merge_mode != "concat":
+                raise ValueError(f"Unsupported merge_mode: {layer.merge_mode}")
+            for prefix, rnn in (("fw", fw), ("bw", bw)):
+                kernel, recurrent, bias = rnn.get_weights()
+                arrays[f"{idx}_{prefix}_kernel"]    = kernel
+                arrays[f"{idx}_{prefix}_recurrent"] = recurrent
+                arrays[f"{idx}_{prefix}_bias"]      = bias
+            spec.append({"idx": idx, "type": "bilstm", "units": int(fw.units),
+                         "return_sequences": bool(fw.return_sequences)})
+        elif kind == "LayerNormalization":
+            gamma, beta = layer.get_weights()
+            arrays[f"{idx}_gamma"], arrays[f"{idx}_beta"] = gamma, beta
+            spec.append({"idx": idx, "type": "layernorm", "epsilon": float(layer.epsilon)})
+        elif kind == "Dense":
+            kernel, bias = layer.get_weights()
+            arrays[f"{idx}_kernel"], arrays[f"{idx}_bias"] = kernel, bias
+            spec.append({"idx": idx, "type": "dense", "activation": layer.activation.__name__})
+        else:
+            raise ValueError(f"Unsupported layer for NumPy export: {kind}")
+
+    arrays = {k: np.asarray(v, dtype=np.float32) for k, v in arrays.items()}
+    np.savez(path, spec=np.array(json.dumps(spec)), **arrays)
+    return spec
+
+
+class NumpyForecaster:
+    """Drop-in replacement for `keras.Model.predict` on the exported forecaster."""
+
+    def __init__(self, spec: list, arrays: dict):
+        self.spec   = spec
+        self.arrays = arrays
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyForecaster":
+        with np.load(path) as data:
+            spec   = json.loads(str(data["spec"]))
+            arrays = {k: data[k] for k in data.files if k != "spec"}
+        return cls(spec, arrays)
+
+    def _lstm(self, x, kernel, recurrent, bias, reverse: bool, return_sequences: bool):
+        # Keras gate order: input, forget, cell candidate, output
+        batch, steps, _ = x.shape
+        units = recurrent.shape[0]
+        x_proj = x @ kernel + bias        # all input projections in one matmul
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = np.empty((batch, steps, units), dtype=np.float32) if return_sequences else None
+
+        order = range(steps - 1, -1, -1) if reverse else range(steps)
+        for t in order:
+            z = x_proj[:, t] + h @ recurrent
+            i = _sigmoid(z[:, :units])
+            f = _sigmoid(z[:, units:2 * units])
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = _sigmoid(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            if return_sequences:
+                outputs[:, t] = h   # backward outputs land back in forward time order
+        return outputs if return_sequences else h
+
+    def predict(self, x, verbose=0) -> np.ndarray:
+        out = np.asarray(x, dtype=np.float32)
+        a = self.arrays
+        for layer in self.spec:
+            idx = layer["idx"]
+            if layer["type"] == "bilstm":
+                seq = layer["return_sequences"]
+                fw = self._lstm(out, a[f"{idx}_fw_kernel"], a[f"{idx}_fw_recurrent"], a[f"{idx}_fw_bias"], False, seq)
+                bw = self._lstm(out, a[f"{idx}_bw_kernel"], a[f"{idx}_bw_recurrent"], a[f"{idx}_bw_bias"], True, seq)
+                out = np.concatenate([fw, bw], axis=-1)
+            elif layer["type"] == "layernorm":
+                mean = out.mean(axis=-1, keepdims=True)
+                var  = out.var(axis=-1, keepdims=True)
+                out  = (out - mean) / np.sqrt(var + layer["epsilon"]) * a[f"{idx}_gamma"] + a[f"{idx}_beta"]
+            elif layer["type"] == "dense":
+                out = _ACTIVATIONS[layer["activation"]](out @ a[f"{idx}_kernel"] + a[f"{idx}_bias"])
+        return out
@@ -1,106 +1,404 @@
 import os
-import joblib
 import json
+import warnings
 import numpy as np
-import pandas as pd
-import tensorflow as tf
 
-from config import MODELS_DIR, LSTM_FEATURES, ROUTINE_FACTORS
-from core.firebase import db
-from core.physics import safe_get, get_seasonal_ac_scale, encode_cyclical, compute_true_baseload
+from config import (
+    MODELS_DIR, LSTM_FEATURES, ROUTINE_FACTORS,
+    PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL, configure_tensorflow,
+    LSTM_MICRO_BATCHING, LSTM_BATCH_MAX_SIZE, LSTM_BATCH_MAX_WAIT_MS,
+    FORECAST_CACHE_SIZE, FORECAST_CACHE_TTL, FORECAST_MEAN_STEP, FORECAST_EXACT,
+    KNN_MEMO_SIZE, ARCHETYPE_BLEND_EPS
+)
+from core.firebase import get_seed_doc
+from core.physics import (
+    safe_get, get_seasonal_ac_scale, encode_cyclical,
+    compute_true_baseload, compute_true_baseload_batch, profile_table,
+    PROFILE_NUMERIC_FIELDS, PROFILE_TEXT_FIELDS
+)
+from core.features import build_feature_matrix
+from core.forest import FlatForest, FLAT_FOREST_FILE
+from core.lstm_runtime import NumpyForecaster, LSTM_WEIGHTS_FILE
+from core.model_registry import registry
+from core.cache import TTLCache, profile_hash
+from core.batching import MicroBatcher
+from core.seeds import SeedTable, SEED_TABLE_FILE
+from core.forecast_table import ForecastTable, FORECAST_TABLE_FILE
+from core.archetype import ArchetypeIndex, ARCHETYPE_INDEX_FILE
 
 # ─────────────────────────────────────────
-#  LOAD MODELS
+#  MODEL LOADERS (resolved lazily through the registry)
 # ─────────────────────────────────────────
-rf_model    = joblib.load(os.path.join(MODELS_DIR, "rf_bill_predictor.pkl"))
-bill_feats  = joblib.load(os.path.join(MODELS_DIR, "bill_features.pkl"))
-lstm_model  = tf.keras.models.load_model(os.path.join(MODELS_DIR, "lstm_forecaster.keras"))
-lstm_scaler = joblib.load(os.path.join(MODELS_DIR, "lstm_scaler.pkl"))
-knn_model     = joblib.load(os.path.join(MODELS_DIR, "knn_archetype.pkl"))
-knn_scaler    = joblib.load(os.path.join(MODELS_DIR, "knn_scaler.pkl"))
-knn_house_ids = joblib.load(os.path.join(MODELS_DIR, "knn_house_ids.pkl"))
-knn_features  = joblib.load(os.path.join(MODELS_DIR, "knn_features.pkl"))
+def _joblib_loader(filename: str):
+    def _load():
+        import joblib  # pulls in its parallel backends; deferred until a model is needed
+        return joblib.load(os.path.join(MODELS_DIR, filename))
+    return _load
+
+def _load_lstm():
+    """NumPy forecaster when the weight export exists, Keras (TensorFlow) otherwise."""
+    weights_path = os.path.join(MODELS_DIR, LSTM_WEIGHTS_FILE)
+    if os.path.exists(weights_path):
+        return NumpyForecaster.load(weights_path)
+    tf = configure_tensorflow()
+    return tf.keras.models.load_model(os.path.join(MODELS_DIR, "lstm_forecaster.keras"))
+
+def _load_flat_forest():
+    """
+    Prefers the exported node arrays; otherwise, or when the export was made
+    for a different bill_feats column order, compiles the pickled forest.
+    """
+    flat_path = os.path.join(MODELS_DIR, FLAT_FOREST_FILE)
+    try:
+        if os.path.exists(flat_path):
+            flat = FlatForest.load(flat_path)
+            if flat.feature_names == list(registry.get("bill_feats")):
+                return flat
+            print(f"[WARN] {FLAT_FOREST_FILE} features do not match bill_features.pkl "
+                  f"(stale export?); compiling the pickled forest instead")
+        return FlatForest.from_sklearn(registry.get("rf_model"), registry.get("bill_feats"))
+    except Exception as e:
+        print(f"[WARN] Flat forest unavailable, using sklearn predict: {e}")
+        return None
+
+def _load_seed_table():
+    """Memory-mapped seed tensor built by `export_models.py seeds`; None if not exported."""
+    if not os.path.exists(os.path.join(MODELS_DIR, SEED_TABLE_FILE)):
+        return None
+    try:
+        return SeedTable.load(MODELS_DIR)
+    except Exception as e:
+        print(f"[WARN] Seed table unavailable, reading seeds from Firestore: {e}")
+        return None
+
+def _load_knn_index():
+    """Prefers the exported index arrays; otherwise builds them from the KNN pickles."""
+    index_path = os.path.join(MODELS_DIR, ARCHETYPE_INDEX_FILE)
+    try:
+        if os.path.exists(index_path):
+            return ArchetypeIndex.load(index_path, KNN_MEMO_SIZE)
+        return ArchetypeIndex.from_sklearn(registry.get("knn_model"), registry.get("knn_scaler"),
+                                           registry.get("knn_house_ids"), registry.get("knn_features"),
+                                           KNN_MEMO_SIZE)
+    except Exception as e:
+        print(f"[WARN] Archetype index unavailable, using sklearn kneighbors: {e}")
+        return None
+
+def _load_forecast_table():
+    """Precomputed curves built by `export_models.py forecasts`; None if not exported."""
+    if not os.path.exists(os.path.join(MODELS_DIR, FORECAST_TABLE_FILE)):
+        return None
+    try:
+        return ForecastTable.load(MODELS_DIR)
+    except Exception as e:
+        print(f"[WARN] Forecast table unavailable, using the live LSTM: {e}")
+        return None
+
+registry.register("rf_model",      _joblib_loader("rf_bill_predictor.pkl"))
+registry.register("bill_feats",    _joblib_loader("bill_features.pkl"))
+registry.register("rf_flat",       _load_flat_forest)
+registry.register("lstm_model",    _load_lstm)
+registry.register("lstm_scaler",   _joblib_loader("lstm_scaler.pkl"))
+registry.register("knn_model",     _joblib_loader("knn_archetype.pkl"))
+registry.register("knn_scaler",    _joblib_loader("knn_scaler.pkl"))
+registry.register("knn_house_ids", _joblib_loader("knn_house_ids.pkl"))
+registry.register("knn_features",  _joblib_loader("knn_features.pkl"))
+registry.register("knn_index",     _load_knn_index)
+registry.register("seed_table",    _load_seed_table)
+registry.register("forecast_table", _load_forecast_table)
+
+# Order used by warm-up: cheapest and most-used artifacts first
+WARMUP_ORDER = ["bill_feats", "rf_flat", "knn_features", "knn_scaler", "knn_model",
+                "knn_house_ids", "knn_index", "forecast_table", "seed_table", "lstm_scaler", "lstm_model"]
+
+def __getattr__(name):
+    # Keeps `from core.ml_predictor import rf_model` working; loads on first access
+    try:
+        return registry.get(name)
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
 
 with open(os.path.join(MODELS_DIR, "seasonal_coefficients.json")) as f:
     _raw = json.load(f)
     SEASONAL_COEFFICIENTS = {int(k): tuple(v) for k, v in _raw.items()}
 
+# ─────────────────────────────────────────
+#  RANDOM FOREST INFERENCE
+# ─────────────────────────────────────────
+def predict_rf_kwh(pairs, physics_list=None) -> np.ndarray:
+    """RF monthly kWh for N (profile, month) pairs in one forest call."""
+    X = build_feature_matrix(pairs, registry.get("bill_feats"), physics_list)
+    rf_flat = registry.get("rf_flat")
+    if rf_flat is not None:
+        return rf_flat.predict(X)
+    # The forest was fitted on a DataFrame; X is a plain array in bill_feats order
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return np.asarray(registry.get("rf_model").predict(X), dtype=np.float64)
+
+# ─────────────────────────────────────────
+#  LSTM INFERENCE
+# ─────────────────────────────────────────
+def predict_lstm(seeds) -> np.ndarray:
+    """
+    24h forecasts for a batch of unscaled (48, n_features) seed windows.
+    Returns an array of shape (batch, 24).
+    """
+    seeds  = np.asarray(seeds, dtype=np.float64)
+    if seeds.ndim == 2:
+        seeds = seeds[None]
+    batch, steps, n_feat = seeds.shape
+    scaled = registry.get("lstm_scaler").transform(seeds.reshape(-1, n_feat))
+    scaled = np.reshape(scaled, (batch, steps, n_feat))
+    return np.asarray(registry.get("lstm_model").predict(scaled, verbose=0))
+
+lstm_batcher = MicroBatcher(predict_lstm, LSTM_BATCH_MAX_SIZE, LSTM_BATCH_MAX_WAIT_MS, name="lstm-batcher")
+
+def forecast_curve(seed) -> np.ndarray:
+    """Raw 24h curve for one (48, n_features) seed; concurrent callers share a forward pass."""
+    if LSTM_MICRO_BATCHING:
+        return lstm_batcher(seed)
+    return predict_lstm(seed)[0]
+
+def forecast_curves(seeds) -> np.ndarray:
+    """(B, 24) curves for stacked seeds; with micro-batching they are queued into one shared pass."""
+    if LSTM_MICRO_BATCHING:
+        futures = [lstm_batcher.submit(seed) for seed in seeds]
+        return np.stack([f.result() for f in futures])
+    return predict_lstm(seeds)
+
 # ─────────────────────────────────────────
 #  KNN ARCHETYPE & LSTM SEEDS
 # ─────────────────────────────────────────
+def archetype_features(user_data: dict) -> list:
+    """Appliance-count vector of a profile in knn_features order."""
+    feature_map = {
+        'No_of_ACs':            safe_get(user_data, 'ac_qty'),
+        'No_of_Refrigerators':  safe_get(user_data, 'f_qty'),
+        'No_of_People':         safe_get(user_data, 'person_count', 4),
+        'No_of_UPS':            safe_get(user_data, 'u_qty'),
+        'No_of_Fans':           safe_get(user_data, 'fan_qty') or safe_get(user_data, 'person_count', 4) * 2,
+        'No_of_WashingMachines': safe_get(user_data, 'wm_qty', 1),
+    }
+    return [feature_map.get(f, 0) for f in registry.get("knn_features")]
+
+def _sklearn_archetypes(user_vecs) -> list:
+    user_scaled = registry.get("knn_scaler").transform(np.asarray(user_vecs))
+    _, idxs     = registry.get("knn_model").kneighbors(user_scaled)
+    house_ids   = registry.get("knn_house_ids")
+    return [house_ids[row[0]] for row in idxs]
+
+# Used when KNN matching fails; never cached, so the next request retries the match
+FALLBACK_ARCHETYPE = "House1"
+
+def _match_archetype(user_data: dict) -> str:
+    user_vec = archetype_features(user_data)
+    index = registry.get("knn_index")
+    if index is not None:
+        return index.nearest_one(user_vec)
+    return _sklearn_archetypes([user_vec])[0]
+
+def _match_neighbors(user_data: dict, k: int) -> tuple:
+    user_vec = archetype_features(user_data)
+    index = registry.get("knn_index")
+    if index is not None:
+        dists, idxs = index.kneighbors([user_vec], k)
+        return [index.house_ids[i] for i in idxs[0]], dists[0]
+    user_scaled = registry.get("knn_scaler").transform(np.asarray([user_vec]))
+    dists, idxs = registry.get("knn_model").kneighbors(user_scaled, n_neighbors=k)
+    house_ids   = registry.get("knn_house_ids")
+    return [house_ids[i] for i in idxs[0]], np.asarray(dists[0], dtype=np.float64)
+
 def find_archetype_house(user_data: dict) -> str:
     try:
-        feature_map = {
-            'No_of_ACs':            safe_get(user_data, 'ac_qty'),
-            'No_of_Refrigerators':  safe_get(user_data, 'f_qty'),
-            'No_of_People':         safe_get(user_data, 'person_count', 4),
-            'No_of_UPS':            safe_get(user_data, 'u_qty'),
-            'No_of_Fans':           safe_get(user_data, 'fan_qty') or safe_get(user_data, 'person_count', 4) * 2,
-            'No_of_WashingMachines': safe_get(user_data, 'wm_qty', 1),
-        }
-        user_vec    = np.array([[feature_map.get(f, 0) for f in knn_features]])
-        user_scaled = knn_scaler.transform(user_vec)
-        _, idxs     = knn_model.kneighbors(user_scaled)
-        return knn_house_ids[idxs[0][0]]
+        return _match_archetype(user_data)
     except Exception as e:
         print(f"[WARN] KNN failed: {e}")
-        return "House1"
+        return FALLBACK_ARCHETYPE
 
-def _synthetic_seed(user_mean: float, current_month: int) -> np.ndarray:
-    seed = np.zeros((48, len(LSTM_FEATURES)))
-    ac_scale = get_seasonal_ac_scale(current_month)
-    
-    # Simple sinusoids mimicking domestic patterns in Pakistan
-    for i in range(48):
-        h = i % 24
-        hs, hc = encode_cyclical(h, 24)
-        ms, mc = encode_cyclical(current_month, 12)
-        
-        # Diurnal distribution peaks: afternoon AC (14:00) + evening baseline (20:00)
-        peak = 0.4 + 0.5 * np.exp(-0.5 * ((h - 8) / 3)**2) + 0.4 * np.exp(-0.5 * ((h - 20) / 3)**2)
-        use  = user_mean * peak
-        seed[i] = [use, use * 0.4 * ac_scale, use * 0.05, hs, hc, 0.0, 1.0, ms, mc, 0.0]
-    return seed
+def find_archetype_neighbors(user_data: dict, k: int) -> tuple:
+    """(house ids, distances) of the k nearest PRECON houses, nearest first."""
+    try:
+        return _match_neighbors(user_data, k)
+    except Exception as e:
+        print(f"[WARN] KNN failed: {e}")
+        return [FALLBACK_ARCHETYPE], np.zeros(1)
 
-def get_lstm_seed(house_id: str, user_mean: float, month: int) -> np.ndarray:
+def find_archetype_houses(users: list) -> list:
+    """Nearest PRECON house for each profile, matched in one distance computation."""
+    if not users:
+        return []
     try:
-        doc_id  = f"{house_id}_month_{month}"
-        doc_ref = db.collection("lstm_seeds").document(doc_id).get()
- 
-        if not doc_ref.exists:
-            raise ValueError(f"Seed document not found: {doc_id}")
- 
-        seed_data = doc_ref.to_dict()
-        flat      = seed_data["data"]
-        rows      = seed_data.get("rows", 48)
-        cols      = seed_data.get("cols", len(LSTM_FEATURES))
-        matrix    = np.array(flat, dtype=np.float32).reshape(rows, cols)
- 
-        if matrix.shape != (48, len(LSTM_FEATURES)):
-            raise ValueError(f"Unexpected shape: {matrix.shape}")
- 
-        house_mean = matrix[:, 0].mean()
-        if house_mean > 0:
-            sf = user_mean / house_mean
-            matrix[:, 0] *= sf
-            matrix[:, 1] *= sf
-            matrix[:, 2] *= sf
- 
-        ms, mc = encode_cyclical(month, 12)
-        matrix[:, 7] = ms
-        matrix[:, 8] = mc
- 
-        return matrix
- 
+        user_vecs = [archetype_features(u) for u in users]
+        index = registry.get("knn_index")
+        if index is not None:
+            return index.nearest(user_vecs)
+        return _sklearn_archetypes(user_vecs)
     except Exception as e:
-        print(f"[WARN] Firestore seed read failed ({house_id}, month {month}): {e}")
-        print(f"[WARN] Falling back to synthetic seed")
-        return _synthetic_seed(user_mean, month)
+        print(f"[WARN] KNN failed: {e}")
+        return [FALLBACK_ARCHETYPE] * len(users)
+
+# Hour-of-day terms shared by every synthetic seed (48 rows = two days)
+_SYN_HOURS = np.arange(48) % 24
+_SYN_HOUR_SIN, _SYN_HOUR_COS = encode_cyclical(_SYN_HOURS, 24)
+
+# Diurnal distribution peaks: afternoon AC (14:00) + evening baseline (20:00)
+_SYN_PEAK = (0.4 + 0.5 * np.exp(-0.5 * ((_SYN_HOURS - 8) / 3)**2)
+                 + 0.4 * np.exp(-0.5 * ((_SYN_HOURS - 20) / 3)**2))
+
+def synthetic_seeds(user_means, months) -> np.ndarray:
+    """
+    Synthetic (N, 48, n_features) seeds for N (user_mean, month) pairs.
+    Simple sinusoids mimicking domestic patterns in Pakistan.
+    """
+    user_means = np.asarray(user_means, dtype=np.float64).reshape(-1)
+    months     = np.asarray(months, dtype=np.int64).reshape(-1)
+    ac_scale   = np.array([get_seasonal_ac_scale(int(m)) for m in months], dtype=np.float64)
+    ms, mc     = encode_cyclical(months, 12)
+
+    use  = user_means[:, None] * _SYN_PEAK[None, :]
+    seed = np.zeros((len(user_means), 48, len(LSTM_FEATURES)))
+    seed[:, :, 0] = use
+    seed[:, :, 1] = use * 0.4 * ac_scale[:, None]
+    seed[:, :, 2] = use * 0.05
+    seed[:, :, 3] = _SYN_HOUR_SIN
+    seed[:, :, 4] = _SYN_HOUR_COS
+    seed[:, :, 6] = 1.0
+    seed[:, :, 7] = ms[:, None]
+    seed[:, :, 8] = mc[:, None]
+    return seed
+
+def _synthetic_seed(user_mean: float, current_month: int) -> np.ndarray:
+    return synthetic_seeds([user_mean], [current_month])[0]
+
+def rescale_seeds(seeds, user_means, months) -> np.ndarray:
+    """
+    In-place: scales the usage/AC/fridge channels of each raw PRECON window
+    to the user's mean hourly load and stamps the target month encoding.
+    """
+    seeds = np.asarray(seeds)
+    house_means = np.ascontiguousarray(seeds[:, :, 0]).mean(axis=1)
+    for i, (user_mean, house_mean) in enumerate(zip(user_means, house_means)):
+        if house_mean > 0:
+            seeds[i, :, :3] *= user_mean / house_mean
+    ms, mc = encode_cyclical(np.asarray(months, dtype=np.int64), 12)
+    seeds[:, :, 7] = np.reshape(ms, (-1, 1))
+    seeds[:, :, 8] = np.reshape(mc, (-1, 1))
+    return seeds
+
+def _raw_seed(house_id: str, month: int) -> np.ndarray:
+    """Unscaled PRECON window: seed table first, Firestore `lstm_seeds` otherwise."""
+    table = registry.get("seed_table")
+    if table is not None:
+        matrix = table.lookup(house_id, month)
+        if matrix is not None:
+            return matrix
+
+    doc_id    = f"{house_id}_month_{month}"
+    seed_data = get_seed_doc(doc_id)
+    if seed_data is None:
+        raise ValueError(f"Seed document not found: {doc_id}")
+
+    flat   = seed_data["data"]
+    rows   = seed_data.get("rows", 48)
+    cols   = seed_data.get("cols", len(LSTM_FEATURES))
+    matrix = np.array(flat, dtype=np.float32).reshape(rows, cols)
+
+    if matrix.shape != (48, len(LSTM_FEATURES)):
+        raise ValueError(f"Unexpected shape: {matrix.shape}")
+    return matrix
+
+def _archetype_seeds(house_ids: list, user_mean: float, month: int) -> tuple:
+    """
+    (seeds, from_precon) for several archetypes at one user mean: readable
+    PRECON windows are rescaled in one call, synthetic seeds fill the rest.
+    """
+    raws, from_precon = [], []
+    for house_id in house_ids:
+        try:
+            raws.append(_raw_seed(house_id, month))
+            from_precon.append(True)
+        except Exception as e:
+            print(f"[WARN] Seed read failed ({house_id}, month {month}): {e}")
+            print(f"[WARN] Falling back to synthetic seed")
+            from_precon.append(False)
+
+    seeds   = np.empty((len(house_ids), 48, len(LSTM_FEATURES)))
+    precon  = np.array(from_precon, dtype=bool)
+    n_synth = len(house_ids) - len(raws)
+    if raws:
+        seeds[precon] = rescale_seeds(np.stack(raws), [user_mean] * len(raws), [month] * len(raws))
+    if n_synth:
+        seeds[~precon] = synthetic_seeds([user_mean] * n_synth, [month] * n_synth)
+    return seeds, from_precon
+
+def _lstm_seed(house_id: str, user_mean: float, month: int) -> tuple:
+    """(seed, from_precon): synthetic fallback when the PRECON window cannot be read."""
+    seeds, from_precon = _archetype_seeds([house_id], user_mean, month)
+    return seeds[0], from_precon[0]
+
+def get_lstm_seed(house_id: str, user_mean: float, month: int) -> np.ndarray:
+    return _lstm_seed(house_id, user_mean, month)[0]
+
+# Raw curves are shared by every user of an archetype with a similar mean load
+forecast_cache = TTLCache(maxsize=FORECAST_CACHE_SIZE, ttl=FORECAST_CACHE_TTL)
+
+def forecast_raw_curves(house_ids: list, user_mean: float, month: int) -> np.ndarray:
+    """
+    Unscaled 24h LSTM curves, shape (len(house_ids), 24), for archetype seeds
+    at one user mean. Interpolated from the precomputed forecast table when
+    the house-month is in it (unless FORECAST_EXACT); otherwise the live
+    model, cached per (house, month, user_mean rounded to FORECAST_MEAN_STEP).
+    All remaining houses are seeded and forecast as one batch. Curves from
+    synthetic fallback seeds are not cached.
+    """
+    curves = [None] * len(house_ids)
+    table = None if FORECAST_EXACT else registry.get("forecast_table")
+    if table is not None:
+        curves = [table.lookup(house_id, month, user_mean) for house_id in house_ids]
+
+    cached = FORECAST_MEAN_STEP > 0
+    step = int(round(user_mean / FORECAST_MEAN_STEP)) if cached else None
+    if cached:
+        curves = [c if c is not None else forecast_cache.get((house_id, int(month), step))
+                  for house_id, c in zip(house_ids, curves)]
+
+    misses = [i for i, c in enumerate(curves) if c is None]
+    if misses:
+        seed_mean = step * FORECAST_MEAN_STEP if cached else user_mean
+        seeds, from_precon = _archetype_seeds([house_ids[i] for i in misses], seed_mean, month)
+        for i, curve, precon in zip(misses, forecast_curves(seeds), from_precon):
+            curve = np.asarray(curve)
+            if cached and precon:
+                curve.setflags(write=False)
+                forecast_cache.set((house_ids[i], int(month), step), curve)
+            curves[i] = curve
+    return np.stack(curves)
+
+def forecast_raw_curve(house_id: str, user_mean: float, month: int) -> np.ndarray:
+    """Unscaled 24h LSTM curve for one archetype seed (see forecast_raw_curves)."""
+    return forecast_raw_curves([house_id], user_mean, month)[0]
+
+def blend_archetype_curves(curves, distances) -> tuple:
+    """
+    Inverse-distance blend of K archetype curves, each first normalized to
+    a unit daily total. Returns (blended shape, per-hour weighted standard
+    deviation of the K shapes around it, weights).
+    """
+    curves  = np.asarray(curves, dtype=np.float64)
+    sums    = curves.sum(axis=1, keepdims=True)
+    shapes  = np.divide(curves, sums, out=np.zeros_like(curves), where=sums > 0)
+    weights = 1.0 / (np.asarray(distances, dtype=np.float64) + ARCHETYPE_BLEND_EPS)
+    weights /= weights.sum()
+    blend   = weights @ shapes
+    spread  = np.sqrt(weights @ (shapes - blend) ** 2)
+    return blend, spread, weights
 
 # ─────────────────────────────────────────
 #  HYBRID ML BLENDING
 # ─────────────────────────────────────────
-def _get_calibration(u: dict) -> tuple:
+def _get_calibration(u: dict, physics_for_month=None) -> tuple:
+    physics_for_month = physics_for_month or (lambda m: compute_true_baseload(u, m))
     valid = [b for b in u.get('bill_history', [])
              if float(b.get('units', 0)) > 5 and b.get('month')]
     sorted_hist = sorted(valid, key=lambda x: x['month'])
@@ -112,7 +410,7 @@ def _get_calibration(u: dict) -> tuple:
     for entry in sorted_hist[-6:]:
         try:
             h_month = int(entry['month'].split('-')[1])
-            physics_h = compute_true_baseload(u, h_month)
+            physics_h = physics_for_month(h_month)
             if physics_h['total'] > 5:
                 f = float(entry['units']) / physics_h['total']
                 f = max(0.50, min(2.00, f))
@@ -131,9 +429,9 @@ def _get_calibration(u: dict) -> tuple:
     confidence = 'high' if n >= 6 else 'medium' if n >= 3 else 'low'
     return round(cal_factor, 4), confidence, n
 
-def calculate_hybrid_units(u: dict, physics: dict, rf_kwh: float, month: int) -> float:
+def calculate_hybrid_units(u: dict, physics: dict, rf_kwh: float, month: int, calibration: tuple = None) -> float:
     physics_kwh = physics['total']
-    cal_factor, confidence, n_months = _get_calibration(u)
+    cal_factor, confidence, n_months = calibration or _get_calibration(u)
  
     calibrated = physics_kwh * cal_factor
  
@@ -148,10 +446,154 @@ def calculate_hybrid_units(u: dict, physics: dict, rf_kwh: float, month: int) ->
  
     return round(max(final, physics_kwh * 0.40), 2)
 
-def get_blend_weights(u: dict, month: int) -> dict:
-    _, confidence, n = _get_calibration(u)
+def get_blend_weights(u: dict, month: int, calibration: tuple = None) -> dict:
+    _, confidence, n = calibration or _get_calibration(u)
     RF_DAMP = {'none': 0.20, 'low': 0.12, 'medium': 0.08, 'high': 0.04}
     rf_w    = RF_DAMP[confidence]
     hist_w  = {'none': 0.0, 'low': 0.30, 'medium': 0.45, 'high': 0.60}[confidence]
     phys_w  = round(1.0 - rf_w - hist_w, 2)
     return {"physics": phys_w, "rf": rf_w, "history": hist_w}
+
+# ─────────────────────────────────────────
+#  PER-USER COMPUTATION CACHE
+# ─────────────────────────────────────────
+# Dashboards fire predict/forecast/seasonal/chat back-to-back for the same
+# user; everything below depends only on the user document (+ month), so it
+# is keyed by the document's content hash and tagged with the uid.
+profile_cache = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+# Physics months and calibration are keyed by the hash of only the fields
+# they read, so they outlive profile writes that do not touch those fields
+# (a new bill entry costs one physics month at most, a renamed user none).
+# Content-addressed: nothing here needs invalidating on writes.
+physics_cache = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+_PHYSICS_FIELDS = tuple(PROFILE_NUMERIC_FIELDS) + tuple(PROFILE_TEXT_FIELDS)
+
+def physics_key(u: dict) -> str:
+    """Hash of the fields compute_true_baseload reads (absent and None differ for some lookups)."""
+    return profile_hash({k: u[k] for k in _PHYSICS_FIELDS if k in u})
+
+def get_physics_months(u: dict, months: list, pkey: str = None, store: bool = True) -> list:
+    """Memoized compute_true_baseload for several months of one profile."""
+    return physics_for_pairs([(u, m) for m in months], [pkey] * len(months), store)
+
+def get_calibration(u: dict, store: bool = True) -> tuple:
+    """
+    (factor, confidence, n) once per (physics inputs, bill_history) version.
+    History months reuse memoized physics, so appending a bill entry only
+    evaluates that entry's month if it was never needed before.
+    """
+    pkey = physics_key(u)
+    ckey = (pkey, profile_hash({"bill_history": u.get('bill_history', [])}), "calibration")
+    calibration = physics_cache.get(ckey)
+    if calibration is None:
+        calibration = _get_calibration(u, lambda m: get_physics_months(u, [m], pkey, store)[0])
+        if store:
+            physics_cache.set(ckey, calibration)
+    return calibration
+
+def get_archetype(u: dict, uid: str = None, key: str = None) -> str:
+    key = key or profile_hash(u)
+    try:
+        return profile_cache.get_or_compute((key, "archetype"), lambda: _match_archetype(u), tag=uid)
+    except Exception as e:
+        print(f"[WARN] KNN failed: {e}")
+        return FALLBACK_ARCHETYPE
+
+def get_archetype_neighbors(u: dict, k: int, uid: str = None, key: str = None) -> tuple:
+    key = key or profile_hash(u)
+    try:
+        return profile_cache.get_or_compute((key, "archetypes", k), lambda: _match_neighbors(u, k), tag=uid)
+    except Exception as e:
+        print(f"[WARN] KNN failed: {e}")
+        return [FALLBACK_ARCHETYPE], np.zeros(1)
+
+def estimate_months(u: dict, months: list, uid: str = None, key: str = None) -> list:
+    """
+    Physics breakdown, RF kWh and hybrid units for each requested month.
+    Cached months are reused; all misses go through the forest in one call.
+    Returns one {"physics", "rf_kwh", "units"} dict per month, in order.
+    Cached dicts are shared, so callers must not mutate them.
+    """
+    return estimate_batch([(u, months, uid, key)])[0]
+
+# Below this many (profile, month) pairs the dict-at-a-time physics is faster
+_COLUMNAR_MIN_PAIRS = 32
+
+def _compute_physics(pairs: list) -> list:
+    if len(pairs) < _COLUMNAR_MIN_PAIRS:
+        return [compute_true_baseload(u, m) for u, m in pairs]
+    rows = {}
+    for u, _ in pairs:
+        rows.setdefault(id(u), (len(rows), u))
+    table = profile_table([u for _, u in rows.values()])
+    index = np.array([rows[id(u)][0] for u, _ in pairs])
+    columns = compute_true_baseload_batch(table[index], np.array([[m] for _, m in pairs]))
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*(columns[k][:, 0].tolist() for k in keys))]
+
+def physics_for_pairs(pairs: list, pkeys: list = None, store: bool = True) -> list:
+    """
+    compute_true_baseload for N (profile, month) pairs through the physics
+    memo; misses are evaluated columnar when there are enough of them.
+    """
+    pkeys = list(pkeys) if pkeys is not None else [None] * len(pairs)
+    by_profile = {}
+    results, missing = [None] * len(pairs), []
+    for i, (u, m) in enumerate(pairs):
+        pkey = pkeys[i] or by_profile.get(id(u)) or physics_key(u)
+        by_profile[id(u)] = pkeys[i] = pkey
+        results[i] = physics_cache.get((pkey, "physics", m))
+        if results[i] is None:
+            missing.append(i)
+
+    if missing:
+        for i, physics in zip(missing, _compute_physics([pairs[i] for i in missing])):
+            results[i] = physics
+            if store:
+                physics_cache.set((pkeys[i], "physics", pairs[i][1]), physics)
+    return results
+
+def estimate_batch(items: list, cache: bool = True) -> list:
+    """
+    estimate_months for many profiles: `items` are (u, months, uid, key)
+    tuples (uid/key may be None). Uncached (profile, month) pairs of ALL
+    profiles share a single forest call. Returns one estimate list per item.
+    With cache=False the caches are read but not written, so bulk scoring
+    does not evict the entries of interactive users.
+    """
+    plans, pending = [], []
+    for u, months, uid, key in items:
+        key = key or profile_hash(u)
+        found = {}
+        for m in dict.fromkeys(months):
+            hit = profile_cache.get((key, "month", m))
+            if hit is None:
+                pending.append((len(plans), m))
+            else:
+                found[m] = hit
+        plans.append((u, months, uid, key, found))
+
+    if pending:
+        pairs        = [(plans[i][0], m) for i, m in pending]
+        physics_list = physics_for_pairs(pairs, store=cache)
+        rf_values    = predict_rf_kwh(pairs, physics_list)
+        calibrations = {}
+        for (i, m), physics, rf_kwh in zip(pending, physics_list, rf_values):
+            u, _, uid, key, found = plans[i]
+            if i not in calibrations:
+                calibrations[i] = get_calibration(u, store=cache)
+            est = {
+                "physics": physics,
+                "rf_kwh":  float(rf_kwh),
+                "units":   calculate_hybrid_units(u, physics, float(rf_kwh), m, calibrations[i]),
+            }
+            if cache:
+                profile_cache.set((key, "month", m), est, tag=uid)
+            found[m] = est
+    return [[found[m] for m in months] for _, months, _, _, found in plans]
+
+def invalidate_profile(uid: str) -> int:
+    """Drops every cached computation derived from this user's document."""
+    return profile_cache.invalidate_tag(uid)
@@ -0,0 +1,85 @@
+import threading
+import time
+
+# ─────────────────────────────────────────
+#  LAZY MODEL REGISTRY
+# ─────────────────────────────────────────
+# Every model artifact is registered with a loader and only read from disk
+# the first time a route asks for it, so a fresh worker can serve profile
+# writes and NEPRA simulations immediately. Warm-up can be triggered in a
+# background thread once the worker is accepting traffic.
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._models  = {}
+        self._timings = {}
+        self._errors  = {}
+        self._locks   = {}
+        self._guard   = threading.Lock()
+
+    def register(self, name: str, loader) -> None:
+        with self._guard:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str):
+        try:
+            return self._models[name]
+        except KeyError:
+            pass
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under '{name}'")
+
+        # Per-artifact lock: concurrent first requests trigger exactly one load
+        with self._locks[name]:
+            if name not in self._models:
+                start = time.perf_counter()
+                try:
+                    model = self._loaders[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._timings[name] = round((time.perf_counter() - start) * 1000, 2)
+                self._errors.pop(name, None)
+                self._models[name] = model
+        return self._models[name]
+
+    def warm(self, names=None, background: bool = True):
+        """Loads the given (default: all) artifacts, optionally in a daemon thread."""
+        targets = list(names) if names is not None else list(self._loaders)
+
+        def _run():
+            for name in targets:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"[WARN] Model warm-up failed for '{name}': {e}")
+
+        if not background:
+            _run()
+            return None
+        thread = threading.Thread(target=_run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def unload(self, name: str) -> None:
+        with self._locks.get(name, self._guard):
+            self._models.pop(name, None)
+            self._timings.pop(name, None)
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "loaded":  name in self._models,
+                "load_ms": self._timings.get(name),
+                "error":   self._errors.get(name),
+            }
+            for name in self._loaders
+        }
+
+
+registry = ModelRegistry()
@@ -11,6 +11,7 @@ from config import (
     WM_LOAD_KW,
     ROUTINE_FACTORS
 )
+from utils.rounding import round_like_python
 
 # Load seasonal coefficients
 coefficients_path = os.path.join(MODELS_DIR, "seasonal_coefficients.json")
@@ -140,3 +141,117 @@ def compute_true_baseload(u: dict, month: int) -> dict:
         "washing":       round(wm_kwh, 2),
         "iron":          round(iron_kwh, 2),
     }
+
+
+# ─────────────────────────────────────────
+#  COLUMNAR BASELOAD (N profiles × M months)
+# ─────────────────────────────────────────
+# Numeric profile fields read by compute_true_baseload, with safe_get defaults
+PROFILE_NUMERIC_FIELDS = {
+    "person_count": 1.0,  "property_area": 500.0,
+    "fan_ac_qty": 0.0,    "fan_dc_qty": 0.0,
+    "ac_std_qty": 0.0,    "ac_std_val": 0.0,   "ac_inv_qty": 0.0,  "ac_inv_val": 0.0,
+    "f_qty": 0.0,
+    "wp_type": 1.0,       "wp_freq": 30.0,     "wp_qty": 0.0,      "wp_val": 0.0,
+    "k_freq": 30.0,       "k_qty": 0.0,        "k_val": 0.0,
+    "wm_freq": 4.3,       "wm_qty": 0.0,       "wm_val": 0.0,
+    "u_freq": 30.0,       "u_qty": 0.0,        "u_val": 0.0,
+    "iron_freq": 4.3,     "iron_qty": 0.0,     "iron_val": 0.0,
+}
+# Categorical fields, stored as strings (missing/None fall back like the dict lookups)
+PROFILE_TEXT_FIELDS = {"disco": "K-Electric", "f_type": "", "wm_type": "manual"}
+
+# Month-indexed lookup tables; index 0 and out-of-range months take the dict defaults
+_AC_SCALE_BY_MONTH = np.array([SEASONAL_AC_SCALE.get(m, 0.5) for m in range(13)], dtype=np.float64)
+_FAN_HOURS_BY_MONTH = np.array([FAN_DAILY_HOURS.get(m, 8) for m in range(13)], dtype=np.float64)
+_AC_SCALE_BY_MONTH[0], _FAN_HOURS_BY_MONTH[0] = 0.5, 8
+
+
+def profile_table(profiles: list) -> np.ndarray:
+    """Structured array (one row per user document) of every field compute_true_baseload reads."""
+    dtype = ([(name, np.float64) for name in PROFILE_NUMERIC_FIELDS] +
+             [(name, "U32") for name in PROFILE_TEXT_FIELDS])
+    table = np.empty(len(profiles), dtype=dtype)
+    for name, default in PROFILE_NUMERIC_FIELDS.items():
+        table[name] = [safe_get(u, name, default) for u in profiles]
+    for name, default in PROFILE_TEXT_FIELDS.items():
+        table[name] = [str(u.get(name, default)) for u in profiles]
+    return table
+
+
+def _lookup(values, mapping: dict, default) -> np.ndarray:
+    keys, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return np.array([mapping.get(k, default) for k in keys], dtype=np.float64)[inverse.reshape(-1)]
+
+
+def compute_true_baseload_batch(table, months) -> dict:
+    """
+    Columnar compute_true_baseload. `table` is a structured array from
+    profile_table() or a DataFrame with the same columns (missing numeric
+    columns take their defaults); `months` is (M,) for the same months for
+    every profile, or (N, M). Returns the same keys as the scalar function,
+    each an (N, M) float64 array with identical values.
+    """
+    names = table.dtype.names if isinstance(table, np.ndarray) else list(table.columns)
+    n = len(table)
+
+    def col(name):
+        if name in names:
+            return np.asarray(table[name], dtype=np.float64).reshape(n, 1)
+        return np.full((n, 1), PROFILE_NUMERIC_FIELDS[name])
+
+    def text(name):
+        if name in names:
+            return np.asarray(table[name]).astype(str)
+        return np.full(n, PROFILE_TEXT_FIELDS[name])
+
+    months = np.asarray(months, dtype=np.int64)
+    months = months.reshape(1, -1) if months.ndim == 1 else months
+    in_range = (months >= 1) & (months <= 12)
+    idx = np.where(in_range, months, 0)
+    ac_sc = _AC_SCALE_BY_MONTH[idx]
+    fan_h = _FAN_HOURS_BY_MONTH[idx]
+
+    disco = text("disco")
+    base = _lookup(disco, {k: v["base"] for k, v in DISCO_PROFILES.items()}, DISCO_DEFAULT["base"]).reshape(n, 1)
+    area_rate = _lookup(disco, {k: v["area_rate"] for k, v in DISCO_PROFILES.items()}, DISCO_DEFAULT["area_rate"]).reshape(n, 1)
+    area_cap = _lookup(disco, {k: v["area_cap"] for k, v in DISCO_PROFILES.items()}, DISCO_DEFAULT["area_cap"]).reshape(n, 1)
+
+    # ── BASELOAD ──
+    persons = np.maximum(col("person_count"), 1.0)
+    area = np.maximum(col("property_area"), 100.0)
+    p_base = persons * base
+    a_light = np.minimum(area * area_rate, area_cap)
+
+    # ── FANS ──
+    std_fans = col("fan_ac_qty")
+    std_fans = np.where(std_fans != 0, std_fans, persons)
+    inv_fans = col("fan_dc_qty")
+    fans_kwh = (std_fans * 0.080 + inv_fans * 0.035) * fan_h * 30 * 0.70
+
+    # ── AIR CONDITIONING ──
+    std_kwh = col("ac_std_qty") * 1.50 * (col("ac_std_val") * ac_sc) * 30
+    inv_kw = 0.40 + (0.35 * ac_sc)
+    inv_kwh = col("ac_inv_qty") * inv_kw * (col("ac_inv_val") * ac_sc) * 30
+    ac_kwh = std_kwh + inv_kwh
+
+    # ── FRIDGE ──
+    f_base = np.where(text("f_type") == "old", 43.0, 24.0).reshape(n, 1)
+    f_kwh = col("f_qty") * f_base * (1.0 + 0.15 * ac_sc)
+
+    # ── WATER PUMP / KITCHEN / WASHING / UPS / IRON ── (month independent)
+    wp_kwh = col("wp_qty") * (col("wp_type") * 0.746) * col("wp_val") * col("wp_freq")
+    k_kwh = col("k_qty") * 1.20 * col("k_val") * col("k_freq")
+    wm_kw = _lookup(text("wm_type"), WM_LOAD_KW, 0.35).reshape(n, 1)
+    wm_kwh = col("wm_qty") * wm_kw * col("wm_val") * col("wm_freq")
+    ups_kwh = col("u_qty") * 0.15 * col("u_val") * col("u_freq")
+    iron_kwh = col("iron_qty") * 1.00 * col("iron_val") * col("iron_freq")
+
+    total = p_base + a_light + fans_kwh + ac_kwh + f_kwh + wp_kwh + k_kwh + wm_kwh + ups_kwh + iron_kwh
+
+    parts = {
+        "total": total, "person_base": p_base, "area_lighting": a_light, "fans": fans_kwh,
+        "ac": ac_kwh, "fridge": f_kwh, "water_pump": wp_kwh, "kitchen": k_kwh,
+        "ups": ups_kwh, "washing": wm_kwh, "iron": iron_kwh,
+    }
+    return {key: round_like_python(np.broadcast_to(val, total.shape), 2) for key, val in parts.items()}
@@ -0,0 +1,71 @@
+import json
+import os
+import numpy as np
+
+# ─────────────────────────────────────────
+#  PRECOMPUTED LSTM SEED TABLE
+# ─────────────────────────────────────────
+# All PRECON seed windows (houses × 12 months × 48 h × n_features) live in
+# one float32 .npy file that is memory-mapped at boot, so a forecast seed
+# is an index read instead of a Firestore round trip. Slots whose source
+# document was missing are NaN and flagged in the sidecar index.
+
+SEED_TABLE_FILE = "lstm_seeds.npy"
+SEED_INDEX_FILE = "lstm_seeds_index.json"
+
+
+class SeedTable:
+    def __init__(self, table: np.ndarray, house_ids: list, valid: np.ndarray):
+        self.table     = table
+        self.house_ids = list(house_ids)
+        self.valid     = np.asarray(valid, dtype=bool)
+        self._row      = {h: i for i, h in enumerate(self.house_ids)}
+
+    @classmethod
+    def load(cls, models_dir: str, mmap: bool = True) -> "SeedTable":
+        table = np.load(os.path.join(models_dir, SEED_TABLE_FILE), mmap_mode="r" if mmap else None)
+        with open(os.path.join(models_dir, SEED_INDEX_FILE)) as f:
+            index = json.load(f)
+        if table.shape[:2] != (len(index["house_ids"]), 12):
+            raise ValueError(f"Seed table shape {table.shape} does not match its index")
+        return cls(table, index["house_ids"], index["valid"])
+
+    def __contains__(self, house_id) -> bool:
+        return house_id in self._row
+
+    def lookup(self, house_id: str, month: int):
+        """Writable float32 copy of the (48, n_features) window, or None if not exported."""
+        row = self._row.get(house_id)
+        if row is None or not self.valid[row, month - 1]:
+            return None
+        return np.array(self.table[row, month - 1], dtype=np.float32)
+
+
+def export_seed_table(fetch_doc, house_ids: list, models_dir: str, n_features: int, lookback: int = 48) -> np.ndarray:
+    """
+    Builds the seed table from `fetch_doc(doc_id) -> dict | None` (the
+    Firestore `lstm_seeds` documents) and writes the .npy + index files.
+    Returns the validity mask of shape (houses, 12).
+    """
+    house_ids = [str(h) for h in house_ids]
+    table = np.full((len(house_ids), 12, lookback, n_features), np.nan, dtype=np.float32)
+    valid = np.zeros((len(house_ids), 12), dtype=bool)
+
+    for i, house_id in enumerate(house_ids):
+        for month in range(1, 13):
+            doc = fetch_doc(f"{house_id}_month_{month}")
+            if not doc:
+                continue
+            rows = doc.get("rows", lookback)
+            cols = doc.get("cols", n_features)
+            matrix = np.asarray(doc["data"], dtype=np.float32).reshape(rows, cols)
+            if matrix.shape != (lookback, n_features):
+                continue
+            table[i, month - 1] = matrix
+            valid[i, month - 1] = True
+
+    np.save(os.path.join(models_dir, SEED_TABLE_FILE), table)
+    with open(os.path.join(models_dir, SEED_INDEX_FILE), "w") as f:
+        json.dump({"house_ids": house_ids, "valid": valid.tolist(),
+                   "shape": list(table.shape)}, f)
+    return valid
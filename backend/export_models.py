@@ -0,0 +1,126 @@
+"""
+=============================================================
+  Serving Artifact Exporter
+  FYP: AI-Powered Electricity Bill Optimization
+
+  Converts the trained models into the plain-array files the
+  API serves from, without re-running train_model.py:
+  - rf    : rf_bill_predictor.pkl   → rf_flat.npz
+  - lstm  : lstm_forecaster.keras   → lstm_weights.npz
+  - knn   : knn_archetype.pkl       → knn_index.npz
+  - seeds : Firestore lstm_seeds    → lstm_seeds.npy (+ index)
+  - forecasts : LSTM over every archetype seed × user-mean bin
+                                    → lstm_forecasts.npy (+ index)
+
+  Run from: bill-optimizer/backend/
+  Usage: python export_models.py [rf] [lstm] [knn] [seeds] [forecasts]   (default: all)
+=============================================================
+"""
+
+import os
+import sys
+import numpy as np
+
+from config import MODELS_DIR
+
+
+def export_rf():
+    import joblib
+    from core.forest import flatten_forest, FlatForest, FLAT_FOREST_FILE
+
+    rf_model   = joblib.load(os.path.join(MODELS_DIR, "rf_bill_predictor.pkl"))
+    bill_feats = joblib.load(os.path.join(MODELS_DIR, "bill_features.pkl"))
+    arrays     = flatten_forest(rf_model, bill_feats)
+    out_path   = os.path.join(MODELS_DIR, FLAT_FOREST_FILE)
+    np.savez(out_path, **arrays)
+
+    probe = np.random.default_rng(0).uniform(0, 500, size=(256, len(bill_feats)))
+    diff  = np.abs(FlatForest(arrays).predict(probe) - rf_model.predict(probe)).max()
+    print(f"  ✅  Saved: {out_path}  (max |flat - sklearn| = {diff:.2e} kWh)")
+
+
+def export_lstm():
+    from config import configure_tensorflow
+    from core.lstm_runtime import export_keras_weights, NumpyForecaster, LSTM_WEIGHTS_FILE
+
+    tf       = configure_tensorflow()
+    model    = tf.keras.models.load_model(os.path.join(MODELS_DIR, "lstm_forecaster.keras"))
+    out_path = os.path.join(MODELS_DIR, LSTM_WEIGHTS_FILE)
+    export_keras_weights(model, out_path)
+
+    probe = np.random.default_rng(0).normal(size=(16,) + tuple(model.input_shape[1:])).astype(np.float32)
+    diff  = np.abs(NumpyForecaster.load(out_path).predict(probe) - model.predict(probe, verbose=0)).max()
+    print(f"  ✅  Saved: {out_path}  (max |numpy - keras| = {diff:.2e} kW)")
+
+
+def export_knn():
+    import joblib
+    from core.archetype import ArchetypeIndex, ARCHETYPE_INDEX_FILE
+
+    knn_model  = joblib.load(os.path.join(MODELS_DIR, "knn_archetype.pkl"))
+    knn_scaler = joblib.load(os.path.join(MODELS_DIR, "knn_scaler.pkl"))
+    house_ids  = joblib.load(os.path.join(MODELS_DIR, "knn_house_ids.pkl"))
+    features   = joblib.load(os.path.join(MODELS_DIR, "knn_features.pkl"))
+    index      = ArchetypeIndex.from_sklearn(knn_model, knn_scaler, house_ids, features)
+    out_path   = os.path.join(MODELS_DIR, ARCHETYPE_INDEX_FILE)
+    index.save(out_path)
+
+    # Ball-tree ties may resolve to another house at the same distance
+    probe = np.random.default_rng(0).integers(0, 8, size=(512, len(features))).astype(np.float64)
+    sk_dist, _ = knn_model.kneighbors(knn_scaler.transform(probe), n_neighbors=1)
+    diff = np.abs(ArchetypeIndex.load(out_path).kneighbors(probe)[0] - sk_dist).max()
+    print(f"  ✅  Saved: {out_path}  ({len(index.house_ids)} houses, max |nearest distance diff| = {diff:.2e})")
+
+
+def export_seeds():
+    import joblib
+    from config import LSTM_FEATURES
+    from core.firebase import get_seed_doc
+    from core.seeds import export_seed_table, SEED_TABLE_FILE
+
+    house_ids = joblib.load(os.path.join(MODELS_DIR, "knn_house_ids.pkl"))
+    valid = export_seed_table(get_seed_doc, house_ids, MODELS_DIR, len(LSTM_FEATURES))
+    print(f"  ✅  Saved: {os.path.join(MODELS_DIR, SEED_TABLE_FILE)}  "
+          f"({int(valid.sum())}/{valid.size} house-months present)")
+
+
+def export_forecasts():
+    from config import FORECAST_TABLE_BINS, FORECAST_TABLE_MIN_KW, FORECAST_TABLE_MAX_KW
+    from core.forecast_table import build_forecast_table, mean_grid, ForecastTable, FORECAST_TABLE_FILE
+    from core.ml_predictor import registry, predict_lstm, rescale_seeds, _raw_seed
+
+    def raw_seed(house_id, month):
+        try:
+            return _raw_seed(house_id, month)
+        except Exception as e:
+            print(f"  [WARN] Skipping {house_id} month {month}: {e}")
+            return None
+
+    house_ids = registry.get("knn_house_ids")
+    means     = mean_grid(FORECAST_TABLE_MIN_KW, FORECAST_TABLE_MAX_KW, FORECAST_TABLE_BINS)
+    _, valid  = build_forecast_table(raw_seed, predict_lstm, rescale_seeds, house_ids, means, MODELS_DIR)
+    out_path  = os.path.join(MODELS_DIR, FORECAST_TABLE_FILE)
+
+    # Interpolation error at bin midpoints, on the normalized (shape) curve the API scales
+    table = ForecastTable.load(MODELS_DIR)
+    rows, cols = np.nonzero(valid)
+    worst = 0.0
+    for i, m in list(zip(rows, cols))[:24]:
+        mid  = float(np.sqrt(means[len(means) // 2] * means[len(means) // 2 + 1]))
+        seed = rescale_seeds(raw_seed(table.house_ids[i], m + 1)[None].copy(), [mid], [m + 1])
+        live = np.maximum(predict_lstm(seed)[0], 0)
+        hit  = np.maximum(table.lookup(table.house_ids[i], m + 1, mid), 0)
+        worst = max(worst, np.abs(hit / max(hit.sum(), 1e-9) - live / max(live.sum(), 1e-9)).max())
+    print(f"  ✅  Saved: {out_path}  ({int(valid.sum())}/{valid.size} house-months × {len(means)} bins, "
+          f"max shape error at bin midpoints = {worst:.2e})")
+
+
+EXPORTERS = {"rf": export_rf, "lstm": export_lstm, "knn": export_knn, "seeds": export_seeds, "forecasts": export_forecasts}
+
+if __name__ == "__main__":
+    targets = sys.argv[1:] or list(EXPORTERS)
+    for name in targets:
+        if name not in EXPORTERS:
+            sys.exit(f"Unknown export target '{name}'. Choose from: {', '.join(EXPORTERS)}")
+        print(f"\n── Exporting {name} ──")
+        EXPORTERS[name]()
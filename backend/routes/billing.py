@@ -1,27 +1,41 @@
-from flask import Blueprint, request, jsonify
-import pandas as pd
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 import numpy as np
+import json
 import calendar
 
-from config import FAN_DAILY_HOURS, LSTM_FEATURES
-from core.firebase import db
-from core.physics import get_current_month, compute_true_baseload, safe_get, get_seasonal_ac_scale
+from config import FAN_DAILY_HOURS, FORECAST_BLEND_K
+from core.firebase import get_user_doc
+from core.physics import get_current_month, safe_get, get_seasonal_ac_scale
 from core.history import compute_usage_drift
+from core.cache import profile_hash
+from core.batch import iter_predict_bills, simulation_plan, replay_window
 from core.ml_predictor import (
-    rf_model,
-    bill_feats,
-    lstm_model,
-    lstm_scaler,
-    calculate_hybrid_units,
-    find_archetype_house,
-    get_lstm_seed,
-    get_blend_weights
+    estimate_months,
+    get_archetype,
+    get_archetype_neighbors,
+    get_calibration,
+    get_blend_weights,
+    forecast_raw_curve,
+    forecast_raw_curves,
+    blend_archetype_curves
 )
 from utils.nepra_engine import NepraEngine
 
 billing_bp = Blueprint('billing', __name__)
 nepra = NepraEngine()
 
+def _simulate_months(u: dict, months: list, uid: str = None, key: str = None) -> tuple:
+    """
+    Runs physics + RF + hybrid blending for a sequence of months.
+    Uncached months go through the forest in a single batched predict call.
+    Returns (physics_list, rf_kwh_list, hybrid_units_list) in input order.
+    """
+    estimates = estimate_months(u, months, uid, key)
+    return ([e["physics"] for e in estimates],
+            [e["rf_kwh"] for e in estimates],
+            [e["units"] for e in estimates])
+
+
 @billing_bp.route('/api/forecast_24h', methods=['POST'])
 def forecast_24h():
     try:
@@ -29,39 +43,30 @@ def forecast_24h():
         uid = data.get('uid')
         target_month = int(data.get('month', get_current_month()))
         
-        user_doc_ref = db.collection('users').document(uid).get()
-        if not user_doc_ref.exists: return jsonify({"error": "User not found"}), 404
-        u = user_doc_ref.to_dict()
+        u = get_user_doc(uid)
+        if u is None: return jsonify({"error": "User not found"}), 404
 
         # ─── STEP 1: GET THE MASTER GROUND TRUTH (RF MODEL) ───
-        physics = compute_true_baseload(u, target_month)
-        
-        feature_vector = {feat: 0.0 for feat in bill_feats}
-        feature_vector.update({
-            'ac_monthly': physics['ac'], 'kitchen_monthly': physics['kitchen'],
-            'refrigerator_monthly': physics['fridge'], 'ups_monthly': physics['ups'],
-            'wp_monthly': physics['water_pump'], 'weekend_usage': safe_get(u, 'mean_hourly', 0.05),
-            'month_num': float(target_month), 'person_count': max(safe_get(u, 'person_count', 1.0), 1.0),
-            'property_area': safe_get(u, 'property_area', 500.0), 'meta_ac_count': safe_get(u, 'ac_qty'),
-            'meta_fridge_count': safe_get(u, 'f_qty'), 'meta_ups_count': safe_get(u, 'u_qty', 0.0),
-            'floors': safe_get(u, 'floors', 1.0)
-        })
-        
-        rf_kwh_monthly = float(rf_model.predict(pd.DataFrame([feature_vector]))[0])
-        master_monthly_kwh = float(calculate_hybrid_units(u, physics, rf_kwh_monthly, target_month))
+        key = profile_hash(u)
+        estimate = estimate_months(u, [target_month], uid, key)[0]
+        physics = estimate["physics"]
+        master_monthly_kwh = float(estimate["units"])
         
         daily_target_kwh = master_monthly_kwh / 30
 
         # ─── STEP 2: GENERATE THE NEURAL PATTERN (LSTM) ───
         user_mean = physics["total"] / 720
-        archetype_house = find_archetype_house(u)
-        seed_data = get_lstm_seed(archetype_house, user_mean, target_month)
-        
-        scaled_seed = lstm_scaler.transform(seed_data)
-        input_seq = np.reshape(scaled_seed, (1, 48, len(LSTM_FEATURES)))
-        prediction = lstm_model.predict(input_seq, verbose=0)
-        
-        raw_lstm_values = prediction[0] 
+        blend = None
+        if FORECAST_BLEND_K > 1:
+            # K nearest archetypes seeded and forecast together, blended by distance
+            houses, distances = get_archetype_neighbors(u, FORECAST_BLEND_K, uid, key)
+            curves = forecast_raw_curves(houses, user_mean, target_month)
+            raw_lstm_values, spread, weights = blend_archetype_curves(curves, distances)
+            archetype_house = houses[0]
+            blend = (houses, spread, weights)
+        else:
+            archetype_house = get_archetype(u, uid, key)
+            raw_lstm_values = forecast_raw_curve(archetype_house, user_mean, target_month)
         raw_sum = float(np.sum(raw_lstm_values))
 
         # ─── STEP 3: THE MATHEMATICAL HANDSHAKE ───
@@ -72,6 +77,18 @@ def forecast_24h():
             aligned_val = float(v) * scaling_factor
             forecast_kw.append(max(0, round(aligned_val, 4)))
 
+        extra = {}
+        if blend is not None:
+            houses, spread, weights = blend
+            band = spread * daily_target_kwh
+            extra = {
+                "archetypes": [{"house": str(h), "weight": round(float(w), 4)} for h, w in zip(houses, weights)],
+                "band": {
+                    "lower": [max(0, round(f - float(b), 4)) for f, b in zip(forecast_kw, band)],
+                    "upper": [round(f + float(b), 4) for f, b in zip(forecast_kw, band)],
+                },
+            }
+
         # ─── STEP 4: NEPRA COST ───
         history = u.get('bill_history', [])
         sorted_hist = sorted(history, key=lambda x: x.get('month', '0000-00'))
@@ -94,6 +111,7 @@ def forecast_24h():
             "ac_scale": float(get_seasonal_ac_scale(target_month)),
             "archetype": str(archetype_house),
             "month": int(target_month),
+            **extra,
             "finance": {
                 "daily_units": float(round(daily_target_kwh, 2)),
                 "monthly_units": float(round(master_monthly_kwh, 1)),
@@ -115,53 +133,18 @@ def predict_user_bill():
         uid = data['uid']
         target_month = int(data.get('month', get_current_month()))
 
-        user_doc = db.collection('users').document(uid).get()
-        if not user_doc.exists: return jsonify({"error": "Profile not found"}), 404
-        u = user_doc.to_dict()
-
-        # ─── STEP 1: INITIALIZE ROLLING WINDOW FROM REAL HISTORY ───
-        history = u.get('bill_history', [])
-        sorted_hist = sorted(history, key=lambda x: x.get('month', '0000-00'))
-        rolling_window = [float(b.get('units', 0)) for b in sorted_hist if float(b.get('units', 0)) > 5][-12:]
+        u = get_user_doc(uid)
+        if u is None: return jsonify({"error": "Profile not found"}), 404
 
-        # Determine where the simulation starts
-        if sorted_hist:
-            last_m_str = sorted_hist[-1].get('month', '0000-00')
-            _, last_m_int = map(int, last_m_str.split('-'))
-            current_sim_month = (last_m_int % 12) + 1
-        else:
-            current_sim_month = get_current_month()
+        # ─── STEP 1: ROLLING WINDOW FROM REAL HISTORY + MONTHS UP TO TARGET ───
+        rolling_window, sim_months = simulation_plan(u, target_month)
 
         # ─── STEP 2: SIMULATE THE GAP UNTIL TARGET MONTH ───
-        final_units = 0
-        physics = {}
-        rf_kwh = 0
-        
-        max_safety_iterations = 13
-        while max_safety_iterations > 0:
-            m = current_sim_month
-            
-            physics = compute_true_baseload(u, m)
-            feature_vector = {feat: 0.0 for feat in bill_feats}
-            feature_vector.update({
-                'ac_monthly': physics['ac'], 'kitchen_monthly': physics['kitchen'],
-                'refrigerator_monthly': physics['fridge'], 'ups_monthly': physics['ups'],
-                'wp_monthly': physics['water_pump'], 'weekend_usage': safe_get(u, 'mean_hourly', 0.05),
-                'month_num': float(m), 'person_count': max(safe_get(u, 'person_count', 1.0), 1.0),
-                'property_area': safe_get(u, 'property_area', 500.0), 'meta_ac_count': safe_get(u, 'ac_qty'),
-                'meta_fridge_count': safe_get(u, 'f_qty'), 'meta_ups_count': safe_get(u, 'u_qty', 0.0),
-                'floors': safe_get(u, 'floors', 1.0)
-            })
-            rf_kwh = float(rf_model.predict(pd.DataFrame([feature_vector]))[0])
-            final_units = calculate_hybrid_units(u, physics, rf_kwh, m)
-
-            if m == target_month:
-                break
-                
-            rolling_window.append(final_units)
-            if len(rolling_window) > 12: rolling_window.pop(0)
-            current_sim_month = (m % 12) + 1
-            max_safety_iterations -= 1
+        # One RF call for the whole gap, then replay the rolling window
+        key = profile_hash(u)
+        physics_list, rf_list, units_list = _simulate_months(u, sim_months, uid, key)
+        physics, rf_kwh = physics_list[-1], rf_list[-1]
+        rolling_window, final_units = replay_window(rolling_window, units_list, sim_months, target_month)
 
         # ─── STEP 3: NEPRA CALCULATION ───
         cat = u.get('user_category', 'lifeline')
@@ -184,7 +167,7 @@ def predict_user_bill():
                 **bill_res, 
                 "physics_breakdown": physics, 
                 "rf_prediction_kwh": round(rf_kwh, 2),
-                "blend_weights": get_blend_weights(u, target_month), 
+                "blend_weights": get_blend_weights(u, target_month, get_calibration(u)), 
                 "drift": compute_usage_drift(u.get('bill_history', [])),
                 "history_months_used": valid_hist_count, 
                 "seasonal_context": {
@@ -198,13 +181,42 @@ def predict_user_bill():
         import traceback; traceback.print_exc(); return jsonify({"error": str(e)}), 500
 
 
+@billing_bp.route('/api/predict_bill_batch', methods=['POST'])
+def predict_bill_batch():
+    """
+    Bulk /api/predict_bill for nightly refreshes.
+    Body: {"uids": [...], "profiles": [{...}], "month": 7} (either list may be omitted).
+    Streams newline-delimited JSON: one record per user, in request order,
+    followed by a {"summary": {...}} line.
+    """
+    try:
+        data = request.json or {}
+        uids = data.get('uids') or []
+        profiles = data.get('profiles') or []
+        target_month = int(data.get('month', get_current_month()))
+        if not isinstance(uids, list) or not isinstance(profiles, list):
+            return jsonify({"error": "'uids' and 'profiles' must be lists"}), 400
+        if not uids and not profiles:
+            return jsonify({"error": "Provide 'uids' or 'profiles'"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        counts = {"success": 0, "error": 0}
+        for record in iter_predict_bills(uids, profiles, target_month):
+            counts[record["status"]] += 1
+            yield json.dumps(record) + "\n"
+        yield json.dumps({"summary": {"month": target_month, **counts}}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @billing_bp.route('/api/seasonal_preview', methods=['POST'])
 def seasonal_preview():
     try:
         uid = request.json.get('uid')
-        user_doc = db.collection('users').document(uid).get()
-        if not user_doc.exists: return jsonify({"error": "Profile not found"}), 404
-        u = user_doc.to_dict()
+        u = get_user_doc(uid)
+        if u is None: return jsonify({"error": "Profile not found"}), 404
 
         # --- STEP 1: INITIALIZE ROLLING WINDOW FROM REAL HISTORY ---
         history = u.get('bill_history', [])
@@ -221,24 +233,11 @@ def seasonal_preview():
         user_pref_cat = u.get('user_category', 'lifeline')
         monthly_preview = []
 
-        # --- STEP 2: SIMULATE 12 MONTHS CHRONOLOGICALLY ---
-        for i in range(12):
-            m = ((start_sim_month + i - 1) % 12) + 1
-            
-            physics = compute_true_baseload(u, m)
-            feature_vector = {feat: 0.0 for feat in bill_feats}
-            feature_vector.update({
-                'ac_monthly': physics['ac'], 'kitchen_monthly': physics['kitchen'],
-                'refrigerator_monthly': physics['fridge'], 'ups_monthly': physics['ups'],
-                'wp_monthly': physics['water_pump'], 'weekend_usage': safe_get(u, 'mean_hourly', 0.05),
-                'month_num': float(m), 'person_count': max(safe_get(u, 'person_count', 1.0), 1.0),
-                'property_area': safe_get(u, 'property_area', 500.0), 'meta_ac_count': safe_get(u, 'ac_qty'),
-                'meta_fridge_count': safe_get(u, 'f_qty'), 'meta_ups_count': safe_get(u, 'u_qty', 0.0),
-                'floors': safe_get(u, 'floors', 1.0)
-            })
-            rf_kwh = float(rf_model.predict(pd.DataFrame([feature_vector]))[0])
-            final_units = calculate_hybrid_units(u, physics, rf_kwh, m)
+        # --- STEP 2: SIMULATE 12 MONTHS CHRONOLOGICALLY (ONE BATCHED RF CALL) ---
+        sim_months = [((start_sim_month + i - 1) % 12) + 1 for i in range(12)]
+        _, _, units_list = _simulate_months(u, sim_months, uid)
 
+        for m, final_units in zip(sim_months, units_list):
             # --- STEP 3: APPLY NEPRA "MEMORY" ---
             is_eligible = nepra.check_eligibility(rolling_window, user_pref_cat)
             
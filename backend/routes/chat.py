@@ -1,15 +1,176 @@
-from flask import Blueprint, request, jsonify
-import pandas as pd
+import json
+import time
 
-from core.firebase import db
-from core.physics import get_current_month, compute_true_baseload, safe_get
-from core.ml_predictor import rf_model, bill_feats, calculate_hybrid_units, find_archetype_house
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+
+from core.firebase import get_user_doc
+from core.physics import get_current_month, safe_get
+from core.cache import profile_hash
+from core.ml_predictor import estimate_months, get_archetype, profile_cache
 from utils.nepra_engine import NepraEngine
-from utils.chat_manager import get_gemini_response
+from utils.chat_manager import get_gemini_response, stream_gemini_response
 
 chat_bp = Blueprint('chat', __name__)
 nepra = NepraEngine()
 
+def fallback_context(page: str, platform: str, client_display_name: str = '', client_email: str = '') -> dict:
+    """Prompt context for a signed-in user who has not set up a profile yet."""
+    fallback_first = client_display_name.split(' ')[0] if client_display_name else 'User'
+    return {
+        "disco": "Unknown",
+        "category_display": "Unknown",
+        "inventory": {},
+        "page": page,
+        "platform": platform,
+        "first_name": fallback_first or 'User',
+        "full_name": client_display_name or 'User',
+        "email": client_email or 'Unknown'
+    }
+
+
+def context_key(u: dict, client_display_name: str = '', client_email: str = '') -> tuple:
+    """Everything the rendered household-context block of a stored profile depends on."""
+    return profile_hash(u), get_current_month(), client_display_name, client_email
+
+
+def build_user_context(u: dict, uid: str, page: str, platform: str,
+                       client_display_name: str = '', client_email: str = '') -> dict:
+    """Runs the prediction pipeline for the current month and packs the prompt context."""
+    # 1. Compute live predictions & baselines for context
+    m = get_current_month()
+    key = profile_hash(u)
+    final_units = estimate_months(u, [m], uid, key)[0]["units"]
+
+    # Calculate Nepra Bill
+    cat = u.get('user_category', 'lifeline')
+    valid_hist = [float(b.get('units', 0)) for b in u.get('bill_history', []) if float(b.get('units', 0)) > 5]
+    is_eligible = nepra.check_eligibility(valid_hist, cat)
+    bill_res = nepra.calculate_bill(
+        units=final_units, 
+        load_kw=safe_get(u, 'sanctioned_load', 1.0), 
+        user_category=cat, 
+        is_eligible=is_eligible
+    )
+
+    archetype_house = get_archetype(u, uid, key)
+
+    # 2. Calculate completeness score
+    completeness_score = 0
+    fields = [
+        'disco', 'sanctioned_load', 'user_category', 'person_count',
+        'user_routine', 'property_area', 'floors', 'f_qty',
+        'wm_qty', 'wp_qty', 'u_qty', 'k_qty', 'iron_qty'
+    ]
+    for f in fields:
+        if u.get(f) is not None and u.get(f) != "":
+            completeness_score += 1
+    if u.get('fan_ac_qty') is not None or u.get('fan_dc_qty') is not None:
+        completeness_score += 1
+    if u.get('ac_std_qty') is not None or u.get('ac_inv_qty') is not None:
+        completeness_score += 1
+    if len(u.get('bill_history', [])) > 0:
+        completeness_score += 1
+
+    # 3. Construct user profile context
+    raw_first = u.get('firstName') or u.get('first_name', '')
+    raw_last = u.get('lastName') or u.get('last_name', '')
+    constructed_full = f"{raw_first} {raw_last}".strip()
+    final_full_name = constructed_full or u.get('name') or client_display_name or 'User'
+    final_first_name = raw_first or u.get('name', '').split(' ')[0] or (client_display_name.split(' ')[0] if client_display_name else '') or 'User'
+    
+    user_context = {
+        "first_name": final_first_name,
+        "full_name": final_full_name,
+        "email": u.get('email') or u.get('email_address') or client_email or 'Unknown',
+        "disco": u.get('disco', 'Unknown'),
+        "category_display": "Un-Protected" if cat == 'non_protected' else "Protected" if cat == 'protected' else "Lifeline",
+        "is_protected": "Yes" if cat == 'protected' else "No",
+        "is_lifeline": "Yes" if cat == 'lifeline' else "No",
+        "sanctioned_load": str(u.get('sanctioned_load', '1.0')),
+        "completeness_score": f"{completeness_score}",
+        "archetype": str(archetype_house).replace("House", "House #"),
+        "predicted_units": str(round(final_units, 1)),
+        "predicted_bill": str(round(bill_res['total_bill'], 0)),
+        "page": page,
+        "platform": platform,
+        "inventory": {
+            "Standard ACs": f"{u.get('ac_std_qty', 0)} units ({u.get('ac_std_val', 0)} hrs/day)",
+            "Inverter ACs": f"{u.get('ac_inv_qty', 0)} units ({u.get('ac_inv_val', 0)} hrs/day)",
+            "Standard Fans": f"{u.get('fan_ac_qty', 0)} units",
+            "Inverter Fans": f"{u.get('fan_dc_qty', 0)} units",
+            "Refrigerator": f"{u.get('f_qty', 0)} units ({u.get('f_type', 'standard')})",
+            "Washing Machine": f"{u.get('wm_qty', 0)} units ({u.get('wm_type', 'manual')})",
+            "Water Pump": f"{u.get('wp_qty', 0)} units ({u.get('wp_type', '1.0')} HP)",
+            "UPS System": f"{u.get('u_qty', 0)} units",
+            "Kitchen Oven/Kettle": f"{u.get('k_qty', 0)} units",
+            "Clothes Iron": f"{u.get('iron_qty', 0)} units ({u.get('iron_val', 0)} hrs/session)"
+        }
+    }
+    return user_context
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class SSEReply:
+    """
+    Server-sent events of one streamed reply: a {"delta"} event per chunk,
+    then {"status": "success", "done", "reply", "ttft_ms", "usage"}, where
+    ttft_ms runs from the start of the request to the first chunk.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.parts = []
+        self.ttft_ms = None
+        self.usage = {}
+
+    @staticmethod
+    def _event(body: dict) -> str:
+        return f"data: {json.dumps(body)}\n\n"
+
+    def delta(self, text: str) -> str:
+        if self.ttft_ms is None:
+            self.ttft_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        self.parts.append(text)
+        return self._event({"delta": text})
+
+    def done(self) -> str:
+        return self._event({"status": "success", "done": True, "reply": "".join(self.parts),
+                            "ttft_ms": self.ttft_ms, "usage": self.usage})
+
+    def error(self, message: str) -> str:
+        return self._event({"error": message})
+
+
+def context_cache_key(ckey: tuple) -> tuple:
+    """profile_cache key of the user_context built for a context_key()."""
+    profile_key, month, client_display_name, client_email = ckey
+    return profile_key, "chat_context", month, client_display_name, client_email
+
+
+def with_page(user_context: dict, page: str, platform: str) -> dict:
+    """Copy of a cached user_context for the page and platform of this message."""
+    return {**user_context, "page": page, "platform": platform}
+
+
+def chat_context(u, uid: str, page: str, platform: str, client_display_name: str = '', client_email: str = '') -> tuple:
+    """
+    (prompt context, context-block cache key) for a user document (None if no
+    profile yet). Every turn of a conversation re-reads the same profile, so
+    the prediction pipeline behind the context runs once per profile version
+    and month; a profile write drops it with the rest of the user's cache.
+    """
+    if u is None:
+        return fallback_context(page, platform, client_display_name, client_email), None
+    ckey = context_key(u, client_display_name, client_email)
+    user_context = profile_cache.get_or_compute(
+        context_cache_key(ckey),
+        lambda: build_user_context(u, uid, page, platform, client_display_name, client_email),
+        tag=uid)
+    return with_page(user_context, page, platform), ckey
+
+
 @chat_bp.route('/api/chat', methods=['POST'])
 def chat_with_assistant():
     try:
@@ -26,112 +187,52 @@ def chat_with_assistant():
             return jsonify({"error": "Missing uid or message"}), 400
 
         # 1. Fetch user data from Firestore
-        user_doc = db.collection('users').document(uid).get()
-        if not user_doc.exists:
-            fallback_first = client_display_name.split(' ')[0] if client_display_name else 'User'
-            fallback_context = {
-                "disco": "Unknown",
-                "category_display": "Unknown",
-                "inventory": {},
-                "page": page,
-                "platform": platform,
-                "first_name": fallback_first or 'User',
-                "full_name": client_display_name or 'User',
-                "email": client_email or 'Unknown'
-            }
-            reply = get_gemini_response(message, history, fallback_context)
-            return jsonify({"status": "success", "reply": reply})
-
-        u = user_doc.to_dict()
-
-        # 2. Compute live predictions & baselines for context
-        m = get_current_month()
-        physics = compute_true_baseload(u, m)
-
-        # Run RF prediction
-        feature_vector = {feat: 0.0 for feat in bill_feats}
-        feature_vector.update({
-            'ac_monthly': physics['ac'], 'kitchen_monthly': physics['kitchen'],
-            'refrigerator_monthly': physics['fridge'], 'ups_monthly': physics['ups'],
-            'wp_monthly': physics['water_pump'], 'weekend_usage': safe_get(u, 'mean_hourly', 0.05),
-            'month_num': float(m), 'person_count': max(safe_get(u, 'person_count', 1.0), 1.0),
-            'property_area': safe_get(u, 'property_area', 500.0), 'meta_ac_count': safe_get(u, 'ac_qty'),
-            'meta_fridge_count': safe_get(u, 'f_qty'), 'meta_ups_count': safe_get(u, 'u_qty', 0.0),
-            'floors': safe_get(u, 'floors', 1.0)
-        })
-        rf_kwh = float(rf_model.predict(pd.DataFrame([feature_vector]))[0])
-        final_units = calculate_hybrid_units(u, physics, rf_kwh, m)
-
-        # Calculate Nepra Bill
-        cat = u.get('user_category', 'lifeline')
-        valid_hist = [float(b.get('units', 0)) for b in u.get('bill_history', []) if float(b.get('units', 0)) > 5]
-        is_eligible = nepra.check_eligibility(valid_hist, cat)
-        bill_res = nepra.calculate_bill(
-            units=final_units, 
-            load_kw=safe_get(u, 'sanctioned_load', 1.0), 
-            user_category=cat, 
-            is_eligible=is_eligible
-        )
-
-        archetype_house = find_archetype_house(u)
-
-        # 3. Calculate completeness score
-        completeness_score = 0
-        fields = [
-            'disco', 'sanctioned_load', 'user_category', 'person_count',
-            'user_routine', 'property_area', 'floors', 'f_qty',
-            'wm_qty', 'wp_qty', 'u_qty', 'k_qty', 'iron_qty'
-        ]
-        for f in fields:
-            if u.get(f) is not None and u.get(f) != "":
-                completeness_score += 1
-        if u.get('fan_ac_qty') is not None or u.get('fan_dc_qty') is not None:
-            completeness_score += 1
-        if u.get('ac_std_qty') is not None or u.get('ac_inv_qty') is not None:
-            completeness_score += 1
-        if len(u.get('bill_history', [])) > 0:
-            completeness_score += 1
+        u = get_user_doc(uid)
 
-        # 4. Construct user profile context
-        raw_first = u.get('firstName') or u.get('first_name', '')
-        raw_last = u.get('lastName') or u.get('last_name', '')
-        constructed_full = f"{raw_first} {raw_last}".strip()
-        final_full_name = constructed_full or u.get('name') or client_display_name or 'User'
-        final_first_name = raw_first or u.get('name', '').split(' ')[0] or (client_display_name.split(' ')[0] if client_display_name else '') or 'User'
-        
-        user_context = {
-            "first_name": final_first_name,
-            "full_name": final_full_name,
-            "email": u.get('email') or u.get('email_address') or client_email or 'Unknown',
-            "disco": u.get('disco', 'Unknown'),
-            "category_display": "Un-Protected" if cat == 'non_protected' else "Protected" if cat == 'protected' else "Lifeline",
-            "is_protected": "Yes" if cat == 'protected' else "No",
-            "is_lifeline": "Yes" if cat == 'lifeline' else "No",
-            "sanctioned_load": str(u.get('sanctioned_load', '1.0')),
-            "completeness_score": f"{completeness_score}",
-            "archetype": str(archetype_house).replace("House", "House #"),
-            "predicted_units": str(round(final_units, 1)),
-            "predicted_bill": str(round(bill_res['total_bill'], 0)),
-            "page": page,
-            "platform": platform,
-            "inventory": {
-                "Standard ACs": f"{u.get('ac_std_qty', 0)} units ({u.get('ac_std_val', 0)} hrs/day)",
-                "Inverter ACs": f"{u.get('ac_inv_qty', 0)} units ({u.get('ac_inv_val', 0)} hrs/day)",
-                "Standard Fans": f"{u.get('fan_ac_qty', 0)} units",
-                "Inverter Fans": f"{u.get('fan_dc_qty', 0)} units",
-                "Refrigerator": f"{u.get('f_qty', 0)} units ({u.get('f_type', 'standard')})",
-                "Washing Machine": f"{u.get('wm_qty', 0)} units ({u.get('wm_type', 'manual')})",
-                "Water Pump": f"{u.get('wp_qty', 0)} units ({u.get('wp_type', '1.0')} HP)",
-                "UPS System": f"{u.get('u_qty', 0)} units",
-                "Kitchen Oven/Kettle": f"{u.get('k_qty', 0)} units",
-                "Clothes Iron": f"{u.get('iron_qty', 0)} units ({u.get('iron_val', 0)} hrs/session)"
-            }
-        }
+        # 2. Build the prompt context (runs the prediction pipeline for stored profiles)
+        user_context, ckey = chat_context(u, uid, page, platform, client_display_name, client_email)
+
+        # 3. Fetch Gemini response (history cut to the token budget; counts land in `usage`)
+        usage = {}
+        reply = get_gemini_response(message, history, user_context, ckey, usage)
+        return jsonify({"status": "success", "reply": reply, "usage": usage})
+
+    except Exception as e:
+        import traceback; traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+@chat_bp.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """chat_with_assistant over server-sent events: reply text arrives as it is generated."""
+    try:
+        sse = SSEReply()
+        data = request.json
+        uid = data.get('uid')
+        message = data.get('message', '')
+        history = data.get('history', [])
+        page = data.get('page', '')
+        platform = data.get('platform', 'web')
+        client_display_name = data.get('displayName', '')
+        client_email = data.get('email', '')
+
+        if not uid or not message:
+            return jsonify({"error": "Missing uid or message"}), 400
 
-        # 5. Fetch Gemini response
-        reply = get_gemini_response(message, history, user_context)
-        return jsonify({"status": "success", "reply": reply})
+        u = get_user_doc(uid)
+        user_context, ckey = chat_context(u, uid, page, platform, client_display_name, client_email)
+        chunks = stream_gemini_response(message, history, user_context, ckey, sse.usage)
 
     except Exception as e:
         import traceback; traceback.print_exc()
         return jsonify({"error": str(e)}), 500
+
+    def events():
+        try:
+            for text in chunks:
+                yield sse.delta(text)
+            yield sse.done()
+        except Exception as e:
+            yield sse.error(str(e))
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=SSE_HEADERS)
@@ -1,4 +1,13 @@
-from flask import Blueprint, jsonify
+import hmac
+from flask import Blueprint, request, jsonify
+
+from config import METRICS_TOKEN
+from core.model_registry import registry
+from core.ml_predictor import profile_cache, physics_cache, forecast_cache, lstm_batcher
+from core.firebase import data_access_stats
+from utils.gemini_client import gemini_http
+from utils.chat_manager import context_block_cache, reply_cache
+from utils.chat_budget import token_metrics
 
 home_bp = Blueprint('home', __name__)
 
@@ -9,3 +18,25 @@ def home():
         "project": "Bill Optimizer AI",
         "version": "2.3 (Physics Engine Validated)"
     })
+
+@home_bp.route('/api/metrics')
+def metrics():
+    if not METRICS_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not hmac.compare_digest(request.headers.get("X-Metrics-Token", "").encode(), METRICS_TOKEN.encode()):
+        return jsonify({"error": "Forbidden"}), 403
+    knn_index = registry.get("knn_index") if registry.is_loaded("knn_index") else None
+    return jsonify({
+        "status": "success",
+        "models": registry.stats(),
+        "profile_cache": profile_cache.stats(),
+        "physics_cache": physics_cache.stats(),
+        "forecast_cache": forecast_cache.stats(),
+        "lstm_batcher": lstm_batcher.stats(),
+        "archetype_index": knn_index.stats() if knn_index is not None else None,
+        "context_block_cache": context_block_cache.stats(),
+        "reply_cache": reply_cache.stats(),
+        "firestore": data_access_stats(),
+        "gemini": gemini_http.metrics.stats(),
+        "chat_tokens": token_metrics.stats()
+    })
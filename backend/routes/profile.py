@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from core.firebase import db
+from core.firebase import set_user_doc
+from core.ml_predictor import invalidate_profile
 
 profile_bp = Blueprint('profile', __name__)
 
@@ -9,7 +10,8 @@ def setup_profile():
         data      = request.json
         uid       = data['uid']
         user_info = data['data']
-        db.collection('users').document(uid).set(user_info, merge=True)
+        set_user_doc(uid, user_info, merge=True)
+        invalidate_profile(uid)
         return jsonify({"status": "success"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import textwrap
 import unittest
 from unittest.mock import patch, MagicMock
 import numpy as np
@@ -34,7 +35,8 @@ def dummy_load(filepath):
     if filename == "knn_scaler.pkl" or filename == "lstm_scaler.pkl":
         mock_obj.transform.side_effect = lambda x: x
     elif filename == "rf_bill_predictor.pkl":
-        mock_obj.predict.return_value = np.array([120.0]) # Mock lower consumption prediction (120 units)
+        # Mock lower consumption prediction (120 units) for every row in the batch
+        mock_obj.predict.side_effect = lambda X: np.full(len(X), 120.0)
     elif filename == "knn_archetype.pkl":
         mock_obj.kneighbors.return_value = (np.array([[0.0]]), np.array([[0]]))
     return mock_obj
@@ -54,6 +56,12 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import app
 from app import app as flask_app, db as mock_db
 
+from core.firebase import user_doc_cache
+from core.ml_predictor import physics_cache, forecast_cache
+
+# Models load lazily; resolve them now while the joblib/tensorflow stubs above are installed
+app.registry.warm(background=False)
+
 class TestAPIEndpoints(unittest.TestCase):
 
     def setUp(self):
@@ -61,6 +69,10 @@ class TestAPIEndpoints(unittest.TestCase):
         self.client = flask_app.test_client()
         # Reset mocks
         mock_db.reset_mock()
+        app.profile_cache.clear()
+        physics_cache.clear()
+        forecast_cache.clear()
+        user_doc_cache.clear()
 
     def test_home_route(self):
         # Test GET /
@@ -70,6 +82,63 @@ class TestAPIEndpoints(unittest.TestCase):
         self.assertEqual(data["status"], "online")
         self.assertEqual(data["project"], "Bill Optimizer AI")
 
+    def test_import_does_not_load_models(self):
+        # Cold start in a clean interpreter: importing the app loads no ML runtime or model
+        import subprocess
+        script = textwrap.dedent("""
+            import sys, json
+            from unittest.mock import MagicMock
+            for name in ("firebase_admin", "firebase_admin.credentials", "firebase_admin.firestore"):
+                sys.modules[name] = MagicMock()
+            import app
+            from core.ml_predictor import registry
+            print(json.dumps({"heavy": [m for m in ("tensorflow", "joblib", "sklearn") if m in sys.modules],
+                              "loaded": [n for n in registry.stats() if registry.is_loaded(n)]}))
+        """)
+        backend = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        env = dict(os.environ, MODEL_WARMUP="off", FIREBASE_CREDENTIALS_JSON="{}")
+        proc = subprocess.run([sys.executable, "-c", script], cwd=backend, env=env,
+                              capture_output=True, text=True, timeout=120)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        self.assertEqual(result["heavy"], [])
+        self.assertEqual(result["loaded"], [])
+
+    def test_stale_flat_forest_export_is_not_served(self):
+        import tempfile
+        import core.ml_predictor as ml
+        from core.forest import FLAT_FOREST_FILE
+        bill_feats = ml.registry.get("bill_feats")
+
+        def export(tmp, names):
+            one_leaf = np.zeros((1, 1))
+            np.savez(os.path.join(tmp, FLAT_FOREST_FILE), feature=one_leaf, threshold=one_leaf, left=one_leaf,
+                     right=one_leaf, value=one_leaf + 7.0, max_depth=np.int32(0),
+                     n_features=np.int32(len(names)), feature_names=np.array(names, dtype=str))
+
+        compiled = object()
+        with tempfile.TemporaryDirectory() as tmp, \
+             patch.object(ml, "MODELS_DIR", tmp), \
+             patch.object(ml.FlatForest, "from_sklearn", return_value=compiled):
+            export(tmp, bill_feats)
+            self.assertEqual(ml._load_flat_forest().feature_names, bill_feats)
+            export(tmp, list(reversed(bill_feats)))
+            self.assertIs(ml._load_flat_forest(), compiled)
+
+    def test_metrics_route(self):
+        import routes.home as home
+        self.client.post('/api/simulate_bill', json={"units": 150})
+        # Disabled unless a token is configured, and then only with that token
+        self.assertEqual(self.client.get('/api/metrics').status_code, 404)
+        with patch.object(home, "METRICS_TOKEN", "s3cret"):
+            self.assertEqual(self.client.get('/api/metrics').status_code, 403)
+            self.assertEqual(self.client.get('/api/metrics', headers={"X-Metrics-Token": "wrong"}).status_code, 403)
+            res = self.client.get('/api/metrics', headers={"X-Metrics-Token": "s3cret"})
+        self.assertEqual(res.status_code, 200)
+        data = json.loads(res.data)
+        self.assertIn("rf_flat", data["models"])
+        self.assertIn("load_ms", data["models"]["lstm_model"])
+
     def test_setup_profile_route(self):
         # Test POST /api/setup_profile
         payload = {
@@ -140,6 +209,154 @@ class TestAPIEndpoints(unittest.TestCase):
         self.assertIn("finance", data)
         self.assertEqual(data["finance"]["applied_category"], "protected")
 
+    def test_forecast_curve_shared_across_users_of_an_archetype(self):
+        mock_doc = MagicMock()
+        mock_doc.exists = True
+        base = {"disco": "LESCO", "user_category": "protected", "person_count": 3, "f_qty": 1,
+                "bill_history": [{"month": "2026-05", "units": 120}]}
+        mock_db.collection('users').document('user_123').get.return_value = mock_doc
+
+        import core.ml_predictor as ml
+        seed = np.random.default_rng(0).uniform(0.1, 1.0, (48, 10)).astype(np.float32)
+        lstm = ml.registry.get("lstm_model")
+        forecasts = []
+        with patch.object(ml, "_raw_seed", side_effect=lambda house, month: seed.copy()), \
+             patch.object(lstm, "predict", wraps=lstm.predict) as lstm_predict:
+            # Same appliances (same archetype and mean load), different billing history
+            for units in (120, 180):
+                mock_doc.to_dict.return_value = {**base, "bill_history": [{"month": "2026-05", "units": units}]}
+                user_doc_cache.clear()
+                res = self.client.post('/api/forecast_24h', json={"uid": "user_123", "month": 6})
+                forecasts.append(json.loads(res.data))
+
+        self.assertEqual(lstm_predict.call_count, 1)
+        self.assertEqual(len(forecast_cache), 1)
+        # Each user's curve is rescaled to their own daily target
+        daily = [f["finance"]["daily_units"] for f in forecasts]
+        self.assertNotEqual(daily[0], daily[1])
+        for f in forecasts:
+            self.assertAlmostEqual(sum(f["forecast"]), f["finance"]["daily_units"], places=2)
+
+    def test_forecast_24h_served_from_precomputed_table(self):
+        mock_doc = MagicMock()
+        mock_doc.exists = True
+        mock_doc.to_dict.return_value = {"disco": "LESCO", "user_category": "protected", "person_count": 3,
+                                         "f_qty": 1, "bill_history": [{"month": "2026-05", "units": 120}]}
+        mock_db.collection('users').document('user_123').get.return_value = mock_doc
+
+        import tempfile
+        import core.ml_predictor as ml
+        from core.forecast_table import ForecastTable, build_forecast_table, mean_grid
+        seed = np.random.default_rng(0).uniform(0.1, 1.0, (48, 10)).astype(np.float32)
+        raw_seed = lambda house, month: seed.copy()
+        lstm = ml.registry.get("lstm_model")
+
+        def post():
+            res = self.client.post('/api/forecast_24h', json={"uid": "user_123", "month": 6})
+            return json.loads(res.data)["forecast"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            build_forecast_table(raw_seed, ml.predict_lstm, ml.rescale_seeds, ["house_1"],
+                                 mean_grid(0.02, 8.0, 96), tmp)
+            table = ForecastTable.load(tmp, mmap=False)
+
+        with patch.object(ml, "_raw_seed", side_effect=raw_seed), \
+             patch.dict(ml.registry._models, {"forecast_table": table}), \
+             patch.object(lstm, "predict", wraps=lstm.predict) as lstm_predict:
+            served = post()
+            self.assertEqual(lstm_predict.call_count, 0)
+            # Exact mode runs the live model on the same request
+            with patch.object(ml, "FORECAST_EXACT", True):
+                exact = post()
+            self.assertEqual(lstm_predict.call_count, 1)
+
+        self.assertEqual(len(served), 24)
+        np.testing.assert_allclose(served, exact, atol=0.01)
+
+    def test_archetype_matched_through_precomputed_index(self):
+        import core.ml_predictor as ml
+        from core.archetype import ArchetypeIndex
+        features = ml.registry.get("knn_features")
+        index = ArchetypeIndex({"houses": np.array([[0.0] * 6, [1.0] * 6, [3.0] * 6]),
+                                "mean": np.zeros(6), "scale": np.ones(6),
+                                "house_ids": ["house_1", "house_2", "house_3"], "features": features})
+        small = {"ac_qty": 1, "f_qty": 1, "person_count": 1, "u_qty": 1, "fan_qty": 1, "wm_qty": 1}
+        large = {"ac_qty": 3, "f_qty": 3, "person_count": 3, "u_qty": 3, "fan_qty": 3, "wm_qty": 3}
+        with patch.dict(ml.registry._models, {"knn_index": index}):
+            self.assertEqual(ml.find_archetype_house(large), "house_3")
+            self.assertEqual(ml.find_archetype_houses([small, large, small]), ["house_2", "house_3", "house_2"])
+            self.assertEqual(ml.find_archetype_house(large), "house_3")
+        self.assertEqual(index.stats()["memo_hits"], 1)
+
+    def test_archetype_fallback_is_not_cached(self):
+        import core.ml_predictor as ml
+        u = {"ac_qty": 3, "f_qty": 3, "person_count": 3, "u_qty": 3, "fan_qty": 3, "wm_qty": 3}
+        index = ml.ArchetypeIndex({"houses": np.array([[0.0] * 6, [3.0] * 6]), "mean": np.zeros(6),
+                                   "scale": np.ones(6), "house_ids": ["house_1", "house_2"],
+                                   "features": ml.registry.get("knn_features")})
+        with patch.object(ml, "archetype_features", side_effect=RuntimeError("knn not loaded")):
+            self.assertEqual(ml.get_archetype(u, "user_123"), ml.FALLBACK_ARCHETYPE)
+            self.assertEqual(ml.get_archetype_neighbors(u, 2, "user_123")[0], [ml.FALLBACK_ARCHETYPE])
+        # The transient failure did not pin the profile to the fallback house
+        with patch.dict(ml.registry._models, {"knn_index": index}):
+            self.assertEqual(ml.get_archetype(u, "user_123"), "house_2")
+            self.assertEqual(ml.get_archetype_neighbors(u, 2, "user_123")[0], ["house_2", "house_1"])
+
+    def test_forecast_24h_blends_nearest_archetypes(self):
+        mock_doc = MagicMock()
+        mock_doc.exists = True
+        mock_doc.to_dict.return_value = {"disco": "LESCO", "user_category": "protected", "person_count": 4,
+                                         "ac_qty": 1, "f_qty": 1, "u_qty": 1, "fan_qty": 2, "wm_qty": 1,
+                                         "bill_history": [{"month": "2026-05", "units": 120}]}
+        mock_db.collection('users').document('user_123').get.return_value = mock_doc
+
+        import routes.billing as billing
+        import core.ml_predictor as ml
+        from core.archetype import ArchetypeIndex
+        index = ArchetypeIndex({"houses": np.array([[1.0] * 6, [2.0] * 6, [5.0] * 6]),
+                                "mean": np.zeros(6), "scale": np.ones(6),
+                                "house_ids": ["house_1", "house_2", "house_3"],
+                                "features": ml.registry.get("knn_features")})
+        rng = np.random.default_rng(1)
+        seeds = {h: rng.uniform(0.1, 1.0, (48, 10)).astype(np.float32) for h in index.house_ids}
+        lstm = ml.registry.get("lstm_model")
+
+        with patch.object(billing, "FORECAST_BLEND_K", 3), \
+             patch.object(ml, "LSTM_MICRO_BATCHING", False), \
+             patch.object(ml, "_raw_seed", side_effect=lambda house, month: seeds[house].copy()), \
+             patch.dict(ml.registry._models, {"knn_index": index}), \
+             patch.object(lstm, "predict", wraps=lstm.predict) as lstm_predict:
+            res = self.client.post('/api/forecast_24h', json={"uid": "user_123", "month": 6})
+
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        # All three archetype seeds go through the LSTM in one batch
+        self.assertEqual(lstm_predict.call_count, 1)
+        self.assertEqual(lstm_predict.call_args[0][0].shape[0], 3)
+        self.assertEqual([a["house"] for a in data["archetypes"]], ["house_2", "house_1", "house_3"])
+        self.assertAlmostEqual(sum(a["weight"] for a in data["archetypes"]), 1.0, places=3)
+        self.assertEqual(data["archetype"], "house_2")
+        self.assertAlmostEqual(sum(data["forecast"]), data["finance"]["daily_units"], places=2)
+        for lo, f, hi in zip(data["band"]["lower"], data["forecast"], data["band"]["upper"]):
+            self.assertLessEqual(lo, f)
+            self.assertLessEqual(f, hi)
+        self.assertGreater(sum(hi - lo for lo, hi in zip(data["band"]["lower"], data["band"]["upper"])), 0)
+
+    def test_blend_weights_follow_distance(self):
+        import core.ml_predictor as ml
+        curves = np.array([np.ones(24), np.arange(24, dtype=float), 2 * np.ones(24)])
+        blend, spread, weights = ml.blend_archetype_curves(curves, [1.0, 1.0, 1.0])
+        np.testing.assert_allclose(weights, [1 / 3] * 3)
+        self.assertAlmostEqual(blend.sum(), 1.0)
+        # Curves 0 and 2 have the same shape; only curve 1 adds spread
+        blend, spread, weights = ml.blend_archetype_curves(curves[[0, 2]], [0.5, 2.0])
+        np.testing.assert_allclose(weights, [0.8, 0.2], atol=1e-3)
+        np.testing.assert_allclose(blend, np.full(24, 1 / 24))
+        np.testing.assert_allclose(spread, 0.0, atol=1e-12)
+        # An exact match dominates the blend
+        _, _, weights = ml.blend_archetype_curves(curves, [0.0, 1.0, 1.0])
+        self.assertGreater(weights[0], 0.99)
+
     def test_predict_bill_route_success(self):
         # Mock Firestore response for low-consumption user document
         mock_doc = MagicMock()
@@ -198,6 +415,142 @@ class TestAPIEndpoints(unittest.TestCase):
         self.assertIn("monthly", data)
         self.assertEqual(len(data["monthly"]), 12) # Returns preview for 12 months
 
+    def test_seasonal_preview_single_batched_rf_call(self):
+        # All 12 simulated months must go through the RF in one predict call
+        mock_doc = MagicMock()
+        mock_doc.exists = True
+        mock_doc.to_dict.return_value = {
+            "disco": "K-Electric",
+            "user_category": "protected",
+            "person_count": 4,
+            "bill_history": [{"month": "2026-05", "units": 120}]
+        }
+        mock_db.collection('users').document('user_123').get.return_value = mock_doc
+
+        rf_mock = app.registry.get("rf_model")
+        rf_mock.predict.reset_mock()
+        res = self.client.post('/api/seasonal_preview', json={"uid": "user_123"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(rf_mock.predict.call_count, 1)
+        batch = rf_mock.predict.call_args[0][0]
+        self.assertEqual(len(batch), 12)
+        # Simulation starts the month after the latest bill
+        self.assertEqual(json.loads(res.data)["monthly"][0]["month"], 6)
+
+    def test_profile_cache_reused_and_invalidated(self):
+        mock_doc = MagicMock()
+        mock_doc.exists = True
+        mock_doc.to_dict.return_value = {"disco": "LESCO", "user_category": "protected", "person_count": 3}
+        mock_db.collection('users').document('user_123').get.return_value = mock_doc
+        rf_mock = app.registry.get("rf_model")
+        rf_mock.predict.reset_mock()
+
+        payload = {"uid": "user_123", "month": 6}
+        first = json.loads(self.client.post('/api/forecast_24h', json=payload).data)
+        second = json.loads(self.client.post('/api/forecast_24h', json=payload).data)
+        self.assertEqual(first["forecast"], second["forecast"])
+        self.assertEqual(rf_mock.predict.call_count, 1)
+        self.assertGreaterEqual(app.profile_cache.stats()["hits"], 2)
+
+        # Profile writes drop everything cached for that uid
+        self.client.post('/api/setup_profile', json={"uid": "user_123", "data": {"f_qty": 2}})
+        self.assertEqual(len(app.profile_cache), 0)
+        self.client.post('/api/forecast_24h', json=payload)
+        self.assertEqual(rf_mock.predict.call_count, 2)
+
+    def test_seasonal_preview_physics_evaluated_once_per_month(self):
+        mock_doc = MagicMock()
+        mock_doc.exists = True
+        mock_doc.to_dict.return_value = {
+            "disco": "LESCO", "user_category": "protected", "person_count": 3, "ac_inv_qty": 1, "ac_inv_val": 6,
+            "bill_history": [{"month": f"2026-0{m}", "units": 150 + m} for m in range(1, 7)]
+        }
+        mock_db.collection('users').document('user_123').get.return_value = mock_doc
+
+        import core.ml_predictor as ml
+        with patch.object(ml, "compute_true_baseload", wraps=ml.compute_true_baseload) as physics:
+            res = self.client.post('/api/seasonal_preview', json={"uid": "user_123"})
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(physics.call_count, 12)
+
+            # A new bill entry re-calibrates from memoized months, a rename recomputes nothing
+            u = dict(mock_doc.to_dict.return_value)
+            u["bill_history"] = u["bill_history"] + [{"month": "2026-07", "units": 190}]
+            cal = ml.get_calibration(u)
+            ml.get_calibration({**u, "first_name": "Ali"})
+            self.assertEqual(physics.call_count, 12)
+            self.assertEqual(cal, ml._get_calibration(u))
+
+    def test_user_doc_read_shared_across_requests(self):
+        mock_doc = MagicMock()
+        mock_doc.exists = True
+        mock_doc.to_dict.return_value = {"disco": "LESCO", "user_category": "protected", "person_count": 3}
+        doc_ref = mock_db.collection('users').document('user_123')
+        doc_ref.get.return_value = mock_doc
+        doc_ref.get.reset_mock()
+
+        payload = {"uid": "user_123", "month": 6}
+        self.assertEqual(self.client.post('/api/predict_bill', json=payload).status_code, 200)
+        self.assertEqual(self.client.post('/api/forecast_24h', json=payload).status_code, 200)
+        self.assertEqual(self.client.post('/api/seasonal_preview', json=payload).status_code, 200)
+        self.assertEqual(doc_ref.get.call_count, 1)
+
+        # Writes through the API invalidate the shared copy
+        self.client.post('/api/setup_profile', json={"uid": "user_123", "data": {"f_qty": 1}})
+        self.client.post('/api/predict_bill', json=payload)
+        self.assertEqual(doc_ref.get.call_count, 2)
+
+    def test_predict_bill_batch_matches_single_route(self):
+        profile = {
+            "disco": "LESCO", "user_category": "protected", "sanctioned_load": 2.0,
+            "person_count": 3, "property_area": 300, "f_qty": 2,
+            "bill_history": [{"month": "2026-04", "units": 150}, {"month": "2026-05", "units": 160}]
+        }
+        snap = MagicMock(id="user_123", exists=True)
+        snap.to_dict.return_value = profile
+        ghost = MagicMock(id="ghost", exists=False)
+        mock_db.get_all.return_value = [snap, ghost]
+
+        payload = {"uids": ["user_123", "ghost"], "profiles": [dict(profile)], "month": 8}
+        res = self.client.post('/api/predict_bill_batch', json=payload)
+        self.assertEqual(res.status_code, 200)
+        lines = [json.loads(l) for l in res.data.decode().splitlines()]
+        self.assertEqual(mock_db.get_all.call_count, 1)
+        self.assertEqual([r.get("uid") for r in lines[:3]], ["user_123", "ghost", None])
+        self.assertEqual(lines[1]["status"], "error")
+        self.assertEqual(lines[3]["summary"], {"month": 8, "success": 2, "error": 1})
+
+        # Same numbers as the per-user route
+        mock_db.collection('users').document('user_123').get.return_value = snap
+        single = json.loads(self.client.post('/api/predict_bill', json={"uid": "user_123", "month": 8}).data)
+        for record in (lines[0], lines[2]):
+            self.assertEqual(record["kwh"], single["kwh"])
+            for key in ("units", "applied_category", "is_eligible", "energy_cost", "fixed_charges", "taxes_and_fca", "total_bill"):
+                self.assertEqual(record["bill"][key], single["bill"][key])
+
+    def test_predict_bill_batch_isolates_bad_profiles(self):
+        import core.batch as batch
+        real_estimate = batch.estimate_batch
+
+        def estimate(items, cache=False):
+            if any(u.get("uid") == "broken" for u, _, _, _ in items):
+                raise ValueError("corrupt profile")
+            return real_estimate(items, cache=cache)
+
+        profiles = [{"uid": "a", "bill_history": []}, "notadict", {"uid": "broken", "bill_history": []},
+                    {"uid": "b", "bill_history": [{"month": "2026-05", "units": 120}]}]
+        with patch.object(batch, "estimate_batch", side_effect=estimate):
+            records = list(batch.iter_predict_bills(profiles=profiles, target_month=7))
+
+        self.assertEqual([r["uid"] for r in records], ["a", None, "broken", "b"])
+        self.assertEqual([r["status"] for r in records], ["success", "error", "error", "success"])
+        self.assertIn("JSON object", records[1]["error"])
+        self.assertEqual(records[2]["error"], "corrupt profile")
+
+    def test_predict_bill_batch_requires_input(self):
+        res = self.client.post('/api/predict_bill_batch', json={})
+        self.assertEqual(res.status_code, 400)
+
     @patch("routes.chat.get_gemini_response")
     def test_chat_route_success(self, mock_gemini):
         # Mock get_gemini_response response
@@ -229,6 +582,81 @@ class TestAPIEndpoints(unittest.TestCase):
         self.assertEqual(data["status"], "success")
         self.assertEqual(data["reply"], "Hello! I am your assistant.")
 
+    @patch("routes.chat.get_gemini_response", return_value="ok")
+    def test_chat_context_built_once_per_profile_version(self, mock_gemini):
+        mock_doc = MagicMock()
+        mock_doc.exists = True
+        mock_doc.to_dict.return_value = {"disco": "LESCO", "user_category": "protected", "person_count": 3}
+        mock_db.collection('users').document('user_123').get.return_value = mock_doc
+
+        import routes.chat as chat
+        with patch.object(chat, "build_user_context", wraps=chat.build_user_context) as build, \
+             patch.object(chat, "get_current_month", return_value=6):
+            for page in ("dashboard", "prediction-hub", "dashboard"):
+                res = self.client.post('/api/chat', json={"uid": "user_123", "message": "Tips?", "page": page})
+                self.assertEqual(res.status_code, 200)
+            self.assertEqual(build.call_count, 1)
+            contexts = [c.args[2] for c in mock_gemini.call_args_list]
+            self.assertEqual([c["page"] for c in contexts], ["dashboard", "prediction-hub", "dashboard"])
+            self.assertEqual(contexts[0]["predicted_bill"], contexts[1]["predicted_bill"])
+
+            # A new month or a profile edit rebuilds it
+            with patch.object(chat, "get_current_month", return_value=7):
+                self.client.post('/api/chat', json={"uid": "user_123", "message": "Tips?"})
+            self.assertEqual(build.call_count, 2)
+            mock_doc.to_dict.return_value = {**mock_doc.to_dict.return_value, "ac_inv_qty": 1}
+            user_doc_cache.clear()
+            self.client.post('/api/chat', json={"uid": "user_123", "message": "Tips?"})
+            self.assertEqual(build.call_count, 3)
+
+    @patch("routes.chat.stream_gemini_response")
+    def test_chat_stream_route_relays_chunks(self, mock_stream):
+        mock_stream.return_value = iter(["Switch to ", "inverter ACs."])
+        mock_doc = MagicMock()
+        mock_doc.exists = False
+        mock_db.collection('users').document('user_123').get.return_value = mock_doc
+
+        res = self.client.post('/api/chat/stream', json={"uid": "user_123", "message": "Tips?"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.mimetype, "text/event-stream")
+        events = [json.loads(line[len("data: "):]) for line in res.get_data(as_text=True).split("\n\n") if line]
+        self.assertEqual([e["delta"] for e in events[:-1]], ["Switch to ", "inverter ACs."])
+        self.assertTrue(events[-1]["done"])
+        self.assertEqual(events[-1]["reply"], "Switch to inverter ACs.")
+        self.assertIsInstance(events[-1]["ttft_ms"], float)
+
+    def test_chat_stream_error_midway_is_not_a_reply(self):
+        import contextlib
+        import requests
+        from utils import chat_manager
+
+        class BrokenStream:
+            status_code = 200
+
+            def iter_lines(self, chunk_size=None):
+                event = {"candidates": [{"content": {"parts": [{"text": "Switch to "}]}}]}
+                yield ("data: " + json.dumps(event)).encode()
+                raise requests.ConnectionError("connection reset")
+
+        mock_doc = MagicMock()
+        mock_doc.exists = False
+        mock_db.collection('users').document('user_123').get.return_value = mock_doc
+        message = "Tips before the connection drops?"
+
+        with patch.object(chat_manager.gemini_http, "stream", lambda *a, **kw: contextlib.nullcontext(BrokenStream())), \
+             patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"}):
+            res = self.client.post('/api/chat/stream', json={"uid": "user_123", "message": message})
+
+        events = [json.loads(line[len("data: "):]) for line in res.get_data(as_text=True).split("\n\n") if line]
+        self.assertEqual(events[0]["delta"], "Switch to ")
+        self.assertIn("connection reset", events[-1]["error"])
+        self.assertNotIn("done", events[-1])
+        self.assertFalse(any("System Connection Error" in e.get("delta", "") for e in events))
+
+    def test_chat_stream_route_requires_message(self):
+        res = self.client.post('/api/chat/stream', json={"uid": "user_123"})
+        self.assertEqual(res.status_code, 400)
+
     def test_route_user_not_found(self):
         # Mock Firestore user doc not existing
         mock_doc = MagicMock()
@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+# Ensure the backend directory is in the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Other test modules replace joblib with a MagicMock; sklearn needs the real one
+_stubbed_joblib = sys.modules.pop('joblib', None)
+try:
+    from sklearn.neighbors import NearestNeighbors
+    from sklearn.preprocessing import StandardScaler
+except ImportError:
+    NearestNeighbors = None
+finally:
+    if _stubbed_joblib is not None:
+        sys.modules['joblib'] = _stubbed_joblib
+
+from core.archetype import ArchetypeIndex
+
+FEATURES = ["No_of_ACs", "No_of_Refrigerators", "No_of_People", "No_of_UPS", "No_of_Fans", "No_of_WashingMachines"]
+
+@unittest.skipIf(NearestNeighbors is None, "scikit-learn not installed")
+class TestArchetypeIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Same setup as train_model.py; jittered counts so no query ties between houses
+        rng = np.random.default_rng(3)
+        houses = rng.integers(0, 6, size=(42, 6)) + rng.uniform(0, 0.3, size=(42, 6))
+        cls.scaler = StandardScaler().fit(houses)
+        cls.knn = NearestNeighbors(n_neighbors=3, metric='euclidean', algorithm='ball_tree')
+        cls.knn.fit(cls.scaler.transform(houses))
+        cls.house_ids = [f"House{i + 1}" for i in range(42)]
+        cls.queries = rng.integers(0, 8, size=(300, 6)).astype(np.float64)
+
+    def setUp(self):
+        self.index = ArchetypeIndex.from_sklearn(self.knn, self.scaler, self.house_ids, FEATURES)
+
+    def test_parity_with_sklearn(self):
+        dists, idxs = self.knn.kneighbors(self.scaler.transform(self.queries), n_neighbors=3)
+        got_dists, got_idxs = self.index.kneighbors(self.queries, k=3)
+        np.testing.assert_array_equal(got_idxs, idxs)
+        np.testing.assert_allclose(got_dists, dists, atol=1e-9)
+
+    def test_batched_and_single_queries_agree(self):
+        batched = self.index.nearest(self.queries)
+        self.assertEqual(len(batched), len(self.queries))
+        self.assertEqual(batched, [self.index.nearest_one(q.tolist()) for q in self.queries])
+
+    def test_memo_over_integer_inputs(self):
+        query = [1, 2, 4, 1, 8, 1]
+        first = self.index.nearest_one(query)
+        self.assertEqual(self.index.nearest_one([1.0, 2.0, 4.0, 1.0, 8.0, 1.0]), first)
+        self.assertEqual(self.index.stats()["memo_hits"], 1)
+        # Fractional inputs bypass the memo
+        self.index.nearest_one([1.5, 2, 4, 1, 8, 1])
+        self.assertEqual(self.index.stats()["memo_size"], 1)
+
+    def test_memo_is_bounded(self):
+        index = ArchetypeIndex.from_sklearn(self.knn, self.scaler, self.house_ids, FEATURES, memo_size=4)
+        for q in self.queries[:10]:
+            index.nearest_one(q)
+        self.assertEqual(index.stats()["memo_size"], 4)
+
+    def test_save_and_load_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "knn_index.npz")
+            self.index.save(path)
+            loaded = ArchetypeIndex.load(path)
+        self.assertEqual(loaded.house_ids, self.house_ids)
+        self.assertEqual(loaded.features, FEATURES)
+        self.assertEqual(loaded.nearest(self.queries), self.index.nearest(self.queries))
+
+    def test_rejects_mismatched_arrays(self):
+        with self.assertRaises(ValueError):
+            ArchetypeIndex.from_sklearn(self.knn, self.scaler, self.house_ids[:-1], FEATURES)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+
+sys.modules['firebase_admin'] = MagicMock()
+sys.modules['firebase_admin.credentials'] = MagicMock()
+sys.modules['firebase_admin.firestore'] = MagicMock()
+
+# Ensure the backend directory is in the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    import httpx
+    import asgi
+    from utils.chat_manager import reply_cache
+    from core.ml_predictor import profile_cache
+except ImportError:  # async serving extras (uvicorn/a2wsgi/httpx) not installed
+    asgi = None
+
+GEMINI_OK = {"candidates": [{"content": {"parts": [{"text": "Async reply"}]}}]}
+
+def gemini_chunk(text):
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+@unittest.skipIf(asgi is None, "async serving dependencies not installed")
+@patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"})
+class TestAsgiApp(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.gemini_requests = []
+        reply_cache.clear()
+        profile_cache.clear()
+
+        async def gemini(request):
+            self.gemini_requests.append(json.loads(request.content))
+            await asyncio.sleep(0.2)   # upstream latency
+            if "streamGenerateContent" in request.url.path:
+                events = "".join(f"data: {json.dumps(gemini_chunk(t))}\r\n\r\n" for t in ("Async ", "reply"))
+                return httpx.Response(200, text=events, headers={"content-type": "text/event-stream"})
+            return httpx.Response(200, json=GEMINI_OK)
+
+        asgi._gemini = httpx.AsyncClient(transport=httpx.MockTransport(gemini))
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await asgi._gemini.aclose()
+        asgi._gemini = None
+
+    async def test_chat_without_profile_uses_fallback_context(self):
+        with patch.object(asgi, "get_user_doc", return_value=None):
+            res = await self.client.post('/api/chat', json={"uid": "u1", "message": "hi", "displayName": "Sara Khan"},
+                                         headers={"Origin": "https://bill-optimizer.vercel.app"})
+        self.assertEqual(res.status_code, 200)
+        body = res.json()
+        self.assertEqual((body["status"], body["reply"]), ("success", "Async reply"))
+        self.assertGreater(body["usage"]["prompt_tokens_est"], 0)
+        self.assertEqual(res.headers["access-control-allow-origin"], "https://bill-optimizer.vercel.app")
+        prompt = self.gemini_requests[0]["systemInstruction"]["parts"][0]["text"]
+        self.assertIn("- User First Name: Sara", prompt)
+
+    async def test_model_work_runs_in_bounded_pool(self):
+        threads = []
+        def fake_context(u, uid, page, platform, name, email):
+            threads.append(threading.current_thread().name)
+            return {"first_name": "Ali", "page": page, "platform": platform}
+
+        with patch.object(asgi, "get_user_doc", return_value={"disco": "LESCO"}), \
+             patch.object(asgi, "build_user_context", side_effect=fake_context):
+            res = await self.client.post('/api/chat', json={"uid": "u1", "message": "hi", "page": "dashboard"})
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(threads[0].startswith("model"))
+
+    async def test_context_reused_across_turns(self):
+        calls = []
+        def fake_context(u, uid, page, platform, name, email):
+            calls.append(page)
+            return {"first_name": "Ali", "page": page, "platform": platform}
+
+        with patch.object(asgi, "get_user_doc", return_value={"disco": "LESCO"}), \
+             patch.object(asgi, "build_user_context", side_effect=fake_context):
+            for page in ("dashboard", "nepra-info"):
+                res = await self.client.post('/api/chat', json={"uid": "u1", "message": f"hi from {page}", "page": page})
+                self.assertEqual(res.status_code, 200)
+        self.assertEqual(calls, ["dashboard"])
+        prompt = self.gemini_requests[-1]["systemInstruction"]["parts"][0]["text"]
+        self.assertIn("NEPRA tariff information screen", prompt)
+
+    async def test_missing_fields_rejected(self):
+        res = await self.client.post('/api/chat', json={"uid": "u1"})
+        self.assertEqual(res.status_code, 400)
+
+    async def test_concurrent_chats_share_the_loop(self):
+        with patch.object(asgi, "get_user_doc", return_value=None):
+            start = time.perf_counter()
+            responses = await asyncio.gather(*[
+                self.client.post('/api/chat', json={"uid": f"u{i}", "message": "hi"}) for i in range(50)
+            ])
+            elapsed = time.perf_counter() - start
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+        # 50 x 200 ms upstream calls overlap instead of queueing
+        self.assertLess(elapsed, 2.0)
+
+    async def test_chat_stream_sends_server_sent_events(self):
+        with patch.object(asgi, "get_user_doc", return_value=None):
+            res = await self.client.post('/api/chat/stream', json={"uid": "u1", "message": "hi"},
+                                         headers={"Origin": "https://bill-optimizer.vercel.app"})
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.headers["content-type"].startswith("text/event-stream"))
+        self.assertEqual(res.headers["access-control-allow-origin"], "https://bill-optimizer.vercel.app")
+        events = [json.loads(chunk[len("data: "):]) for chunk in res.text.split("\n\n") if chunk]
+        self.assertEqual([e["delta"] for e in events[:-1]], ["Async ", "reply"])
+        self.assertEqual(events[-1]["reply"], "Async reply")
+        self.assertGreaterEqual(events[-1]["ttft_ms"], 200)
+
+    async def test_other_routes_served_by_flask(self):
+        res = await self.client.get('/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["status"], "online")
+
+if __name__ == '__main__':
+    unittest.main()
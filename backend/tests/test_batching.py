@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import threading
+import unittest
+import numpy as np
+
+# Ensure the backend directory is in the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.batching import MicroBatcher
+
+class SlowModel:
+    """Stand-in forward pass: fixed per-call cost, records the batch sizes it saw."""
+
+    def __init__(self, cost_s=0.02):
+        self.cost_s = cost_s
+        self.sizes = []
+
+    def __call__(self, batch):
+        self.sizes.append(len(batch))
+        time.sleep(self.cost_s)
+        return batch.sum(axis=(1, 2))[:, None] * np.ones((1, 24))
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def run_concurrently(self, batcher, inputs):
+        results = [None] * len(inputs)
+        def call(i):
+            results[i] = batcher(inputs[i], timeout=5)
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(len(inputs))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_concurrent_requests_share_forward_passes(self):
+        model = SlowModel()
+        batcher = MicroBatcher(model, max_batch=16, max_wait_ms=20)
+        inputs = [np.full((48, 10), i, dtype=np.float64) for i in range(40)]
+        results = self.run_concurrently(batcher, inputs)
+
+        # Every caller gets the row computed from its own input
+        for i, row in enumerate(results):
+            np.testing.assert_array_equal(row, np.full(24, i * 480.0))
+        self.assertLess(len(model.sizes), 10)
+        self.assertLessEqual(max(model.sizes), 16)
+        stats = batcher.stats()
+        self.assertEqual(stats["requests"], 40)
+        self.assertEqual(sum(stats["batch_sizes"].values()), stats["batches"])
+        self.assertGreater(stats["mean_batch_size"], 4)
+
+    def test_single_request_waits_at_most_max_wait(self):
+        model = SlowModel(cost_s=0.0)
+        batcher = MicroBatcher(model, max_batch=8, max_wait_ms=5)
+        start = time.perf_counter()
+        batcher(np.ones((48, 10)), timeout=5)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(batcher.stats()["batch_sizes"], {"1": 1})
+
+    def test_errors_reach_every_caller(self):
+        def broken(batch):
+            raise RuntimeError("model unavailable")
+        batcher = MicroBatcher(broken, max_batch=4, max_wait_ms=1)
+        with self.assertRaises(RuntimeError):
+            batcher(np.ones((48, 10)), timeout=5)
+        # The worker survives and keeps serving
+        batcher.batch_fn = SlowModel(cost_s=0.0)
+        self.assertEqual(batcher(np.ones((48, 10)), timeout=5).shape, (24,))
+        self.assertEqual(batcher.stats()["failures"], 1)
+
+    def test_histogram_buckets(self):
+        batcher = MicroBatcher(SlowModel(cost_s=0.0))
+        for size in (1, 2, 3, 4, 5, 9, 16, 17):
+            batcher._record([(None, None, time.perf_counter())] * size, time.perf_counter())
+        self.assertEqual(batcher.stats()["batch_sizes"], {"1": 1, "2": 1, "3-4": 2, "5-8": 1, "9-16": 2, "17-32": 1})
+
+if __name__ == '__main__':
+    unittest.main()
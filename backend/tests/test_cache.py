@@ -0,0 +1,67 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Ensure the backend directory is in the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.cache import TTLCache, profile_hash
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_hit_miss_counters(self):
+        cache = TTLCache(maxsize=4, ttl=60)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")          # "b" becomes least recently used
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        cache = TTLCache(maxsize=4, ttl=10)
+        with patch("core.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("core.cache.time.monotonic", return_value=109.0):
+            self.assertEqual(cache.get("a"), 1)
+        with patch("core.cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate_tag(self):
+        cache = TTLCache(maxsize=8, ttl=60)
+        cache.set(("h1", 6), "x", tag="uid1")
+        cache.set(("h1", 7), "y", tag="uid1")
+        cache.set(("h2", 6), "z", tag="uid2")
+        self.assertEqual(cache.invalidate_tag("uid1"), 2)
+        self.assertIsNone(cache.get(("h1", 6)))
+        self.assertEqual(cache.get(("h2", 6)), "z")
+        self.assertEqual(cache.invalidate_tag("uid1"), 0)
+
+    def test_get_or_compute_runs_once(self):
+        cache = TTLCache(maxsize=4, ttl=60)
+        calls = []
+        compute = lambda: calls.append(1) or 42
+        self.assertEqual(cache.get_or_compute("k", compute), 42)
+        self.assertEqual(cache.get_or_compute("k", compute), 42)
+        self.assertEqual(len(calls), 1)
+
+    def test_profile_hash_is_order_independent(self):
+        a = {"disco": "LESCO", "bill_history": [{"month": "2026-01", "units": 90}], "f_qty": 1}
+        b = {"f_qty": 1, "bill_history": [{"units": 90, "month": "2026-01"}], "disco": "LESCO"}
+        self.assertEqual(profile_hash(a), profile_hash(b))
+        self.assertNotEqual(profile_hash(a), profile_hash(dict(a, f_qty=2)))
+
+if __name__ == '__main__':
+    unittest.main()
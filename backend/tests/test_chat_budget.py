@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch, MagicMock
+
+# Ensure the backend directory is in the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.chat_budget import estimate_tokens, fit_history, token_metrics
+from utils.chat_manager import build_gemini_payload, get_gemini_response, reply_cache
+
+def conversation(turns, words=60):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "text": f"Question {i}: " + "why is my bill high " * (words // 5)})
+        history.append({"role": "model", "text": f"Answer {i}: " + "use inverter appliances " * (words // 3)})
+    return history
+
+class TestChatBudget(unittest.TestCase):
+
+    def test_short_history_forwarded_unchanged(self):
+        history = conversation(2, words=10)
+        kept, summary, report = fit_history(history, budget=1500)
+        self.assertEqual(kept, history)
+        self.assertEqual(summary, "")
+        self.assertEqual(report["dropped_turns"], 0)
+        self.assertEqual(report["history_tokens"], sum(estimate_tokens(m["text"]) for m in history))
+
+    def test_long_history_keeps_newest_turns_within_budget(self):
+        history = conversation(40)
+        kept, summary, report = fit_history(history, budget=600, summary_budget=80)
+        self.assertEqual(kept, history[-len(kept):])
+        self.assertEqual(kept[0]["role"], "user")
+        self.assertLessEqual(sum(estimate_tokens(m["text"]) for m in kept), 600)
+        self.assertEqual(report["dropped_turns"] + report["kept_turns"], 80)
+        # Summary lists the most recent of the dropped questions and respects its own budget
+        newest_dropped = history[-len(kept) - 2]["text"][:20]
+        self.assertIn(newest_dropped, summary)
+        self.assertNotIn("Question 0:", summary)
+        self.assertLessEqual(estimate_tokens(summary), 80)
+
+    def test_payload_carries_summary_and_usage(self):
+        usage = {}
+        payload = build_gemini_payload("Any tips?", conversation(40), {"first_name": "Ali"}, usage=usage)
+        contents = payload["contents"]
+        self.assertEqual(contents[0]["role"], "user")
+        self.assertTrue(contents[0]["parts"][0]["text"].startswith("(Earlier in this conversation"))
+        self.assertEqual(contents[-1]["parts"][-1]["text"], "Any tips?")
+        roles = [c["role"] for c in contents]
+        self.assertTrue(all(a != b for a, b in zip(roles, roles[1:])))
+        self.assertEqual(usage["kept_turns"], len(contents) - 1)
+        self.assertEqual(usage["prompt_tokens_est"],
+                         usage["system_tokens"] + usage["history_tokens"] + usage["message_tokens"])
+
+    @patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"})
+    @patch("requests.Session.post")
+    def test_response_records_gemini_token_counts(self, mock_post):
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {
+            "candidates": [{"content": {"parts": [{"text": "ok"}]}}],
+            "usageMetadata": {"promptTokenCount": 2100, "candidatesTokenCount": 42},
+        }
+        mock_post.return_value = mock_response
+        token_metrics.reset()
+        reply_cache.clear()
+
+        usage = {}
+        self.assertEqual(get_gemini_response("hi", conversation(40), {}, usage=usage), "ok")
+        self.assertEqual((usage["prompt_tokens"], usage["reply_tokens"]), (2100, 42))
+        stats = token_metrics.stats()
+        self.assertEqual((stats["requests"], stats["truncated"]), (1, 1))
+        self.assertEqual(stats["prompt_tokens"]["max"], 2100)
+
+if __name__ == '__main__':
+    unittest.main()
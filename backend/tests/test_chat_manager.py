@@ -6,10 +6,16 @@ from unittest.mock import patch, MagicMock
 # Ensure the backend directory is in the path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from utils.chat_manager import get_gemini_response
+from utils import chat_manager
+from utils.chat_manager import (get_gemini_response, build_gemini_payload, build_static_block,
+                                context_block_cache, reply_cache, reply_key, normalize_message,
+                                stream_gemini_response)
 
 class TestChatManager(unittest.TestCase):
 
+    def setUp(self):
+        reply_cache.clear()
+
     @patch.dict(os.environ, {"GEMINI_API_KEY": ""})
     def test_get_gemini_response_missing_api_key(self):
         # When API key is missing, it should return a system warning warning that the API key is not set
@@ -17,7 +23,7 @@ class TestChatManager(unittest.TestCase):
         self.assertIn("System Warning: Google Gemini API key", res)
 
     @patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"})
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_get_gemini_response_success(self, mock_post):
         # Configure successful API response
         mock_response = MagicMock()
@@ -77,7 +83,7 @@ class TestChatManager(unittest.TestCase):
         self.assertEqual(contents[2]["parts"][0]["text"], "Tell me how to save energy.")
 
     @patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"})
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_get_gemini_response_api_error(self, mock_post):
         # Simulate non-200 API error
         mock_response = MagicMock()
@@ -89,7 +95,7 @@ class TestChatManager(unittest.TestCase):
         self.assertIn("AI Service Error: Received status code 500", reply)
 
     @patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"})
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_get_gemini_response_connection_error(self, mock_post):
         # Simulate connection exception
         mock_post.side_effect = Exception("Connection Timed Out")
@@ -97,5 +103,105 @@ class TestChatManager(unittest.TestCase):
         reply = get_gemini_response("hello", [], {})
         self.assertIn("System Connection Error: Could not connect to Gemini API", reply)
 
+    def test_static_block_rendered_once_per_page_section(self):
+        # Any path that resolves to the same page section shares one rendered block
+        first = build_static_block("web", "/prediction-hub.html")
+        self.assertIs(build_static_block("web", "prediction-hub"), first)
+        self.assertIs(build_static_block("android", "/setup-profile"), build_static_block("android", "setup-profile"))
+        self.assertIn("- The user is currently viewing: /reports\n", build_static_block("web", "/reports"))
+
+    def test_context_block_cached_per_key(self):
+        context_block_cache.clear()
+        ctx = {"first_name": "Ali", "inventory": {"Standard Fans": "2 units"}}
+        with patch.object(chat_manager, "_context_block", wraps=chat_manager._context_block) as render:
+            a = build_gemini_payload("hi", [], ctx, context_key=("hash", 6))
+            b = build_gemini_payload("again", [], ctx, context_key=("hash", 6))
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(a["systemInstruction"], b["systemInstruction"])
+
+    def test_cached_content_payload(self):
+        ctx = {"first_name": "Ali", "page": "dashboard"}
+        payload = build_gemini_payload("hi", [{"role": "model", "text": "Hello!"}], ctx,
+                                       cached_content="cachedContents/abc")
+        self.assertNotIn("systemInstruction", payload)
+        self.assertEqual(payload["cachedContent"], "cachedContents/abc")
+        parts = payload["contents"][-1]["parts"]
+        self.assertIn("- User First Name: Ali", parts[0]["text"])
+        self.assertEqual(parts[1]["text"], "hi")
+
+    @patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"})
+    @patch("requests.Session.post")
+    def test_context_cache_mode_uploads_prefix_once(self, mock_post):
+        created = MagicMock(status_code=200)
+        created.json.return_value = {"name": "cachedContents/web-dash"}
+        reply = MagicMock(status_code=200)
+        reply.json.return_value = {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}
+        mock_post.side_effect = [created, reply, reply]
+
+        chat_manager._prefix_names.clear()
+        with patch.object(chat_manager, "GEMINI_CONTEXT_CACHE", True):
+            for _ in range(2):
+                self.assertEqual(get_gemini_response("hi", [], {"page": "dashboard"}), "ok")
+
+        urls = [c.args[0] for c in mock_post.call_args_list]
+        self.assertIn("cachedContents", urls[0])
+        self.assertTrue(all("generateContent" in u for u in urls[1:]))
+        self.assertEqual(mock_post.call_args.kwargs["json"]["cachedContent"], "cachedContents/web-dash")
+
+    @patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"})
+    @patch("requests.Session.post")
+    def test_context_cache_falls_back_to_inline_prompt(self, mock_post):
+        rejected = MagicMock(status_code=400)
+        rejected.json.return_value = {"error": {"message": "too few tokens"}}
+        reply = MagicMock(status_code=200)
+        reply.json.return_value = {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}
+        mock_post.side_effect = [rejected, reply]
+
+        chat_manager._prefix_names.clear()
+        with patch.object(chat_manager, "GEMINI_CONTEXT_CACHE", True):
+            self.assertEqual(get_gemini_response("hi", [], {"page": "nepra-info"}), "ok")
+        self.assertIn("systemInstruction", mock_post.call_args.kwargs["json"])
+
+    @patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"})
+    @patch("requests.Session.post")
+    def test_repeated_question_served_from_reply_cache(self, mock_post):
+        reply = MagicMock(status_code=200)
+        reply.json.return_value = {"candidates": [{"content": {"parts": [{"text": "FCA is a fuel adjustment."}]}}]}
+        mock_post.return_value = reply
+        ctx = {"first_name": "Ali", "disco": "LESCO", "page": "/nepra-info.html"}
+        hits = reply_cache.hits
+
+        self.assertEqual(get_gemini_response("What is FCA?", [], ctx), "FCA is a fuel adjustment.")
+        usage = {}
+        same_section = {**ctx, "page": "nepra-info"}
+        self.assertEqual(get_gemini_response("What is FCA?", [], same_section, usage=usage), "FCA is a fuel adjustment.")
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertTrue(usage["cached_reply"])
+        # Same question streamed is answered from the cache as one chunk
+        self.assertEqual(list(stream_gemini_response("What is FCA?", [], ctx)), ["FCA is a fuel adjustment."])
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(reply_cache.hits - hits, 2)
+
+        # Another household, page or conversation is a different entry
+        get_gemini_response("What is FCA?", [], {**ctx, "disco": "K-Electric"})
+        get_gemini_response("What is FCA?", [{"role": "user", "text": "hi"}, {"role": "model", "text": "Hello!"}], ctx)
+        get_gemini_response("What is FCA?", [], {**ctx, "page": "dashboard"})
+        self.assertEqual(mock_post.call_count, 4)
+
+    @patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"})
+    @patch("requests.Session.post")
+    def test_error_replies_not_cached(self, mock_post):
+        mock_post.return_value = MagicMock(status_code=400, text="Bad Request")
+        get_gemini_response("What is QTA?", [], {})
+        get_gemini_response("What is QTA?", [], {})
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(len(reply_cache), 0)
+
+    def test_normalized_message_keys(self):
+        self.assertEqual(normalize_message("  What is FCA? ", normalize=False), "What is FCA?")
+        self.assertEqual(normalize_message("What is  FCA?!", normalize=True), normalize_message("what is fca", normalize=True))
+        # Verbatim matching by default
+        self.assertNotEqual(reply_key("What is FCA?", [], {}), reply_key("what is fca", [], {}))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+import numpy as np
+
+# Ensure the backend directory is in the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.physics import compute_true_baseload, safe_get
+from core.features import build_feature_matrix, build_feature_vector
+
+BILL_FEATS = ["ac_monthly", "kitchen_monthly", "refrigerator_monthly", "ups_monthly", "wp_monthly",
+              "weekend_usage", "month_num", "person_count", "property_area", "meta_ac_count",
+              "meta_fridge_count", "meta_ups_count", "floors"]
+
+
+def legacy_feature_row(u, physics, m, feature_names):
+    # The dict-based construction the routes used before core.features existed
+    feature_vector = {feat: 0.0 for feat in feature_names}
+    feature_vector.update({
+        'ac_monthly': physics['ac'], 'kitchen_monthly': physics['kitchen'],
+        'refrigerator_monthly': physics['fridge'], 'ups_monthly': physics['ups'],
+        'wp_monthly': physics['water_pump'], 'weekend_usage': safe_get(u, 'mean_hourly', 0.05),
+        'month_num': float(m), 'person_count': max(safe_get(u, 'person_count', 1.0), 1.0),
+        'property_area': safe_get(u, 'property_area', 500.0), 'meta_ac_count': safe_get(u, 'ac_qty'),
+        'meta_fridge_count': safe_get(u, 'f_qty'), 'meta_ups_count': safe_get(u, 'u_qty', 0.0),
+        'floors': safe_get(u, 'floors', 1.0)
+    })
+    return [feature_vector[f] for f in feature_names]
+
+
+class TestFeatureAssembly(unittest.TestCase):
+
+    def setUp(self):
+        self.profiles = [
+            {},
+            {"person_count": "0", "property_area": 1200, "ac_qty": 2, "f_qty": 1, "u_qty": "",
+             "ac_std_qty": 1, "ac_std_val": 6, "k_qty": 1, "k_val": 0.5, "floors": 2, "mean_hourly": 0.8},
+            {"person_count": 6, "disco": "LESCO", "wp_qty": 1, "wp_val": 1.5, "u_qty": 1, "u_val": 3},
+        ]
+
+    def test_matches_legacy_dict_rows(self):
+        pairs = [(u, m) for u in self.profiles for m in range(1, 13)]
+        X = build_feature_matrix(pairs, BILL_FEATS)
+        self.assertEqual(X.shape, (len(pairs), len(BILL_FEATS)))
+        for row, (u, m) in zip(X, pairs):
+            expected = legacy_feature_row(u, compute_true_baseload(u, m), m, BILL_FEATS)
+            self.assertEqual(list(row), expected)
+
+    def test_respects_trained_column_order(self):
+        shuffled = list(reversed(BILL_FEATS)) + ["unknown_feature"]
+        u = self.profiles[1]
+        x = build_feature_vector(u, 7, shuffled)
+        expected = legacy_feature_row(u, compute_true_baseload(u, 7), 7, shuffled)
+        self.assertEqual(list(x[0]), expected)
+        self.assertEqual(x[0, -1], 0.0)
+
+    def test_reuses_supplied_physics_and_buffer(self):
+        u = self.profiles[2]
+        physics = dict(compute_true_baseload(u, 6), ac=999.0)
+        out = np.full((4, len(BILL_FEATS)), -1.0)
+        X = build_feature_matrix([(u, 6)], BILL_FEATS, [physics], out=out)
+        self.assertIs(X.base, out)
+        self.assertEqual(X[0, BILL_FEATS.index("ac_monthly")], 999.0)
+        # Stale rows past N must not reach the forest
+        self.assertEqual(X.shape, (1, len(BILL_FEATS)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+# Ensure the backend directory is in the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.forecast_table import ForecastTable, build_forecast_table, mean_grid
+
+def fake_raw_seed(house_id, month):
+    # House2 has no July window
+    if house_id == "House2" and month == 7:
+        return None
+    base = float(house_id.replace("House", "")) + month / 10
+    return np.full((48, 10), base, dtype=np.float32)
+
+def fake_rescale(seeds, user_means, months):
+    seeds[:, :, 0] *= np.reshape(user_means, (-1, 1)) / seeds[:, :, 0].mean(axis=1, keepdims=True)
+    return seeds
+
+class CountingForecast:
+    """Curve proportional to the user mean with a per-hour shape."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, seeds):
+        self.calls.append(len(seeds))
+        return seeds[:, -24:, 0] * (1 + np.arange(24) / 24)
+
+class TestForecastTable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.forecast = CountingForecast()
+        self.means = mean_grid(0.1, 5.0, 32)
+        _, self.valid = build_forecast_table(fake_raw_seed, self.forecast, fake_rescale,
+                                             ["House1", "House2"], self.means, self.tmp.name, chunk=100)
+        self.table = ForecastTable.load(self.tmp.name)
+
+    def tearDown(self):
+        del self.table
+        self.tmp.cleanup()
+
+    def test_build_shape_and_batches(self):
+        self.assertEqual(self.table.table.shape, (2, 12, 32, 24))
+        self.assertEqual(self.table.table.dtype, np.float32)
+        self.assertEqual(int(self.valid.sum()), 23)
+        # Three house-months (96 seeds) per forward pass
+        self.assertEqual(sum(self.forecast.calls), 23 * 32)
+        self.assertEqual(max(self.forecast.calls), 96)
+
+    def test_lookup_on_a_bin_matches_model(self):
+        expected = self.forecast(fake_rescale(fake_raw_seed("House1", 3)[None].copy(), [self.means[5]], [3]))[0]
+        np.testing.assert_allclose(self.table.lookup("House1", 3, self.means[5]), expected, rtol=1e-5)
+
+    def test_lookup_interpolates_between_bins(self):
+        mid = float(np.sqrt(self.means[10] * self.means[11]))
+        expected = self.forecast(fake_rescale(fake_raw_seed("House2", 4)[None].copy(), [mid], [4]))[0]
+        curve = self.table.lookup("House2", 4, mid)
+        np.testing.assert_allclose(curve, expected, rtol=0.01)
+        # The normalized shape the API scales is exact for a proportional model
+        np.testing.assert_allclose(curve / curve.sum(), expected / expected.sum(), rtol=1e-5)
+
+    def test_means_outside_grid_use_edge_bins(self):
+        np.testing.assert_allclose(self.table.lookup("House1", 1, 0.0), self.table.table[0, 0, 0], rtol=1e-6)
+        np.testing.assert_allclose(self.table.lookup("House1", 1, 50.0), self.table.table[0, 0, -1], rtol=1e-6)
+
+    def test_missing_slots(self):
+        self.assertIsNone(self.table.lookup("House2", 7, 1.0))
+        self.assertIsNone(self.table.lookup("House99", 1, 1.0))
+        self.assertIn("House1", self.table)
+
+if __name__ == '__main__':
+    unittest.main()
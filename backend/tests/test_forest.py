@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+# Ensure the backend directory is in the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Other test modules replace joblib with a MagicMock; sklearn needs the real one
+_stubbed_joblib = sys.modules.pop('joblib', None)
+try:
+    from sklearn.ensemble import RandomForestRegressor
+except ImportError:
+    RandomForestRegressor = None
+finally:
+    if _stubbed_joblib is not None:
+        sys.modules['joblib'] = _stubbed_joblib
+
+from core.forest import FlatForest, flatten_forest
+
+@unittest.skipIf(RandomForestRegressor is None, "scikit-learn not installed")
+class TestFlatForest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Same hyper-parameters as train_model.py, on synthetic bill-like data
+        rng = np.random.default_rng(7)
+        X = rng.uniform(0, 400, size=(600, 13))
+        X[:, 6] = rng.integers(1, 13, size=600)
+        y = 0.8 * X[:, 0] + 0.3 * X[:, 2] + 25 * np.sin(X[:, 6]) + rng.normal(0, 5, 600)
+        cls.rf = RandomForestRegressor(n_estimators=60, max_depth=14, min_samples_leaf=2,
+                                       max_features="sqrt", random_state=42, n_jobs=-1).fit(X, y)
+        cls.X_test = rng.uniform(0, 400, size=(200, 13))
+        cls.X_test[:, 6] = rng.integers(1, 13, size=200)
+
+    def test_parity_with_sklearn(self):
+        flat = FlatForest.from_sklearn(self.rf)
+        np.testing.assert_allclose(flat.predict(self.X_test), self.rf.predict(self.X_test), rtol=0, atol=1e-9)
+
+    def test_single_row_and_split_thresholds(self):
+        flat = FlatForest.from_sklearn(self.rf)
+        # Rows sitting exactly on split thresholds exercise the <= branch
+        tree = self.rf.estimators_[0].tree_
+        row = self.X_test[0].copy()
+        row[tree.feature[0]] = tree.threshold[0]
+        self.assertAlmostEqual(flat.predict(row)[0], self.rf.predict(row[None, :])[0], places=9)
+
+    def test_npz_round_trip(self):
+        arrays = flatten_forest(self.rf, [f"f{i}" for i in range(13)])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rf_flat.npz")
+            np.savez(path, **arrays)
+            loaded = FlatForest.load(path)
+        self.assertEqual(loaded.feature_names[0], "f0")
+        np.testing.assert_allclose(loaded.predict(self.X_test), self.rf.predict(self.X_test), rtol=0, atol=1e-9)
+
+    def test_rejects_wrong_width(self):
+        flat = FlatForest.from_sklearn(self.rf)
+        with self.assertRaises(ValueError):
+            flat.predict(np.zeros((1, 5)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import asyncio
+import time
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ensure the backend directory is in the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+from unittest.mock import patch
+from utils import chat_manager
+from utils.gemini_client import GeminiHTTPClient, backoff_delay, should_retry
+
+class StubGemini(BaseHTTPRequestHandler):
+    """Keep-alive stub that answers with the next scripted status code."""
+    protocol_version = "HTTP/1.1"
+    script = []
+    seen = []
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        StubGemini.seen.append(json.loads(self.rfile.read(length)))
+        status = StubGemini.script.pop(0) if StubGemini.script else 200
+        if "streamGenerateContent" in self.path and status == 200:
+            return self.stream_reply()
+        body = json.dumps({"candidates": [{"content": {"parts": [{"text": "stub"}]}}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_reply(self):
+        # alt=sse body in chunked transfer, one event per generated chunk
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, text in enumerate(["Save ", "energy ", "now."]):
+            if i:
+                time.sleep(0.3)   # generation time of the next chunk
+            event = json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]})
+            data = f"data: {event}\r\n\r\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+class TestGeminiClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubGemini)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/v1beta/models/x:generateContent"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubGemini.script, StubGemini.seen = [], []
+        chat_manager.reply_cache.clear()
+        self.client = GeminiHTTPClient(pool_size=2, max_retries=2, backoff_s=0.001)
+
+    def test_keep_alive_reuses_one_connection(self):
+        for _ in range(3):
+            res = self.client.post(self.url, json={"q": 1}, timeout=2)
+            self.assertEqual(res.status_code, 200)
+        stats = self.client.metrics.stats()
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertGreater(stats["connect_ms"]["max"], 0.0)
+        self.assertGreater(stats["total_ms"]["mean"], 0.0)
+
+    def test_retries_429_and_5xx(self):
+        StubGemini.script = [429, 503]
+        res = self.client.post(self.url, json={"q": 1}, timeout=2)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["candidates"][0]["content"]["parts"][0]["text"], "stub")
+        self.assertEqual(len(StubGemini.seen), 3)
+        self.assertEqual(self.client.metrics.stats()["retries"], 2)
+
+    def test_gives_up_after_max_retries(self):
+        StubGemini.script = [500, 500, 500, 500]
+        res = self.client.post(self.url, json={"q": 1}, timeout=2)
+        self.assertEqual(res.status_code, 500)
+        self.assertEqual(len(StubGemini.seen), 3)
+
+    def test_client_errors_not_retried(self):
+        StubGemini.script = [400]
+        self.assertEqual(self.client.post(self.url, json={}, timeout=2).status_code, 400)
+        self.assertEqual(len(StubGemini.seen), 1)
+
+    def test_connection_refused_counts_failure(self):
+        dead = "http://127.0.0.1:9/generateContent"
+        with self.assertRaises(requests.ConnectionError):
+            self.client.post(dead, json={}, timeout=1)
+        self.assertEqual(self.client.metrics.stats()["failures"], 1)
+
+    def test_async_path_shares_policy(self):
+        try:
+            import httpx
+        except ImportError:
+            self.skipTest("httpx not installed")
+        StubGemini.script = [502]
+
+        async def run():
+            async with httpx.AsyncClient() as client:
+                return await self.client.post_async(client, self.url, json={"q": 1}, timeout=2)
+
+        res = asyncio.run(run())
+        self.assertEqual(res.status_code, 200)
+        stats = self.client.metrics.stats()
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertGreater(stats["wait_ms"]["max"], 0.0)
+
+    def test_stream_relays_chunks_as_they_arrive(self):
+        StubGemini.script = [503]
+        url = self.url.replace("generateContent", "streamGenerateContent")
+        arrivals = []
+        with patch.object(chat_manager, "gemini_http", self.client), \
+             patch.object(chat_manager, "GEMINI_STREAM_URL", url), \
+             patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"}):
+            start = time.perf_counter()
+            for text in chat_manager.stream_gemini_response("hi", [], {}):
+                arrivals.append((text, time.perf_counter() - start))
+
+        self.assertEqual("".join(t for t, _ in arrivals), "Save energy now.")
+        # First chunk is relayed before the rest has been generated
+        self.assertLess(arrivals[0][1], 0.3)
+        self.assertGreater(arrivals[-1][1], 0.5)
+        stats = self.client.metrics.stats()
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["streams"], 1)
+        self.assertLess(stats["first_token_ms"]["max"], 300)
+        self.assertGreater(stats["read_ms"]["max"], 500)
+
+    def test_stream_error_status_returns_message(self):
+        StubGemini.script = [400]
+        url = self.url.replace("generateContent", "streamGenerateContent")
+        with patch.object(chat_manager, "gemini_http", self.client), \
+             patch.object(chat_manager, "GEMINI_STREAM_URL", url), \
+             patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"}):
+            chunks = list(chat_manager.stream_gemini_response("hi", [], {}))
+        self.assertEqual(len(chunks), 1)
+        self.assertIn("AI Service Error: Received status code 400", chunks[0])
+
+    def test_async_stream_relays_chunks(self):
+        try:
+            import httpx
+        except ImportError:
+            self.skipTest("httpx not installed")
+        url = self.url.replace("generateContent", "streamGenerateContent")
+
+        async def run():
+            async with httpx.AsyncClient() as client:
+                return [t async for t in chat_manager.stream_gemini_response_async("hi", [], {}, client)]
+
+        with patch.object(chat_manager, "gemini_http", self.client), \
+             patch.object(chat_manager, "GEMINI_STREAM_URL", url), \
+             patch.dict(os.environ, {"GEMINI_API_KEY": "fake_api_key"}):
+            chunks = asyncio.run(run())
+        self.assertEqual(chunks, ["Save ", "energy ", "now."])
+        self.assertEqual(self.client.metrics.stats()["streams"], 1)
+
+    def test_retry_policy_helpers(self):
+        self.assertTrue(should_retry(429))
+        self.assertTrue(should_retry(503))
+        self.assertFalse(should_retry(404))
+        for attempt in range(4):
+            self.assertTrue(0 <= backoff_delay(0.25, attempt) <= 0.25 * 2 ** attempt)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import subprocess
+import textwrap
+import unittest
+import numpy as np
+
+# Ensure the backend directory is in the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import MODELS_DIR
+from core.lstm_runtime import NumpyForecaster, LSTM_WEIGHTS_FILE
+
+WEIGHTS_PATH = os.path.join(MODELS_DIR, LSTM_WEIGHTS_FILE)
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Keras outputs of lstm_forecaster.keras on fixed inputs; regenerate after retraining
+REFERENCE_PATH = os.path.join(os.path.dirname(__file__), "data", "lstm_keras_reference.npz")
+
+# Other test modules stub tensorflow in this process, so Keras runs in its own interpreter
+KERAS_PARITY = textwrap.dedent("""
+    import os, sys
+    import numpy as np
+    try:
+        from config import MODELS_DIR, configure_tensorflow
+        tf = configure_tensorflow()
+    except ImportError:
+        sys.exit(77)
+    from core.lstm_runtime import NumpyForecaster, LSTM_WEIGHTS_FILE
+    x = np.random.default_rng(11).normal(size=(8, 48, 10)).astype(np.float32)
+    keras_model = tf.keras.models.load_model(os.path.join(MODELS_DIR, "lstm_forecaster.keras"))
+    numpy_model = NumpyForecaster.load(os.path.join(MODELS_DIR, LSTM_WEIGHTS_FILE))
+    print(float(np.abs(numpy_model.predict(x) - keras_model.predict(x, verbose=0)).max()))
+""")
+
+class TestNumpyForecaster(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model = NumpyForecaster.load(WEIGHTS_PATH)
+        cls.x = np.random.default_rng(3).normal(size=(4, 48, 10)).astype(np.float32)
+
+    def test_output_shape(self):
+        out = self.model.predict(self.x, verbose=0)
+        self.assertEqual(out.shape, (4, 24))
+        self.assertTrue(np.all(np.isfinite(out)))
+
+    def test_batch_matches_single_rows(self):
+        batched = self.model.predict(self.x)
+        for i in range(len(self.x)):
+            np.testing.assert_allclose(self.model.predict(self.x[i:i + 1])[0], batched[i], rtol=1e-5, atol=1e-6)
+
+    def test_matches_stored_keras_reference(self):
+        with np.load(REFERENCE_PATH) as ref:
+            np.testing.assert_allclose(self.model.predict(ref["x"]), ref["y"], rtol=1e-4, atol=1e-5)
+
+    def test_parity_with_keras(self):
+        proc = subprocess.run([sys.executable, "-c", KERAS_PARITY], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=300)
+        if proc.returncode == 77:
+            self.skipTest("TensorFlow not available")
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertLess(float(proc.stdout.strip().splitlines()[-1]), 1e-4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import os
 import sys
 import unittest
+import numpy as np
 
 # Ensure the backend directory is in the path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -97,5 +98,24 @@ class TestNepraEngine(unittest.TestCase):
         # Fixed charges for non_protected: units <= 300 -> rate_per_kw = 350.0
         self.assertEqual(res["fixed_charges"], 3.0 * 350.0)
 
+    def test_calculate_bills_matches_scalar(self):
+        rng = np.random.default_rng(0)
+        units = np.concatenate([rng.uniform(0, 900, 3000), rng.integers(0, 900, 1000),
+                                [0, 50, 50.5, 100, 100.05, 200, 300, 700, 700.5, 1200]])
+        loads = rng.choice([1.0, 2.0, 3.5, 7.0], len(units))
+        cats = rng.choice(["lifeline", "protected", "non_protected"], len(units))
+        eligible = rng.random(len(units)) < 0.7
+
+        batch = self.engine.calculate_bills(units, loads, cats, eligible)
+        for i in range(len(units)):
+            ref = self.engine.calculate_bill(float(units[i]), float(loads[i]), str(cats[i]), bool(eligible[i]))
+            for key, value in ref.items():
+                self.assertEqual(batch[key][i], value, f"{key} @ units={units[i]}, {cats[i]}")
+
+    def test_calculate_bills_broadcasts_scalars(self):
+        res = self.engine.calculate_bills([40, 150, 250], load_kw=2.0, user_category="protected")
+        self.assertEqual(list(res["applied_category"]), ["protected", "protected", "non_protected"])
+        self.assertEqual(res["fixed_charges"].tolist(), [400.0, 600.0, 700.0])
+
 if __name__ == '__main__':
     unittest.main()
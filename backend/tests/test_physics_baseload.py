@@ -1,6 +1,7 @@
 import os
 import sys
 import unittest
+import numpy as np
 from unittest.mock import MagicMock
 
 # 1. Mock external heavy modules before importing app.py to speed up tests and avoid loading models/Firebase
@@ -21,6 +22,8 @@ from core.physics import (
     get_seasonal_fan_scale,
     apply_seasonal_scaling,
     compute_true_baseload,
+    compute_true_baseload_batch,
+    profile_table,
     encode_cyclical
 )
 from core.history import compute_recency_weighted_avg, compute_usage_drift
@@ -126,6 +129,29 @@ class TestPhysicsBaseload(unittest.TestCase):
         # = 1 * 0.746 * 1.0 * 30.0 = 22.38
         self.assertAlmostEqual(res["water_pump"], 22.38)
 
+    def test_compute_true_baseload_batch_matches_scalar(self):
+        profiles = [
+            {},
+            {"disco": "LESCO", "person_count": "4", "property_area": 2500, "fan_ac_qty": 3, "fan_dc_qty": 2,
+             "ac_std_qty": 1, "ac_std_val": 8.5, "ac_inv_qty": 2, "ac_inv_val": 10.3, "f_qty": 2, "f_type": "old",
+             "wp_qty": 1, "wp_val": 1.3, "wp_type": 1.5, "k_qty": 1, "k_val": 0.7, "wm_qty": 1, "wm_val": 1.5,
+             "wm_type": "automatic", "u_qty": 2, "u_val": 6, "iron_qty": 1, "iron_val": 0.5, "iron_freq": 12},
+            {"disco": "Unknown DISCO", "person_count": "", "property_area": "n/a", "f_qty": 1, "wm_type": None},
+            {"disco": None, "person_count": 0, "property_area": 50, "fan_ac_qty": None, "u_qty": 1, "u_val": 3.3},
+        ]
+        months = np.arange(1, 13)
+        batch = compute_true_baseload_batch(profile_table(profiles), months)
+        for i, u in enumerate(profiles):
+            for j, m in enumerate(months):
+                for key, value in compute_true_baseload(u, int(m)).items():
+                    self.assertEqual(batch[key][i, j], value, f"{key} profile={i} month={m}")
+
+        # Per-profile months, (N, M)
+        per_row = np.array([[6], [1], [13], [8]])
+        batch = compute_true_baseload_batch(profile_table(profiles), per_row)
+        for i, u in enumerate(profiles):
+            self.assertEqual(batch["total"][i, 0], compute_true_baseload(u, int(per_row[i, 0]))["total"])
+
     def test_compute_recency_weighted_avg(self):
         # Empty history
         self.assertEqual(compute_recency_weighted_avg([]), 0.0)
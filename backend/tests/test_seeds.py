@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+# Ensure the backend directory is in the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.seeds import SeedTable, export_seed_table
+
+def fake_seed_doc(doc_id):
+    # House2 has no July window; everything else is a deterministic ramp
+    if doc_id == "House2_month_7":
+        return None
+    house, _, month = doc_id.partition("_month_")
+    base = float(house.replace("House", "")) * 100 + int(month)
+    return {"data": (base + np.arange(480) / 1000.0).tolist(), "rows": 48, "cols": 10}
+
+class TestSeedTable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.valid = export_seed_table(fake_seed_doc, ["House1", "House2"], self.tmp.name, n_features=10)
+        self.table = SeedTable.load(self.tmp.name)
+
+    def tearDown(self):
+        del self.table
+        self.tmp.cleanup()
+
+    def test_export_shape_and_mask(self):
+        self.assertEqual(self.table.table.shape, (2, 12, 48, 10))
+        self.assertIsInstance(self.table.table, np.memmap)
+        self.assertEqual(int(self.valid.sum()), 23)
+        self.assertFalse(self.valid[1, 6])
+
+    def test_lookup_matches_firestore_document(self):
+        seed = self.table.lookup("House2", 3)
+        expected = np.asarray(fake_seed_doc("House2_month_3")["data"], dtype=np.float32).reshape(48, 10)
+        np.testing.assert_array_equal(seed, expected)
+        self.assertEqual(seed.dtype, np.float32)
+
+    def test_lookup_returns_writable_copy(self):
+        seed = self.table.lookup("House1", 1)
+        seed[:, 0] *= 2
+        np.testing.assert_array_equal(self.table.lookup("House1", 1)[:, 0], seed[:, 0] / 2)
+
+    def test_missing_slots(self):
+        self.assertIsNone(self.table.lookup("House2", 7))
+        self.assertIsNone(self.table.lookup("House99", 1))
+        self.assertIn("House1", self.table)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -280,6 +280,13 @@ joblib.dump(rf_model, os.path.join(MODELS_DIR, "rf_bill_predictor.pkl"))
 joblib.dump(BILL_FEATURES, os.path.join(MODELS_DIR, "bill_features.pkl"))
 print(f"\n  ✅  Saved: models/rf_bill_predictor.pkl")
 
+# ── Export flat node arrays for the serving-time forest evaluator ──
+from core.forest import flatten_forest, FlatForest, FLAT_FOREST_FILE
+flat_arrays = flatten_forest(rf_model, BILL_FEATURES)
+np.savez(os.path.join(MODELS_DIR, FLAT_FOREST_FILE), **flat_arrays)
+flat_diff = np.abs(FlatForest(flat_arrays).predict(X_bill.values) - rf_model.predict(X_bill)).max()
+print(f"  ✅  Saved: models/{FLAT_FOREST_FILE}  (max |flat - sklearn| = {flat_diff:.2e} kWh)")
+
 # In-sample sanity check
 y_kwh_pred  = rf_model.predict(X_bill)
 y_bill_pred = np.array([calc_nepra_bill(k) for k in y_kwh_pred])
@@ -517,6 +524,11 @@ if TRAIN_LSTM:
         json.dump(meta, f, indent=2)
 
     print(f"  ✅  Saved: models/lstm_forecaster.keras")
+
+    # ── Export plain weight arrays for the TensorFlow-free serving runtime ──
+    from core.lstm_runtime import export_keras_weights, LSTM_WEIGHTS_FILE
+    export_keras_weights(model, os.path.join(MODELS_DIR, LSTM_WEIGHTS_FILE))
+    print(f"  ✅  Saved: models/{LSTM_WEIGHTS_FILE}")
     print(f"  ✅  Saved: models/lstm_meta.json")
 
 
@@ -530,6 +542,7 @@ print(f"""
 
   ┌─────────────────────────────────────────────────────────────┐
   │  rf_bill_predictor.pkl     — Monthly bill prediction (RF)   │
+  │  rf_flat.npz               — Flattened RF for fast serving  │
   │  bill_features.pkl         — 13 features, zero leakage      │
   │  house_label_encoder.pkl   — House ID encoder               │
   │  seasonal_coefficients.json— Month → AC/Fan scale table     │
@@ -538,6 +551,7 @@ print(f"""
   │  knn_house_ids.pkl         — House ID array for KNN output  │
   │  knn_features.pkl          — Feature list for KNN input     │
   │  lstm_forecaster.keras     — 24h forecaster (BiLSTM v2)     │
+  │  lstm_weights.npz          — BiLSTM weights (NumPy serving) │
   │  lstm_scaler.pkl           — Global scaler for LSTM         │
   │  lstm_meta.json            — LSTM config & performance      │
   └─────────────────────────────────────────────────────────────┘
@@ -0,0 +1,109 @@
+import math
+import threading
+
+from config import CHAT_HISTORY_TOKEN_BUDGET, CHAT_SUMMARY_TOKEN_BUDGET, CHAT_CHARS_PER_TOKEN
+
+# ─────────────────────────────────────────
+#  CHAT HISTORY TOKEN BUDGET
+# ─────────────────────────────────────────
+# The client resends the whole conversation every turn. Only the newest
+# turns that fit CHAT_HISTORY_TOKEN_BUDGET are forwarded to Gemini; the
+# user questions of the older turns are folded into a one-line summary so
+# the assistant still knows what was discussed. Token counts are estimated
+# from text length (no tokenizer round trip); Gemini's own usageMetadata
+# is recorded next to the estimate once the reply arrives.
+_SUMMARY_PREFIX = "(Earlier in this conversation the user asked: "
+_QUESTION_CHARS = 120
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHAT_CHARS_PER_TOKEN)
+
+
+def _summarize(dropped: list, budget: int) -> str:
+    """Most recent dropped user questions, newest last, within `budget` tokens."""
+    questions = []
+    used = estimate_tokens(_SUMMARY_PREFIX) + 1
+    for msg in reversed(dropped):
+        if msg.get("role") != "user" or not msg.get("text"):
+            continue
+        text = " ".join(msg["text"].split())
+        if len(text) > _QUESTION_CHARS:
+            text = text[:_QUESTION_CHARS - 3] + "..."
+        cost = estimate_tokens(text) + 1
+        if used + cost > budget:
+            break
+        questions.append(text)
+        used += cost
+    if not questions:
+        return ""
+    return _SUMMARY_PREFIX + "; ".join(reversed(questions)) + ")"
+
+
+def fit_history(history: list, budget: int = CHAT_HISTORY_TOKEN_BUDGET,
+                summary_budget: int = CHAT_SUMMARY_TOKEN_BUDGET) -> tuple:
+    """
+    (kept turns, summary text, report) for a [{'role', 'text'}] history.
+    Kept turns are the newest ones within `budget` tokens, starting on a user
+    turn so roles still alternate once the summary is prepended to it.
+    """
+    kept, used = [], 0
+    for msg in reversed(history):
+        cost = estimate_tokens(msg.get("text", ""))
+        if used + cost > budget:
+            break
+        kept.append(msg)
+        used += cost
+    kept.reverse()
+    while kept and kept[0].get("role") != "user":
+        used -= estimate_tokens(kept.pop(0).get("text", ""))
+
+    dropped = history[:len(history) - len(kept)]
+    summary = _summarize(dropped, summary_budget) if dropped else ""
+    report = {
+        "history_turns":  len(history),
+        "kept_turns":     len(kept),
+        "dropped_turns":  len(dropped),
+        "history_tokens": used + estimate_tokens(summary),
+    }
+    return kept, summary, report
+
+
+class TokenMetrics:
+    """Thread-safe per-request token aggregates for /api/metrics."""
+
+    FIELDS = ("prompt_tokens_est", "history_tokens", "prompt_tokens", "reply_tokens")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = self.truncated = self.dropped_turns = 0
+            self._sum = dict.fromkeys(self.FIELDS, 0)
+            self._max = dict.fromkeys(self.FIELDS, 0)
+
+    def record(self, usage: dict) -> None:
+        with self._lock:
+            self.requests += 1
+            self.dropped_turns += usage.get("dropped_turns", 0)
+            self.truncated += 1 if usage.get("dropped_turns") else 0
+            for field in self.FIELDS:
+                value = usage.get(field, 0)
+                self._sum[field] += value
+                self._max[field] = max(self._max[field], value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = self.requests
+            return {
+                "requests":      n,
+                "truncated":     self.truncated,
+                "dropped_turns": self.dropped_turns,
+                **{f: {"mean": round(self._sum[f] / n, 1) if n else 0.0, "max": self._max[f]}
+                   for f in self.FIELDS},
+            }
+
+
+token_metrics = TokenMetrics()
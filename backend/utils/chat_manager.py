@@ -1,63 +1,99 @@
 import os
-import requests
+import re
 import json
+import threading
+import time
 
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-3.1-flash-lite:generateContent"
+from config import (CHAT_CONTEXT_CACHE_SIZE, PROFILE_CACHE_TTL, GEMINI_CONTEXT_CACHE, GEMINI_CACHE_TTL_S,
+                    CHAT_REPLY_CACHE_SIZE, CHAT_REPLY_CACHE_TTL, CHAT_REPLY_CACHE_NORMALIZE)
+from core.cache import TTLCache, profile_hash
+from utils.gemini_client import gemini_http
+from utils.chat_budget import estimate_tokens, fit_history, token_metrics
 
-def get_gemini_response(user_message: str, history: list, user_context: dict) -> str:
-    """
-    Sends chat history and dynamic user context to the Gemini API using raw HTTP requests.
-    This eliminates the need for large third-party generative-ai libraries.
-    """
-    api_key = os.environ.get("GEMINI_API_KEY", "")
-    if not api_key:
-        return "System Warning: Google Gemini API key (GEMINI_API_KEY) is not set in the server environment. Please configure it to enable the AI Energy Assistant."
+GEMINI_MODEL = "gemini-3.1-flash-lite"
+GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+GEMINI_STREAM_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:streamGenerateContent"
+GEMINI_CACHE_URL = "https://generativelanguage.googleapis.com/v1beta/cachedContents"
+GEMINI_TIMEOUT = 8
+
+# ─────────────────────────────────────────
+#  SYSTEM INSTRUCTION
+# ─────────────────────────────────────────
+# Assembled as header + per-user context + static platform/page/rules block.
+# The static block needs only (platform, page), so the async server builds
+# it while the user's Firestore document is still being fetched. Static
+# blocks are rendered once per (platform, page section) and reused; context
+# blocks are cached per profile when the caller passes a context key.
+_PROMPT_HEADER = (
+    "You are the 'AI Energy Assistant', an expert domestic energy conservation advisor "
+    "calibrated for Pakistani households under NEPRA tariff regulations.\n\n"
+    
+    "PROJECT INFORMATION:\n"
+    "- Title: AI-Powered Electricity Bill Optimization using Machine Learning\n"
+    "- Department: Department of Software Engineering, Sir Syed University of Engineering & Technology (SSUET), Karachi, Pakistan.\n"
+            "- FYP Developers / Group Members & Responsibilities:\n"
+    "  * Mudasir Ali (2022F-SE-030): Developed the core Hybrid Neural Pipeline, preprocessed the LUMS PRECON dataset, and implemented model validation suites (Note to AI: Mudasir Ali holds the titles of 'Group Leader' and 'Team Lead').\n"
+    "  * Haider Rizwan (2022F-SE-020): Engineered the Flask REST API environment and hardcoded the complex NEPRA 2026 fiscal tariff rule constraints.\n"
+    "  * Abu Bakar Saqib (2022F-SE-037): Architected the Cloud Firestore NoSQL schema structures and managed database synchronization pipelines.\n"
+    "  * Abdullah Tahir (2022F-SE-080): Designed the single-page application (SPA) portal layout and integrated interactive frontend Chart.js visualization canvas assets.\n"
+    "- Tech Stack: Python Flask, scikit-learn, TensorFlow (Bidirectional LSTM), Firebase Auth & Firestore NoSQL, Vercel, DigitalOcean.\n\n"
+)
+
+
+_CONTEXT_TEMPLATE = (
+    "USER HOUSEHOLD CONTEXT:\n"
+    "- User First Name: {first_name}\n"
+    "- User Full Name: {full_name}\n"
+    "- User Email: {email}\n"
+    "- Grid Provider (DISCO): {disco}\n"
+    "- NEPRA Billing Category: {category_display} (Protected Status: {is_protected}, Lifeline Status: {is_lifeline})\n"
+    "- Sanctioned Load Capacity: {sanctioned_load} kW\n"
+    "- Profile Completeness Score: {completeness_score} / 16\n"
+    "- Matched PRECON Archetype: {archetype}\n"
+    "- Current Month's Predicted Consumption: {predicted_units} kWh\n"
+    "- Current Month's Estimated Bill: Rs. {predicted_bill}\n\n"
+
+    "USER APPLIANCE INVENTORY SUMMARY:\n"
+)
+_CONTEXT_DEFAULTS = {
+    "first_name": "User", "full_name": "User", "email": "Unknown", "disco": "Unknown",
+    "category_display": "Unknown", "is_protected": "No", "is_lifeline": "No",
+    "sanctioned_load": "1.0", "completeness_score": "0", "archetype": "None",
+    "predicted_units": "0", "predicted_bill": "0",
+}
+
+# Rendered context blocks by caller-supplied key (profile hash, month, ...)
+context_block_cache = TTLCache(maxsize=CHAT_CONTEXT_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
 
-    # 1. Construct the system instruction prompt with full user profile context and page context
-    sys_instruction = (
-        "You are the 'AI Energy Assistant', an expert domestic energy conservation advisor "
-        "calibrated for Pakistani households under NEPRA tariff regulations.\n\n"
-        
-        "PROJECT INFORMATION:\n"
-        "- Title: AI-Powered Electricity Bill Optimization using Machine Learning\n"
-        "- Department: Department of Software Engineering, Sir Syed University of Engineering & Technology (SSUET), Karachi, Pakistan.\n"
-                "- FYP Developers / Group Members & Responsibilities:\n"
-        "  * Mudasir Ali (2022F-SE-030): Developed the core Hybrid Neural Pipeline, preprocessed the LUMS PRECON dataset, and implemented model validation suites (Note to AI: Mudasir Ali holds the titles of 'Group Leader' and 'Team Lead').\n"
-        "  * Haider Rizwan (2022F-SE-020): Engineered the Flask REST API environment and hardcoded the complex NEPRA 2026 fiscal tariff rule constraints.\n"
-        "  * Abu Bakar Saqib (2022F-SE-037): Architected the Cloud Firestore NoSQL schema structures and managed database synchronization pipelines.\n"
-        "  * Abdullah Tahir (2022F-SE-080): Designed the single-page application (SPA) portal layout and integrated interactive frontend Chart.js visualization canvas assets.\n"
-        "- Tech Stack: Python Flask, scikit-learn, TensorFlow (Bidirectional LSTM), Firebase Auth & Firestore NoSQL, Vercel, DigitalOcean.\n\n"
-        
-        "USER HOUSEHOLD CONTEXT:\n"
-        f"- User First Name: {user_context.get('first_name', 'User')}\n"
-        f"- User Full Name: {user_context.get('full_name', 'User')}\n"
-        f"- User Email: {user_context.get('email', 'Unknown')}\n"
-        f"- Grid Provider (DISCO): {user_context.get('disco', 'Unknown')}\n"
-        f"- NEPRA Billing Category: {user_context.get('category_display', 'Unknown')} (Protected Status: {user_context.get('is_protected', 'No')}, Lifeline Status: {user_context.get('is_lifeline', 'No')})\n"
-        f"- Sanctioned Load Capacity: {user_context.get('sanctioned_load', '1.0')} kW\n"
-        f"- Profile Completeness Score: {user_context.get('completeness_score', '0')} / 16\n"
-        f"- Matched PRECON Archetype: {user_context.get('archetype', 'None')}\n"
-        f"- Current Month's Predicted Consumption: {user_context.get('predicted_units', '0')} kWh\n"
-        f"- Current Month's Estimated Bill: Rs. {user_context.get('predicted_bill', '0')}\n\n"
-        
-        "USER APPLIANCE INVENTORY SUMMARY:\n"
-    )
+
+def _context_block(user_context: dict) -> str:
+    """Household context + appliance inventory of the current user."""
+    block = _CONTEXT_TEMPLATE.format_map({**_CONTEXT_DEFAULTS, **user_context})
 
     # Append inventory details
     inv = user_context.get("inventory", {})
     if inv:
-        for app, val in inv.items():
-            sys_instruction += f"  - {app}: {val}\n"
+        block += "".join(f"  - {app}: {val}\n" for app, val in inv.items())
     else:
-        sys_instruction += "  - No inventory registered yet.\n"
+        block += "  - No inventory registered yet.\n"
+    return block
+
+
+def context_block(user_context: dict, context_key=None) -> str:
+    """_context_block, memoized under `context_key` when one is given."""
+    if context_key is None:
+        return _context_block(user_context)
+    return context_block_cache.get_or_compute(context_key, lambda: _context_block(user_context))
+
 
+def _render_static_block(platform: str, page: str) -> str:
+    """Platform, navigation, page and behaviour sections; depends on no user data."""
     # Inject platform and app navigation instructions
-    platform = user_context.get("platform", "web")
-    sys_instruction += f"\nACCESSING PLATFORM CONTEXT:\n"
-    sys_instruction += f"- The user is currently interacting with you via the: {platform.upper()} client interface.\n"
+    block = f"\nACCESSING PLATFORM CONTEXT:\n"
+    block += f"- The user is currently interacting with you via the: {platform.upper()} client interface.\n"
     
-    sys_instruction += "\nAPPLICATION ROUTES & FEATURES DIRECTORY:\n"
-    sys_instruction += (
+    block += "\nAPPLICATION ROUTES & FEATURES DIRECTORY:\n"
+    block += (
         "- Setup Profile: This is the page where the user can re-calibrate/add new records or configure their appliance inventory quantities (Standard/Inverter ACs, refrigerator, washing machine, water pump, UPS, etc.) and DISCO profile. Guide them here if they want to change their AC counts, DISCO, or raw billing history!\n"
         "- Profile Settings: The user can update their display name, view local diagnostics, export billing history & appliance configuration as a CSV, reset profile data, or permanently delete their account. Warn the user to be careful since reset and delete are destructive and irreversible.\n"
         "- Prediction Hub: Displays overall predicted monthly consumption units, bills, and NEPRA slab levels.\n"
@@ -69,39 +105,38 @@ def get_gemini_response(user_message: str, history: list, user_context: dict) ->
         "- Dashboard: Main hub showing summary metrics.\n"
     )
     if platform == "android":
-        sys_instruction += (
+        block += (
             "You MUST acknowledge that the user is running the system inside the native Android App wrapper (AI Bill Optimizer Android Client).\n"
             "If the user asks what device, platform, or interface they are using, explicitly confirm they are on the **Android mobile application**!\n"
             "Explain that the Android wrapper loads the unified web dashboard natively so they have access to the exact same screens.\n"
         )
 
     # Inject page context if present
-    page = user_context.get("page", "")
     if page:
-        sys_instruction += f"\nCURRENT PAGE CONTEXT:\n"
+        block += f"\nCURRENT PAGE CONTEXT:\n"
         if "dashboard" in page:
-            sys_instruction += "- The user is currently viewing the main dashboard page. Provide a general overview or quick navigation tips for saving energy.\n"
+            block += "- The user is currently viewing the main dashboard page. Provide a general overview or quick navigation tips for saving energy.\n"
         elif "setup-profile" in page:
-            sys_instruction += "- The user is currently in the Setup Profile screen, mapping their household inventory. Guide them on standard vs. inverter appliances and explain that quantity 0 means 'Not Owned'.\n"
+            block += "- The user is currently in the Setup Profile screen, mapping their household inventory. Guide them on standard vs. inverter appliances and explain that quantity 0 means 'Not Owned'.\n"
         elif "appliance-simulator" in page:
-            sys_instruction += "- The user is currently in the interactive Appliance Swap Simulator. Explain that they can toggle standard appliances with inverter models to estimate savings in real-time.\n"
+            block += "- The user is currently in the interactive Appliance Swap Simulator. Explain that they can toggle standard appliances with inverter models to estimate savings in real-time.\n"
         elif "load-forecaster" in page:
-            sys_instruction += "- The user is currently viewing the Load Forecaster screen. The hourly target curve displays baseline predictions modeled from their matched PRECON household archetype using our Bidirectional LSTM network.\n"
+            block += "- The user is currently viewing the Load Forecaster screen. The hourly target curve displays baseline predictions modeled from their matched PRECON household archetype using our Bidirectional LSTM network.\n"
         elif "prediction-hub" in page:
-            sys_instruction += "- The user is in the Prediction Hub, which displays the overall monthly cost and slabs. If they are close to the 200-unit Protected limit, warn them explicitly.\n"
+            block += "- The user is in the Prediction Hub, which displays the overall monthly cost and slabs. If they are close to the 200-unit Protected limit, warn them explicitly.\n"
         elif "nepra-info" in page:
-            sys_instruction += "- The user is currently on the NEPRA tariff information screen. Help them understand slabs, FCA, and QTA definitions.\n"
+            block += "- The user is currently on the NEPRA tariff information screen. Help them understand slabs, FCA, and QTA definitions.\n"
         elif "about-us" in page:
-            sys_instruction += "- The user is currently on the About Us page, which documents SSUET credentials and the PRECON sensor channels vs. calibrated physics signatures.\n"
+            block += "- The user is currently on the About Us page, which documents SSUET credentials and the PRECON sensor channels vs. calibrated physics signatures.\n"
         elif "ai-memory" in page:
-            sys_instruction += "- The user is currently on the AI Memory screen, viewing the active context dataset stored in Firestore. Help them understand their profile metrics, baseline values, and how you use them to calculate predictions.\n"
+            block += "- The user is currently on the AI Memory screen, viewing the active context dataset stored in Firestore. Help them understand their profile metrics, baseline values, and how you use them to calculate predictions.\n"
         elif "profile" in page:
-            sys_instruction += "- The user is currently viewing the Profile Settings page (profile.html). On this screen, they can edit their display name, inspect local diagnostics, download CSV reports, reset data, or delete their account. If they want to change their DISCO, appliances count, or raw history, guide them to the [Setup Profile](setup-profile) page instead.\n"
+            block += "- The user is currently viewing the Profile Settings page (profile.html). On this screen, they can edit their display name, inspect local diagnostics, download CSV reports, reset data, or delete their account. If they want to change their DISCO, appliances count, or raw history, guide them to the [Setup Profile](setup-profile) page instead.\n"
         else:
-            sys_instruction += f"- The user is currently viewing: {page}\n"
+            block += f"- The user is currently viewing: {page}\n"
 
     # Strict behavioral rules
-    sys_instruction += (
+    block += (
         "\nRULES FOR YOUR BEHAVIOR:\n"
         "1. Be extremely concise, brief, and direct. Avoid extra text or pleasantries unless asked.\n"
         "2. If the user's input is a simple greeting (e.g., 'hi', 'hello', 'hey', 'greetings'), reply with a single, warm, one-sentence greeting (e.g., 'Hello! How can I assist you with your energy-saving goals today?'). Do NOT output developer details, SSUET info, or household status lists for simple greetings unless the user explicitly asks for them.\n"
@@ -117,12 +152,60 @@ def get_gemini_response(user_message: str, history: list, user_context: dict) ->
         "12. If the user asks for the Android App version, mobile application, download release, APK, or GitHub link, explain that the Android app is hosted on GitHub and provide the clickable download link to the latest release: [AI Bill Optimizer Android App (Latest Release)](https://github.com/mudasirunar/bill-optimizer/releases/latest). The AI must know that the app is hosted on GitHub Releases and is NOT available on the Google Play Store; however, do NOT explain or mention this Play Store absence to the user unless they explicitly ask why it is not on the Play Store or where it is hosted.\n"
         "13. Actively guide and inform the user about key platform screens: if they want to learn about the development team or SSUET department details, direct them to check the **About Us** page; if they want to inspect official Pakistani tariff rates, consumer slabs, FCA, or QTA definitions, direct them to the **NEPRA Info** page.\n"
     )
+    return block
+
+
+# Same precedence as the page if/elif chain of _render_static_block
+_PAGE_SECTIONS = ("dashboard", "setup-profile", "appliance-simulator", "load-forecaster", "prediction-hub",
+                  "nepra-info", "about-us", "ai-memory", "profile")
+_MAX_STATIC_BLOCKS = 256
+
+_static_blocks = {}
+
+
+def static_key(platform: str = "web", page: str = "") -> tuple:
+    """(platform, page section); unknown pages are echoed verbatim so keep the raw path."""
+    if not page:
+        return platform, ""
+    return platform, next((s for s in _PAGE_SECTIONS if s in page), page)
+
+
+def build_static_block(platform: str = "web", page: str = "") -> str:
+    key = static_key(platform, page)
+    block = _static_blocks.get(key)
+    if block is None:
+        block = _render_static_block(platform, page)
+        if len(_static_blocks) < _MAX_STATIC_BLOCKS:
+            _static_blocks[key] = block
+    return block
+
+
+# Every page the web and Android clients can send, rendered at import
+for _platform in ("web", "android"):
+    for _section in ("",) + _PAGE_SECTIONS:
+        build_static_block(_platform, _section)
+
+
+def build_system_instruction(user_context: dict, static_block: str = None, context_key=None) -> str:
+    if static_block is None:
+        static_block = build_static_block(user_context.get("platform", "web"), user_context.get("page", ""))
+    return _PROMPT_HEADER + context_block(user_context, context_key) + static_block
+
 
-    # 2. Build the contents list representing the conversational history
+def build_gemini_payload(user_message: str, history: list, user_context: dict, static_block: str = None,
+                         context_key=None, cached_content: str = None, usage: dict = None) -> dict:
+    """
+    generateContent body. With `cached_content` (a cachedContents name holding
+    header + static block) only the user's context block travels, as the first
+    part of the current message. History is cut to the token budget, and
+    `usage`, when given, receives the estimated token counts of the request.
+    """
+    # 1. Build the contents list from the newest history turns within the token budget
+    kept, summary, report = fit_history(history)
     contents = []
     
     # Map input history (format: [{'role': 'user'|'model', 'text': '...'}] ) to Gemini schema
-    for msg in history:
+    for msg in kept:
         role = "user" if msg.get("role") == "user" else "model"
         contents.append({
             "role": role,
@@ -135,32 +218,359 @@ def get_gemini_response(user_message: str, history: list, user_context: dict) ->
         "parts": [{"text": user_message}]
     })
 
-    # 3. Create payload
-    payload = {
-        "contents": contents,
-        "systemInstruction": {
-            "parts": [{"text": sys_instruction}]
-        },
-        "generationConfig": {
-            "temperature": 0.2,
-            "maxOutputTokens": 500
+    # Older turns survive as a summary in front of the first forwarded user turn
+    if summary:
+        contents[0]["parts"].insert(0, {"text": summary})
+
+    # 2. Attach the prompt: the full system instruction, or the per-user part
+    #    next to a reference to the cached static prefix
+    payload = {"contents": contents}
+    if cached_content is None:
+        prompt_text = build_system_instruction(user_context, static_block, context_key)
+        payload["systemInstruction"] = {
+            "parts": [{"text": prompt_text}]
         }
+    else:
+        prompt_text = context_block(user_context, context_key)
+        contents[-1]["parts"].insert(0, {"text": prompt_text})
+        payload["cachedContent"] = cached_content
+
+    # 3. Generation settings
+    payload["generationConfig"] = {
+        "temperature": 0.2,
+        "maxOutputTokens": 500
+    }
+
+    if usage is not None:
+        usage.update(report)
+        usage["system_tokens"] = estimate_tokens(prompt_text)
+        usage["message_tokens"] = estimate_tokens(user_message)
+        usage["prompt_tokens_est"] = usage["system_tokens"] + report["history_tokens"] + usage["message_tokens"]
+    return payload
+
+
+# ─────────────────────────────────────────
+#  GEMINI CONTEXT CACHE (GEMINI_CONTEXT_CACHE=1)
+# ─────────────────────────────────────────
+# One cachedContents entry per static key, renewed shortly before its TTL
+# runs out. A failed upload is remembered for a minute and the request goes
+# out with the full inline system instruction instead.
+_CACHE_RETRY_S = 60
+
+_prefix_names = {}   # static key -> (cachedContents name or None, valid until)
+_prefix_lock = threading.Lock()
+
+
+def _prefix_request(static_block: str) -> dict:
+    return {
+        "model": f"models/{GEMINI_MODEL}",
+        "systemInstruction": {"parts": [{"text": _PROMPT_HEADER + static_block}]},
+        "ttl": f"{GEMINI_CACHE_TTL_S}s",
     }
 
+
+def _fresh_prefix(key):
+    entry = _prefix_names.get(key)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry
+    return None
+
+
+def _store_prefix(key, status_code: int, json_fn):
+    name = json_fn().get("name") if status_code == 200 else None
+    valid_for = GEMINI_CACHE_TTL_S * 0.9 if name else _CACHE_RETRY_S
+    with _prefix_lock:
+        _prefix_names[key] = (name, time.monotonic() + valid_for)
+    return name
+
+
+def cached_prefix(api_key: str, key, static_block: str):
+    """Name of the cachedContents entry for `key`, creating it if needed; None if unavailable."""
+    entry = _fresh_prefix(key)
+    if entry is not None:
+        return entry[0]
+    try:
+        res = gemini_http.post(f"{GEMINI_CACHE_URL}?key={api_key}", json=_prefix_request(static_block),
+                               headers={"Content-Type": "application/json"}, timeout=GEMINI_TIMEOUT)
+        return _store_prefix(key, res.status_code, res.json)
+    except Exception:
+        return _store_prefix(key, 0, dict)
+
+
+async def cached_prefix_async(api_key: str, key, static_block: str, client):
+    entry = _fresh_prefix(key)
+    if entry is not None:
+        return entry[0]
+    try:
+        res = await gemini_http.post_async(client, f"{GEMINI_CACHE_URL}?key={api_key}",
+                                           json=_prefix_request(static_block),
+                                           headers={"Content-Type": "application/json"}, timeout=GEMINI_TIMEOUT)
+        return _store_prefix(key, res.status_code, res.json)
+    except Exception:
+        return _store_prefix(key, 0, dict)
+
+
+def _static_parts(user_context: dict, static_block: str = None) -> tuple:
+    platform, page = user_context.get("platform", "web"), user_context.get("page", "")
+    if static_block is None:
+        static_block = build_static_block(platform, page)
+    return static_key(platform, page), static_block
+
+
+def _prepare_payload(api_key: str, user_message: str, history: list, user_context: dict, context_key=None,
+                     usage: dict = None) -> dict:
+    key, static_block = _static_parts(user_context)
+    cached = cached_prefix(api_key, key, static_block) if GEMINI_CONTEXT_CACHE else None
+    return build_gemini_payload(user_message, history, user_context, static_block, context_key, cached, usage)
+
+
+async def _prepare_payload_async(api_key: str, user_message: str, history: list, user_context: dict,
+                                 client, static_block: str = None, context_key=None, usage: dict = None) -> dict:
+    key, static_block = _static_parts(user_context, static_block)
+    cached = await cached_prefix_async(api_key, key, static_block, client) if GEMINI_CONTEXT_CACHE else None
+    return build_gemini_payload(user_message, history, user_context, static_block, context_key, cached, usage)
+
+
+# ─────────────────────────────────────────
+#  REPLY CACHE
+# ─────────────────────────────────────────
+# FAQ-style questions ("what is FCA?") are asked over and over against the
+# same household context. Successful replies are kept per (message, platform,
+# page section, context hash, history hash); the message is compared
+# verbatim, or case/punctuation/whitespace-insensitively with
+# CHAT_REPLY_CACHE_NORMALIZE=1. The history is part of the key so that
+# follow-ups like "why?" never get an answer given to another conversation.
+reply_cache = TTLCache(maxsize=CHAT_REPLY_CACHE_SIZE, ttl=CHAT_REPLY_CACHE_TTL)
+
+_NOT_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_message(text: str, normalize: bool = CHAT_REPLY_CACHE_NORMALIZE) -> str:
+    if not normalize:
+        return text.strip()
+    return " ".join(_NOT_WORD.sub("", text.lower()).split())
+
+
+def reply_key(user_message: str, history: list, user_context: dict) -> tuple:
+    platform, page = user_context.get("platform", "web"), user_context.get("page", "")
+    context = {k: v for k, v in user_context.items() if k not in ("platform", "page")}
+    return (normalize_message(user_message), static_key(platform, page),
+            profile_hash(context), profile_hash(history) if history else "")
+
+
+def _store_reply(key, status_code: int, reply: str) -> None:
+    if status_code == 200 and reply not in (_UNPARSABLE, _EMPTY_REPLY):
+        reply_cache.set(key, reply)
+
+
+def _missing_key_warning() -> str:
+    return "System Warning: Google Gemini API key (GEMINI_API_KEY) is not set in the server environment. Please configure it to enable the AI Energy Assistant."
+
+
+def _record_usage(usage: dict, data: dict) -> None:
+    """Gemini's own prompt/reply token counts (usageMetadata) next to the estimates."""
+    meta = data.get("usageMetadata")
+    if usage is not None and meta:
+        usage["prompt_tokens"] = meta.get("promptTokenCount", 0)
+        usage["reply_tokens"] = meta.get("candidatesTokenCount", 0)
+
+
+_UNPARSABLE = "AI Service Error: Could not parse response candidate structures."
+_EMPTY_REPLY = "Error: Empty response content from AI model."
+
+
+def _parse_gemini_response(status_code: int, text: str, json_fn, usage: dict = None) -> str:
+    if status_code != 200:
+        return f"AI Service Error: Received status code {status_code} from Gemini. Response details: {text[:150]}"
+        
+    data = json_fn()
+    _record_usage(usage, data)
+    candidates = data.get("candidates", [])
+    if candidates:
+        parts = candidates[0].get("content", {}).get("parts", [])
+        if parts:
+            return parts[0].get("text", _EMPTY_REPLY)
+    
+    return _UNPARSABLE
+
+
+def get_gemini_response(user_message: str, history: list, user_context: dict, context_key=None,
+                        usage: dict = None) -> str:
+    """
+    Sends chat history and dynamic user context to the Gemini API using raw HTTP requests.
+    This eliminates the need for large third-party generative-ai libraries.
+    `context_key` (e.g. profile hash + month) lets the rendered context block be reused;
+    `usage`, when given, is filled with the token counts of the request.
+    """
+    api_key = os.environ.get("GEMINI_API_KEY", "")
+    if not api_key:
+        return _missing_key_warning()
+
+    usage = {} if usage is None else usage
+    rkey = reply_key(user_message, history, user_context)
+    cached_reply = reply_cache.get(rkey)
+    if cached_reply is not None:
+        usage["cached_reply"] = True
+        return cached_reply
+
+    payload = _prepare_payload(api_key, user_message, history, user_context, context_key, usage)
+
     # 4. Make HTTP Post Request
     try:
         url = f"{GEMINI_API_URL}?key={api_key}"
-        res = requests.post(url, json=payload, headers={"Content-Type": "application/json"}, timeout=8)
-        if res.status_code != 200:
-            return f"AI Service Error: Received status code {res.status_code} from Gemini. Response details: {res.text[:150]}"
-            
-        data = res.json()
-        candidates = data.get("candidates", [])
-        if candidates:
-            parts = candidates[0].get("content", {}).get("parts", [])
-            if parts:
-                return parts[0].get("text", "Error: Empty response content from AI model.")
-        
-        return "AI Service Error: Could not parse response candidate structures."
+        res = gemini_http.post(url, json=payload, headers={"Content-Type": "application/json"}, timeout=GEMINI_TIMEOUT)
+        reply = _parse_gemini_response(res.status_code, res.text, res.json, usage)
+        _store_reply(rkey, res.status_code, reply)
+        return reply
     except Exception as e:
         return f"System Connection Error: Could not connect to Gemini API. Details: {str(e)}"
+    finally:
+        token_metrics.record(usage)
+
+
+async def get_gemini_response_async(user_message: str, history: list, user_context: dict,
+                                    client, static_block: str = None, context_key=None, usage: dict = None) -> str:
+    """
+    Asyncio variant for the ASGI server: `client` is a shared httpx.AsyncClient,
+    so thousands of replies can be awaited without a thread each.
+    Returns the same strings as get_gemini_response.
+    """
+    api_key = os.environ.get("GEMINI_API_KEY", "")
+    if not api_key:
+        return _missing_key_warning()
+
+    usage = {} if usage is None else usage
+    rkey = reply_key(user_message, history, user_context)
+    cached_reply = reply_cache.get(rkey)
+    if cached_reply is not None:
+        usage["cached_reply"] = True
+        return cached_reply
+
+    payload = await _prepare_payload_async(api_key, user_message, history, user_context, client,
+                                           static_block, context_key, usage)
+    try:
+        url = f"{GEMINI_API_URL}?key={api_key}"
+        res = await gemini_http.post_async(client, url, json=payload, headers={"Content-Type": "application/json"},
+                                           timeout=GEMINI_TIMEOUT)
+        reply = _parse_gemini_response(res.status_code, res.text, res.json, usage)
+        _store_reply(rkey, res.status_code, reply)
+        return reply
+    except Exception as e:
+        return f"System Connection Error: Could not connect to Gemini API. Details: {str(e)}"
+    finally:
+        token_metrics.record(usage)
+
+
+# ─────────────────────────────────────────
+#  STREAMED REPLIES (streamGenerateContent)
+# ─────────────────────────────────────────
+# alt=sse makes Gemini send one `data: {...}` line per generated chunk. The
+# time from sending the request to the first text chunk is recorded in
+# gemini_http.metrics (first_token_ms).
+
+
+def _sse_texts(line, usage: dict = None) -> list:
+    """Reply text carried by one line of an alt=sse stream (usageMetadata goes to `usage`)."""
+    if isinstance(line, bytes):
+        line = line.decode("utf-8")
+    if not line.startswith("data:"):
+        return []
+    data = json.loads(line[5:])
+    _record_usage(usage, data)
+    candidate = (data.get("candidates") or [{}])[0]
+    return [p["text"] for p in candidate.get("content", {}).get("parts", []) if p.get("text")]
+
+
+def stream_gemini_response(user_message: str, history: list, user_context: dict, context_key=None,
+                           usage: dict = None):
+    """
+    Generator twin of get_gemini_response: yields the reply text chunk by chunk
+    as Gemini generates it. Failures before the first chunk come through as
+    the same messages get_gemini_response returns; a failure after it is
+    raised, so callers can end the stream with an error instead of a reply.
+    """
+    api_key = os.environ.get("GEMINI_API_KEY", "")
+    if not api_key:
+        yield _missing_key_warning()
+        return
+
+    usage = {} if usage is None else usage
+    rkey = reply_key(user_message, history, user_context)
+    cached_reply = reply_cache.get(rkey)
+    if cached_reply is not None:
+        usage["cached_reply"] = True
+        yield cached_reply
+        return
+
+    payload = _prepare_payload(api_key, user_message, history, user_context, context_key, usage)
+    parts = []
+    try:
+        url = f"{GEMINI_STREAM_URL}?alt=sse&key={api_key}"
+        start = time.perf_counter()
+        with gemini_http.stream(url, json=payload, headers={"Content-Type": "application/json"},
+                                timeout=GEMINI_TIMEOUT) as res:
+            if res.status_code != 200:
+                yield _parse_gemini_response(res.status_code, res.text, res.json)
+                return
+            for line in res.iter_lines(chunk_size=None):
+                for text in _sse_texts(line, usage):
+                    if not parts:
+                        gemini_http.metrics.record_first_token(time.perf_counter() - start)
+                    parts.append(text)
+                    yield text
+        if parts:
+            _store_reply(rkey, 200, "".join(parts))
+        else:
+            yield _UNPARSABLE
+    except Exception as e:
+        if parts:
+            raise   # a partial answer must not be finished as a successful reply
+        yield f"System Connection Error: Could not connect to Gemini API. Details: {str(e)}"
+    finally:
+        token_metrics.record(usage)
+
+
+async def stream_gemini_response_async(user_message: str, history: list, user_context: dict,
+                                       client, static_block: str = None, context_key=None, usage: dict = None):
+    """Async-generator twin of stream_gemini_response for the ASGI server."""
+    api_key = os.environ.get("GEMINI_API_KEY", "")
+    if not api_key:
+        yield _missing_key_warning()
+        return
+
+    usage = {} if usage is None else usage
+    rkey = reply_key(user_message, history, user_context)
+    cached_reply = reply_cache.get(rkey)
+    if cached_reply is not None:
+        usage["cached_reply"] = True
+        yield cached_reply
+        return
+
+    payload = await _prepare_payload_async(api_key, user_message, history, user_context, client,
+                                           static_block, context_key, usage)
+    parts = []
+    try:
+        url = f"{GEMINI_STREAM_URL}?alt=sse&key={api_key}"
+        start = time.perf_counter()
+        async with gemini_http.stream_async(client, url, json=payload, headers={"Content-Type": "application/json"},
+                                            timeout=GEMINI_TIMEOUT) as res:
+            if res.status_code != 200:
+                await res.aread()
+                yield _parse_gemini_response(res.status_code, res.text, res.json)
+                return
+            async for line in res.aiter_lines():
+                for text in _sse_texts(line, usage):
+                    if not parts:
+                        gemini_http.metrics.record_first_token(time.perf_counter() - start)
+                    parts.append(text)
+                    yield text
+        if parts:
+            _store_reply(rkey, 200, "".join(parts))
+        else:
+            yield _UNPARSABLE
+    except Exception as e:
+        if parts:
+            raise   # a partial answer must not be finished as a successful reply
+        yield f"System Connection Error: Could not connect to Gemini API. Details: {str(e)}"
+    finally:
+        token_metrics.record(usage)
@@ -0,0 +1,264 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from config import GEMINI_POOL_SIZE, GEMINI_MAX_RETRIES, GEMINI_BACKOFF_S
+
+# ─────────────────────────────────────────
+#  POOLED GEMINI HTTP CLIENT
+# ─────────────────────────────────────────
+# One keep-alive session per process, so a chat turn only pays DNS/TCP/TLS
+# when the pool has no idle connection. 429/5xx answers and failed connects
+# are retried with full-jitter exponential backoff. Every request records
+# how long it spent connecting, waiting for the first response byte and
+# reading the body; streamed replies also record time to the first token.
+
+PHASES = ("connect", "wait", "read", "total")
+
+_timing = threading.local()
+
+
+def _track_connect(connect):
+    def timed(self):
+        start = time.perf_counter()
+        try:
+            return connect(self)
+        finally:
+            _timing.connect = getattr(_timing, "connect", 0.0) + time.perf_counter() - start
+            _timing.new_connections = getattr(_timing, "new_connections", 0) + 1
+    return timed
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    connect = _track_connect(HTTPConnection.connect)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    connect = _track_connect(HTTPSConnection.connect)
+
+
+class _TimedHTTPPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPPool, "https": _TimedHTTPSPool}
+
+
+def should_retry(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+def backoff_delay(base_s: float, attempt: int) -> float:
+    """Full jitter: uniform in [0, base * 2^attempt]."""
+    return random.uniform(0, base_s * (2 ** attempt))
+
+
+class PhaseMetrics:
+    """Thread-safe request counters and per-phase latency aggregates (ms)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = self.retries = self.failures = self.new_connections = 0
+            self._sum = dict.fromkeys(PHASES, 0.0)
+            self._max = dict.fromkeys(PHASES, 0.0)
+            self.streams, self._ttft_sum, self._ttft_max = 0, 0.0, 0.0
+
+    def record(self, phases: dict, new_connections: int = 0) -> None:
+        with self._lock:
+            self.requests += 1
+            self.new_connections += new_connections
+            for phase in PHASES:
+                ms = phases.get(phase, 0.0) * 1000
+                self._sum[phase] += ms
+                self._max[phase] = max(self._max[phase], ms)
+
+    def record_first_token(self, seconds: float) -> None:
+        with self._lock:
+            ms = seconds * 1000
+            self.streams += 1
+            self._ttft_sum += ms
+            self._ttft_max = max(self._ttft_max, ms)
+
+    def count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = self.requests
+            return {
+                "requests":        n,
+                "retries":         self.retries,
+                "failures":        self.failures,
+                "new_connections": self.new_connections,
+                **{f"{p}_ms": {"mean": round(self._sum[p] / n, 2) if n else 0.0,
+                               "max":  round(self._max[p], 2)} for p in PHASES},
+                "streams":         self.streams,
+                "first_token_ms":  {"mean": round(self._ttft_sum / self.streams, 2) if self.streams else 0.0,
+                                    "max":  round(self._ttft_max, 2)},
+            }
+
+
+class _PhaseTrace:
+    """httpcore trace hook: splits an httpx request into connect / wait / read."""
+
+    GROUPS = {"connect_tcp": "connect", "start_tls": "connect",
+              "send_request": "wait", "receive_response_headers": "wait",
+              "receive_response_body": "read"}
+
+    def __init__(self):
+        self.started, self.spent, self.new_connections = {}, dict.fromkeys(PHASES, 0.0), 0
+
+    async def __call__(self, event: str, info: dict):
+        name, _, edge = event.rpartition(".")
+        phase = next((p for key, p in self.GROUPS.items() if key in name), None)
+        if phase is None:
+            return
+        if edge == "started":
+            self.started[name] = time.perf_counter()
+        elif edge in ("complete", "failed") and name in self.started:
+            self.spent[phase] += time.perf_counter() - self.started.pop(name)
+            if "connect_tcp" in name and edge == "complete":
+                self.new_connections += 1
+
+
+class GeminiHTTPClient:
+    def __init__(self, pool_size: int = GEMINI_POOL_SIZE, max_retries: int = GEMINI_MAX_RETRIES,
+                 backoff_s: float = GEMINI_BACKOFF_S):
+        self.max_retries = max_retries
+        self.backoff_s   = backoff_s
+        self.metrics     = PhaseMetrics()
+        self.session     = requests.Session()
+        adapter = _TimedAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _post_once(self, url, **kwargs) -> requests.Response:
+        _timing.connect, _timing.new_connections = 0.0, 0
+        start = time.perf_counter()
+        res = self.session.post(url, stream=True, **kwargs)
+        headers_at = time.perf_counter()
+        res.content  # read the body while timing it
+        end = time.perf_counter()
+        connect = _timing.connect
+        self.metrics.record({"connect": connect, "wait": headers_at - start - connect,
+                             "read": end - headers_at, "total": end - start}, _timing.new_connections)
+        return res
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """session.post with retries; the final response is returned whatever its status."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                res = self._post_once(url, **kwargs)
+            except requests.ConnectionError:
+                if attempt == self.max_retries:
+                    self.metrics.count("failures")
+                    raise
+            else:
+                if not should_retry(res.status_code) or attempt == self.max_retries:
+                    return res
+            self.metrics.count("retries")
+            time.sleep(backoff_delay(self.backoff_s, attempt))
+
+    async def post_async(self, client, url: str, **kwargs):
+        """Same retry policy and metrics for a shared httpx.AsyncClient."""
+        import httpx
+        for attempt in range(self.max_retries + 1):
+            trace = _PhaseTrace()
+            start = time.perf_counter()
+            try:
+                res = await client.post(url, extensions={"trace": trace}, **kwargs)
+            except httpx.ConnectError:
+                if attempt == self.max_retries:
+                    self.metrics.count("failures")
+                    raise
+            else:
+                self.metrics.record({**trace.spent, "total": time.perf_counter() - start}, trace.new_connections)
+                if not should_retry(res.status_code) or attempt == self.max_retries:
+                    return res
+            self.metrics.count("retries")
+            await asyncio.sleep(backoff_delay(self.backoff_s, attempt))
+
+    def _open_once(self, url, **kwargs):
+        _timing.connect, _timing.new_connections = 0.0, 0
+        start = time.perf_counter()
+        res = self.session.post(url, stream=True, **kwargs)
+        return res, start, time.perf_counter(), _timing.connect, _timing.new_connections
+
+    @contextmanager
+    def stream(self, url: str, **kwargs):
+        """
+        post() with the body left unread, for streamGenerateContent: retries
+        apply until response headers arrive, and the read phase lasts until
+        the caller leaves the block.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                res, start, headers_at, connect, new = self._open_once(url, **kwargs)
+            except requests.ConnectionError:
+                if attempt == self.max_retries:
+                    self.metrics.count("failures")
+                    raise
+            else:
+                if not should_retry(res.status_code) or attempt == self.max_retries:
+                    break
+                res.close()
+                self.metrics.record({"connect": connect, "wait": headers_at - start - connect,
+                                     "total": headers_at - start}, new)
+            self.metrics.count("retries")
+            time.sleep(backoff_delay(self.backoff_s, attempt))
+        try:
+            yield res
+        finally:
+            res.close()
+            end = time.perf_counter()
+            self.metrics.record({"connect": connect, "wait": headers_at - start - connect,
+                                 "read": end - headers_at, "total": end - start}, new)
+
+    @asynccontextmanager
+    async def stream_async(self, client, url: str, **kwargs):
+        """stream() for a shared httpx.AsyncClient."""
+        import httpx
+        for attempt in range(self.max_retries + 1):
+            trace = _PhaseTrace()
+            start = time.perf_counter()
+            try:
+                request = client.build_request("POST", url, extensions={"trace": trace}, **kwargs)
+                res = await client.send(request, stream=True)
+            except httpx.ConnectError:
+                if attempt == self.max_retries:
+                    self.metrics.count("failures")
+                    raise
+            else:
+                if not should_retry(res.status_code) or attempt == self.max_retries:
+                    break
+                await res.aclose()
+                self.metrics.record({**trace.spent, "total": time.perf_counter() - start}, trace.new_connections)
+            self.metrics.count("retries")
+            await asyncio.sleep(backoff_delay(self.backoff_s, attempt))
+        try:
+            yield res
+        finally:
+            await res.aclose()
+            self.metrics.record({**trace.spent, "total": time.perf_counter() - start}, trace.new_connections)
+
+
+gemini_http = GeminiHTTPClient()
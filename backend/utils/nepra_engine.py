@@ -1,3 +1,8 @@
+import numpy as np
+
+from utils.rounding import round_like_python
+
+
 class NepraEngine:
     def __init__(self):
         # 2026 Fuel Cost Adjustment (July 2026 rate: Rs. 0.3364)
@@ -21,7 +26,32 @@ class NepraEngine:
             (100, 275.0), (200, 300.0), (300, 350.0), 
             (400, 400.0), (500, 500.0), (700, 675.0), (float('inf'), 675.0)
         ]
-    
+
+        # 3. CUMULATIVE SLAB TABLES (array API)
+        self._protected_table = self._cumulative_slabs(self.protected_slabs)
+        self._non_protected_table = self._cumulative_slabs(self.non_protected_slabs)
+        self._np_fixed_limits = np.array([limit for limit, _ in self.fixed_rates_non_protected])
+        self._np_fixed_rates = np.array([rate for _, rate in self.fixed_rates_non_protected])
+
+    @staticmethod
+    def _cumulative_slabs(slabs):
+        """(upper bounds, lower bounds, rates, cost of all full slabs below) for a slab list."""
+        uppers = np.array([high for _, high, _ in slabs], dtype=np.float64)
+        lowers = np.concatenate([[0.0], uppers[:-1]])
+        rates = np.array([rate for _, _, rate in slabs], dtype=np.float64)
+        # Summed in slab order, exactly as the scalar walk accumulates them
+        cum = [0.0]
+        for low, high, rate in zip(lowers[:-1], uppers[:-1], rates[:-1]):
+            cum.append(cum[-1] + (high - low) * rate)
+        return uppers, lowers, rates, np.array(cum)
+
+    @staticmethod
+    def _slab_energy(units, table):
+        uppers, lowers, rates, cum = table
+        # Units beyond the last finite bound are clipped; callers mask them out
+        k = np.minimum(np.searchsorted(uppers, units, side="left"), len(rates) - 1)
+        return cum[k] + (units - lowers[k]) * rates[k]
+
     def check_eligibility(self, history_units: list, user_category: str) -> bool:
         """
         NEPRA Dual-Status Rule Engine:
@@ -107,4 +137,56 @@ class NepraEngine:
             "fixed_charges": round(fixed_total, 2),
             "taxes_and_fca": round(gst + ed + fca + qta + tv_fee, 2),
             "total_bill": round(total, 0)
-        }
\ No newline at end of file
+        }
+
+    def calculate_bills(self, units, load_kw=1.0, user_category="non_protected", is_eligible=True):
+        """
+        Columnar calculate_bill: `units`, `load_kw`, `user_category` and
+        `is_eligible` are arrays (or scalars, broadcast against units).
+        Returns a dict of arrays with the same keys and values as the scalar path.
+        """
+        units = np.asarray(units, dtype=np.float64)
+        units, load_kw, user_category, is_eligible = np.broadcast_arrays(
+            units, np.asarray(load_kw, dtype=np.float64),
+            np.asarray(user_category), np.asarray(is_eligible, dtype=bool))
+
+        lifeline = (user_category == "lifeline") & is_eligible & (units <= 100)
+        protected = ~lifeline & (user_category == "protected") & is_eligible & (units <= 200)
+        standard = ~(lifeline | protected)
+
+        # A. LIFELINE: flat rate on all units, no fixed charges, tax exempt
+        energy_cost = np.where(units <= 50, units * 3.95, units * 7.74)
+        fixed_total = np.zeros_like(units)
+
+        # B. PROTECTED
+        energy_cost = np.where(protected, self._slab_energy(units, self._protected_table), energy_cost)
+        rate_per_kw = np.where(units <= 100, self.fixed_rates_protected[100], self.fixed_rates_protected[200])
+        fixed_total = np.where(protected, load_kw * rate_per_kw, fixed_total)
+
+        # C. NON-PROTECTED
+        np_energy = np.where(units > 0, self._slab_energy(units, self._non_protected_table), 0.0)
+        energy_cost = np.where(standard, np_energy, energy_cost)
+        k = np.minimum(np.searchsorted(self._np_fixed_limits, units, side="left"), len(self._np_fixed_rates) - 1)
+        fixed_total = np.where(standard, load_kw * self._np_fixed_rates[k], fixed_total)
+
+        # --- STEP 2: Taxes & Surcharges ---
+        gst_rate = np.where(lifeline, 0.0, 0.18)
+        ed_rate = np.where(lifeline, 0.0, 0.015)
+        fca = units * self.current_fca
+        qta = np.where(lifeline, 0.0, units * self.current_qta)
+        gst = (energy_cost + fixed_total + fca + qta) * gst_rate
+        ed = energy_cost * ed_rate
+        tv_fee = np.where(lifeline, 0.0, 35.0)
+
+        total = energy_cost + fixed_total + fca + qta + gst + ed + tv_fee
+
+        applied_category = np.where(lifeline, "lifeline", np.where(protected, "protected", "non_protected"))
+        return {
+            "units": round_like_python(units, 1),
+            "applied_category": applied_category,
+            "is_eligible": is_eligible.copy(),
+            "energy_cost": round_like_python(energy_cost, 2),
+            "fixed_charges": round_like_python(fixed_total, 2),
+            "taxes_and_fca": round_like_python(gst + ed + fca + qta + tv_fee, 2),
+            "total_bill": np.array(np.round(total, 0))
+        }
@@ -0,0 +1,16 @@
+import numpy as np
+
+
+def round_like_python(x, decimals: int = 0) -> np.ndarray:
+    """
+    Element-wise round(x, decimals) with the exact results of Python's
+    round(). np.round scales by 10**decimals first, which can tip values
+    sitting just below a tie to the other side; those few are redone in Python.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.array(np.round(x, decimals))
+    scaled = x * 10.0 ** decimals
+    tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if tie.any():
+        out[tie] = [round(v, decimals) for v in x[tie].tolist()]
+    return out
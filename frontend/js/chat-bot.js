@@ -272,7 +272,7 @@
 
             try {
                 // Post payload to backend chat endpoint
-                const url = (typeof API_BASE_URL !== "undefined") ? `${API_BASE_URL}/api/chat` : "http://127.0.0.1:5001/api/chat";
+                const url = (typeof API_BASE_URL !== "undefined") ? `${API_BASE_URL}/api/chat/stream` : "http://127.0.0.1:5001/api/chat/stream";
                 const isAndroid = navigator.userAgent.includes("AiBillOptimizerAndroid");
                 const platform = isAndroid ? "android" : "web";
                 const displayName = localStorage.getItem('userDisplayName') || '';
@@ -333,21 +333,28 @@
                     return;
                 }
 
-                const data = await res.json();
-                
+                // Server-sent events: {"delta"} per reply chunk as it is generated,
+                // then {"status", "reply", "ttft_ms"} (or {"error"}) to close the stream
                 const pendingBubble = document.getElementById("chatPendingReply");
+                const data = await readChatStream(res, (partial) => {
+                    if (!pendingBubble) return;
+                    const threshold = 55;
+                    const isNearBottom = (chatMessages.scrollHeight - chatMessages.scrollTop - chatMessages.clientHeight) <= threshold;
+                    pendingBubble.innerHTML = formatMarkdown(partial);
+                    if (isNearBottom) {
+                        chatMessages.scrollTop = chatMessages.scrollHeight;
+                    }
+                });
+
                 if (data.status === "success" && data.reply) {
                     if (typeof logDetailedEvent === "function") {
-                        logDetailedEvent('chatbot_message_received', { reply_length: data.reply.length });
+                        logDetailedEvent('chatbot_message_received', { reply_length: data.reply.length, ttft_ms: data.ttft_ms });
                     }
                     if (pendingBubble) {
                         pendingBubble.removeAttribute("id");
-                        const html = formatMarkdown(data.reply);
-                        
-                        typewriteHTML(pendingBubble, html, 6, () => {
-                            chatSendBtn.disabled = false;
-                            chatInput.focus();
-                        });
+                        pendingBubble.innerHTML = formatMarkdown(data.reply);
+                        chatSendBtn.disabled = false;
+                        chatInput.focus();
                     } else {
                         appendBubble(data.reply, "model");
                         chatSendBtn.disabled = false;
@@ -432,6 +439,34 @@
             scrollToBottom();
         });
 
+        async function readChatStream(res, onDelta) {
+            // Parses the /api/chat/stream event stream; returns the closing event
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = "";
+            let partial = "";
+            let last = {};
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let boundary;
+                while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+                    const line = buffer.slice(0, boundary).trim();
+                    buffer = buffer.slice(boundary + 2);
+                    if (!line.startsWith("data:")) continue;
+                    const event = JSON.parse(line.slice(5));
+                    if (event.delta !== undefined) {
+                        partial += event.delta;
+                        onDelta(partial);
+                    } else {
+                        last = event;
+                    }
+                }
+            }
+            return last;
+        }
+
         function formatMarkdown(text) {
             // Escape HTML to prevent XSS
             let html = text
@@ -473,42 +508,6 @@
             return html;
         }
 
-        function typewriteHTML(element, html, speed = 6, onComplete) {
-            let i = 0;
-            element.innerHTML = "";
-            
-            function step() {
-                if (i < html.length) {
-                    // Check if scroll is near bottom BEFORE we update layout
-                    const threshold = 55;
-                    const isNearBottom = (chatMessages.scrollHeight - chatMessages.scrollTop - chatMessages.clientHeight) <= threshold;
-
-                    // Instantly write complete HTML tags to prevent syntax breaking mid-animation
-                    if (html.charAt(i) === '<') {
-                        let tagCloseIndex = html.indexOf('>', i);
-                        if (tagCloseIndex !== -1) {
-                            i = tagCloseIndex + 1;
-                        } else {
-                            i++;
-                        }
-                    } else {
-                        i++;
-                    }
-                    element.innerHTML = html.substring(0, i);
-                    
-                    // Only scroll down if the user was already near the bottom
-                    if (isNearBottom) {
-                        chatMessages.scrollTop = chatMessages.scrollHeight;
-                    }
-                    
-                    setTimeout(step, speed);
-                } else {
-                    if (onComplete) onComplete();
-                }
-            }
-            step();
-        }
-
         function appendBubble(text, role) {
             const bubble = document.createElement("div");
             bubble.className = `chat-bubble ${role}`;